@@ -1,21 +1,81 @@
 import os
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+import asyncio
+import secrets
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
-from app.utils.detector import detect_and_parse
-from app.models import ParseError, InvalidCampaignError, EmptyReportError, UnsupportedFormatError, InvalidFileError
-from typing import List, Dict
+from app.utils.workers import ParseExecutor
+from app.utils.cache import ParseCache
+from app.utils.dedup import DEDUP_POLICIES, Deduplicator
+from app.utils.analytics import OUTLIER_METHODS, campaign_analytics, campaign_flags
+from app.utils.ingest import (
+    ARCHIVE_EXTENSIONS,
+    COMPRESSED_EXTENSIONS,
+    IngestedFile,
+    expand_archives,
+    gunzip_stream,
+    ingest_multipart,
+    UploadRejectedError,
+)
+from app.utils.workspace import Workspace, WorkspaceStore
+from app.utils.top_links import TopLinks
+from app.utils.compression import CompressionMiddleware
+from app.utils.metrics import PROMETHEUS_MEDIA_TYPE, MetricsMiddleware, ServiceMetrics, StageTimer
+from app.utils.static import IMMUTABLE, REVALIDATE, PrecompressedStaticFiles
+from app.utils.responses import ParseResponse, encode_record, encode_result_records, result_records
+from app.models import CAMPAIGN_FIELDS, CampaignBatch, ParseError, InvalidCampaignError, EmptyReportError, UnsupportedFormatError, InvalidFileError
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 from datetime import datetime
+from pydantic import BaseModel
 
 # Configuration from environment variables
 DEV = os.getenv("DEV", "False").lower() in ("true", "1", "yes")
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", str(10 * 1024 * 1024)))  # Default: 10MB
 MAX_FILES = int(os.getenv("MAX_FILES", "12"))  # Default: 12
+MAX_ARCHIVE_SIZE = int(os.getenv("MAX_ARCHIVE_SIZE", str(50 * 1024 * 1024)))  # Default: 50MB per .zip
+MAX_ARCHIVE_MEMBERS = int(os.getenv("MAX_ARCHIVE_MEMBERS", "500"))  # Default: 500 files per .zip
+MAX_UNCOMPRESSED_SIZE = int(os.getenv("MAX_UNCOMPRESSED_SIZE", str(256 * 1024 * 1024)))  # Default: 256MB per request
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))  # Default: 64KB
+PARSE_EXECUTOR = os.getenv("PARSE_EXECUTOR", "process").lower()  # "process" or "thread"
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "2"))  # Default: 2
+PARSE_TIMEOUT = float(os.getenv("PARSE_TIMEOUT", "30"))  # Default: 30 seconds per file
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", str(64 * 1024 * 1024)))  # Default: 64MB, 0 disables
+PARSE_CACHE_TTL = float(os.getenv("PARSE_CACHE_TTL", "900"))  # Default: 15 minutes, 0 disables
+DEDUP_POLICY = os.getenv("DEDUP_POLICY", "latest").lower()  # "latest", "max_delivered" or "merge"
+OUTLIER_METHOD = os.getenv("OUTLIER_METHOD", "iqr").lower()  # "iqr" or "zscore"
+WORKSPACE_TTL = float(os.getenv("WORKSPACE_TTL", "1800"))  # Default: 30 minutes unused, 0 disables
+MAX_WORKSPACES = int(os.getenv("MAX_WORKSPACES", "100"))  # Default: 100 open at once
+MAX_WORKSPACE_FILES = int(os.getenv("MAX_WORKSPACE_FILES", str(MAX_FILES * 4)))  # Default: 48
+MAX_ANALYTICS_CAMPAIGNS = int(os.getenv("MAX_ANALYTICS_CAMPAIGNS", "50000"))  # Default: 50,000
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", str(16 * 1024 * 1024)))  # Default: 16MB, 0 disables
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "1800"))  # Default: 30 minutes, 0 disables
+TOP_LINKS = int(os.getenv("TOP_LINKS", "20"))  # URLs ranked by /parse?links=true
+LINK_COUNTERS = int(os.getenv("LINK_COUNTERS", "200"))  # Memory bound of the ranking, in URLs tracked
+METRICS = os.getenv("METRICS", "True").lower() in ("true", "1", "yes")  # Serve Prometheus metrics at /metrics
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+if DEDUP_POLICY not in DEDUP_POLICIES:
+    raise ValueError(f"Unknown dedup policy: {DEDUP_POLICY}")
+if OUTLIER_METHOD not in OUTLIER_METHODS:
+    raise ValueError(f"Unknown outlier method: {OUTLIER_METHOD}")
+
+parse_cache = ParseCache(max_bytes=PARSE_CACHE_SIZE, ttl=PARSE_CACHE_TTL)
+# Campaigns posted to /analytics, so a dashboard changing its selection sends only the indices
+analytics_cache = ParseCache(max_bytes=ANALYTICS_CACHE_SIZE, ttl=ANALYTICS_CACHE_TTL)
+workspace_store = WorkspaceStore(ttl=WORKSPACE_TTL, max_workspaces=MAX_WORKSPACES, policy=DEDUP_POLICY)
+parse_executor = ParseExecutor(
+    kind=PARSE_EXECUTOR,
+    max_workers=PARSE_WORKERS,
+    timeout=PARSE_TIMEOUT,
+    cache=parse_cache
+)
+metrics = ServiceMetrics()
 
 # Rate limiter that works with Cloudflare proxied requests
 def get_real_ip(request: Request) -> str:
@@ -32,13 +92,21 @@ def get_real_ip(request: Request) -> str:
 
 limiter = Limiter(key_func=get_real_ip)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    parse_executor.shutdown()
+
+
 app = FastAPI(
     title="Simple Dash",
     description="Email campaign analytics tool",
     version="1.0.0",
     docs_url=None,  # Disable /docs
     redoc_url=None,  # Disable /redoc
-    openapi_url=None  # Disable /openapi.json
+    openapi_url=None,  # Disable /openapi.json
+    lifespan=lifespan
 )
 
 app.state.limiter = limiter
@@ -53,9 +121,16 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
-    allow_methods=["GET", "POST"],
+    allow_methods=["GET", "POST", "DELETE"],
     allow_headers=["*"],
 )
+# Middleware added last runs first, so requests pass through metrics, then compression,
+# then CORS and rate limiting. Compression wraps the inner layers so error responses
+# are compressed too; precompressed files pass through untouched
+app.add_middleware(CompressionMiddleware, minimum_size=1000, compresslevel=6)
+# Outermost, so recorded latency includes compressing the response and every status
+# code is seen as the client gets it, rate-limit and CORS rejections included
+app.add_middleware(MetricsMiddleware, metrics=metrics)
 
 
 def get_file_modified_time(file: UploadFile) -> datetime:
@@ -65,127 +140,465 @@ def get_file_modified_time(file: UploadFile) -> datetime:
     return datetime.now()
 
 
-@app.post("/parse")
-@limiter.limit("10/minute")
-async def parse_report(request: Request, files: List[UploadFile] = File(...)):
-    if len(files) > MAX_FILES:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Too many files. Maximum {MAX_FILES} files allowed per upload."
+def encode_dedup_records(deduplicator: Deduplicator, slots: List[int]) -> str:
+    """Encode the current winners of the given slots as NDJSON result records, in slot order of first mention"""
+    return encode_entry_records([("deduplicated", *deduplicator.entry(slot)) for slot in dict.fromkeys(slots)])
+
+
+def encode_entry_records(entries: List[Tuple[str, CampaignBatch, int]]) -> str:
+    """Encode (filename, batch, row) entries as NDJSON result records, keeping their order"""
+    # Rows are encoded one batch at a time, then put back in place
+    groups: Dict[int, Tuple[CampaignBatch, List[str], List[int], List[int]]] = {}
+    for position, (filename, batch, row) in enumerate(entries):
+        _, filenames, rows, positions = groups.setdefault(id(batch), (batch, [], [], []))
+        filenames.append(filename)
+        rows.append(row)
+        positions.append(position)
+    
+    records = [""] * len(entries)
+    for batch, filenames, rows, positions in groups.values():
+        for position, record in zip(positions, result_records(filenames, batch, rows)):
+            records[position] = record
+    return "".join(records)
+
+
+def format_parse_error(error: BaseException) -> str:
+    """Describe a parsing failure for the per-file errors list"""
+    if isinstance(error, EmptyReportError):
+        return f"Empty report: {error.message}"
+    if isinstance(error, UnsupportedFormatError):
+        return f"Unsupported format: {error.message}"
+    if isinstance(error, InvalidCampaignError):
+        return f"Invalid campaign: {error.message}"
+    if isinstance(error, ParseError):
+        return f"Parse error: {error.message}"
+    if isinstance(error, asyncio.TimeoutError):
+        return f"Failed to parse: timed out after {PARSE_TIMEOUT:g} seconds"
+    return f"Failed to parse: {str(error)}"
+
+
+def parsed_campaigns(
+    upload: IngestedFile,
+    outcome,
+    timer: StageTimer
+) -> Tuple[Optional[CampaignBatch], Optional[str]]:
+    """A parsed batch for an upload, or the message reported for it in the errors list, recording either in metrics"""
+    if upload.error:
+        metrics.observe_error(UploadRejectedError.__name__)
+        return None, upload.error
+    metrics.observe_file(upload.size, upload.profile, timer)
+    if isinstance(outcome, BaseException):
+        metrics.observe_error(type(outcome).__name__)
+        return None, format_parse_error(outcome)
+    if not outcome:
+        metrics.observe_error(EmptyReportError.__name__)
+        return None, "No campaigns found in file"
+    return outcome, None
+
+
+def summary_extras(entries: List[Tuple[CampaignBatch, int]]) -> dict:
+    """Flags over campaigns in the order the client holds them"""
+    return {
+        "flags": campaign_flags(entries, OUTLIER_METHOD),
+    }
+
+
+def file_debug(upload: IngestedFile, campaigns: Optional[CampaignBatch], lines: Dict[int, int]) -> dict:
+    """Size, parser and timings of one upload, for the debug field of /parse"""
+    profile = upload.profile or {}
+    return {
+        "filename": upload.filename,
+        "bytes": upload.size,
+        "lines": lines.get(id(upload)),
+        "campaigns": len(campaigns) if campaigns else 0,
+        "parser": profile.get("parser"),
+        "detect_ms": round(profile["detect"] * 1000, 3) if profile else None,
+        "parse_ms": round(profile["parse"] * 1000, 3) if profile else None,
+    }
+
+
+async def count_upload_lines(uploads: List[IngestedFile]) -> Dict[int, int]:
+    """Lines per upload by id, counted off the event loop before parsing closes the buffers"""
+    return await asyncio.to_thread(
+        lambda: {id(upload): upload.count_lines() for upload in uploads if not upload.error}
+    )
+
+
+def link_ranking(batches: List[CampaignBatch]) -> dict:
+    """Most clicked URLs over the click tables of the parsed reports, each report counted once"""
+    top_links = TopLinks(LINK_COUNTERS)
+    top_links.add_batches(batches)
+    return top_links.payload(TOP_LINKS)
+
+
+async def ingest_request(request: Request) -> List[IngestedFile]:
+    """Spool the multipart files of a request, rejecting oversized or malformed uploads, and unpack archives"""
+    encoding = request.headers.get("content-encoding", "identity").strip().lower()
+    if encoding not in ("identity", "gzip"):
+        raise HTTPException(status_code=415, detail=f"Unsupported Content-Encoding: {encoding}")
+    stream = request.stream()
+    if encoding == "gzip":
+        # Size limits below then apply to the inflated body
+        stream = gunzip_stream(stream, UPLOAD_CHUNK_SIZE)
+    
+    try:
+        uploads = await ingest_multipart(
+            request.headers.get("content-type", ""),
+            stream,
+            max_files=MAX_FILES,
+            max_file_size=MAX_FILE_SIZE,
+            max_total_size=MAX_FILE_SIZE * MAX_FILES,
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            archive_extensions=ARCHIVE_EXTENSIONS,
+            max_archive_size=MAX_ARCHIVE_SIZE,
+            compressed_extensions=COMPRESSED_EXTENSIONS,
         )
+    except UploadRejectedError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    
+    if not any(upload.filename.lower().endswith(ARCHIVE_EXTENSIONS) for upload in uploads):
+        return uploads
+    # Decompression is CPU and disk bound, so it stays off the event loop
+    return await asyncio.to_thread(
+        expand_archives,
+        uploads,
+        max_members=MAX_ARCHIVE_MEMBERS,
+        max_member_size=MAX_FILE_SIZE,
+        max_uncompressed=MAX_UNCOMPRESSED_SIZE,
+        chunk_size=UPLOAD_CHUNK_SIZE,
+    )
+
+
+async def parse_uploads(
+    uploads: List[IngestedFile],
+    timer: StageTimer,
+    links: bool = False
+) -> List[Tuple[IngestedFile, Optional[CampaignBatch], Optional[str]]]:
+    """Parse every upload in the pool; returns (upload, batch, error) in upload order"""
+    pending = [upload for upload in uploads if not upload.error]
+    try:
+        outcomes = dict(zip(map(id, pending), await parse_executor.parse_all(pending, links)))
+    finally:
+        for upload in uploads:
+            upload.close()
+    return [(upload, *parsed_campaigns(upload, outcomes.get(id(upload)), timer)) for upload in uploads]
+
+
+async def stream_parse_results(
+    uploads: List[IngestedFile],
+    workspace: Optional[Workspace] = None,
+    links: bool = False,
+    timer: Optional[StageTimer] = None,
+    debug: bool = False
+) -> AsyncIterator[bytes]:
+    """
+    Stream NDJSON records as each file finishes parsing.
     
-    total_size = 0
-    file_contents = []
+    A campaign is only sent when it changes the deduplicated winner for its
+    unique_id, so a client that keys results by unique_id ends up with the same
+    set as the JSON response. The stream ends with a summary record carrying
+    flags that index campaigns in the order their unique_id (or unkeyed record)
+    first arrived. Given a workspace, only campaigns changed
+    by these uploads are sent, while the summary covers the whole workspace.
+    With `links`, the summary also ranks the most clicked URLs of these uploads.
+    With `debug`, it also reports each file, in the order parsing finished, and
+    the stage timings, which a streamed Server-Timing header goes out too early to hold.
+    """
+    workspace = workspace or Workspace(DEDUP_POLICY)
+    timer = timer or StageTimer()
+    sent = 0
+    lines = await count_upload_lines(uploads) if debug else {}
+    files: List[dict] = []
     
-    for file in files:
-        contents = await file.read()
-        total_size += len(contents)
-        file_contents.append((file.filename, contents))
+    async with workspace.lock:
+        first = workspace.reserve(len(uploads))
+        positions = {id(upload): first + position for position, upload in enumerate(uploads)}
+        duplicates = workspace.deduplicator.duplicates
+        error_count = 0
+        parsed: List[CampaignBatch] = []
         
-        await file.seek(0)
+        try:
+            for upload in uploads:
+                if upload.error:
+                    error_count += 1
+                    _, error = parsed_campaigns(upload, None, timer)
+                    files.append(file_debug(upload, None, lines))
+                    yield encode_record("error", filename=upload.filename, error=error).encode("utf-8")
+            
+            pending = [upload for upload in uploads if not upload.error]
+            async for upload, outcome in parse_executor.parse_as_completed(pending, links):
+                upload.close()
+                
+                campaigns, error = parsed_campaigns(upload, outcome, timer)
+                files.append(file_debug(upload, campaigns, lines))
+                if error:
+                    error_count += 1
+                    yield encode_record("error", filename=upload.filename, error=error).encode("utf-8")
+                    continue
+                
+                parsed.append(campaigns)
+                with timer.stage("dedup"):
+                    unkeyed, changed = workspace.add(campaigns, campaigns.meaningful_rows(), positions[id(upload)])
+                with timer.stage("serialize"):
+                    records = encode_result_records([upload.filename] * len(unkeyed), campaigns, unkeyed)
+                    records += encode_dedup_records(workspace.deduplicator, changed)
+                sent += len(unkeyed) + len(set(changed))
+                if records:
+                    yield records.encode("utf-8")
+            
+            with timer.stage("serialize"):
+                extras = summary_extras(workspace.entries())
+                if links:
+                    extras["links"] = link_ranking(parsed)
+                if debug:
+                    extras["debug"] = {"files": files, "stages": timer.milliseconds()}
+                summary = encode_record(
+                    "summary",
+                    campaigns=len(workspace),
+                    files=len(uploads),
+                    errors=error_count,
+                    duplicates=workspace.deduplicator.duplicates - duplicates,
+                    **extras
+                ).encode("utf-8")
+            metrics.observe_request(timer, sent)
+            yield summary
+        finally:
+            for upload in uploads:
+                upload.close()
+
+
+@app.post("/parse", response_class=ParseResponse)
+@limiter.limit("10/minute")
+async def parse_report(request: Request, links: bool = False, debug: bool = False):
+    """
+    Parse uploaded reports into deduplicated campaigns.
     
-    max_total_size = MAX_FILE_SIZE * MAX_FILES
-    if total_size > max_total_size:
-        raise HTTPException(
-            status_code=413,
-            detail=f"Total upload size exceeds maximum allowed ({max_total_size // (1024 * 1024)}MB)"
+    The Server-Timing header breaks the request down by stage and by file; with
+    `debug`, the body also reports each file's size, lines, campaigns and parser.
+    """
+    timer = StageTimer()
+    with timer.stage("read"):
+        uploads = await ingest_request(request)
+    
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        # Headers precede parsing, so only reading is timed in them
+        return StreamingResponse(
+            stream_parse_results(uploads, links=links, timer=timer, debug=debug),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers={"Server-Timing": timer.server_timing()}
         )
     
-    results = []
+    lines = await count_upload_lines(uploads) if debug else {}
+    parsed_files = await parse_uploads(uploads, timer, links)
+    
+    results: List[Tuple[str, CampaignBatch, int]] = []
     errors = []
-    campaigns_by_id: Dict[str, dict] = {}
+    parsed: List[CampaignBatch] = []
+    deduplicator = Deduplicator(DEDUP_POLICY)
     file_index = 0
     
-    for filename, contents in file_contents:
-        if not filename.lower().endswith(".csv"):
-            errors.append({
-                "filename": filename,
-                "error": "Only CSV files supported"
-            })
-            continue
-
-        if len(contents) > MAX_FILE_SIZE:
+    for upload, campaigns, error in parsed_files:
+        if error:
             errors.append({
-                "filename": filename,
-                "error": f"File too large. Maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB"
+                "filename": upload.filename,
+                "error": error
             })
             continue
         
-        try:
-            text = contents.decode("utf-8", errors="ignore")
-        except Exception as e:
-            errors.append({
-                "filename": filename,
-                "error": f"Failed to decode file: {str(e)}"
-            })
-            continue
+        parsed.append(campaigns)
+        with timer.stage("dedup"):
+            rows = campaigns.meaningful_rows()
+            unique_ids = campaigns.columns["unique_id"]
+            results.extend((upload.filename, campaigns, row) for row in rows if not unique_ids[row])
+            deduplicator.add(campaigns, rows, file_index)
+        
+        file_index += 1
+    
+    with timer.stage("dedup"):
+        for batch, row in deduplicator.entries():
+            results.append(("deduplicated", batch, row))
+    
+    with timer.stage("serialize"):
+        extras = summary_extras([(batch, row) for _, batch, row in results])
+        if links:
+            extras["links"] = link_ranking(parsed)
+        if debug:
+            extras["debug"] = {"files": [file_debug(upload, campaigns, lines) for upload, campaigns, _ in parsed_files]}
+        response = ParseResponse(results, errors, extras)
+    metrics.observe_request(timer, len(results))
+    response.headers["Server-Timing"] = timer.server_timing([(upload.filename, upload.profile) for upload in uploads])
+    return response
 
-        try:
-            campaigns = detect_and_parse(text)
-            
-            if not campaigns:
+
+def get_workspace(token: str) -> Workspace:
+    workspace = workspace_store.get(token)
+    if workspace is None:
+        raise HTTPException(status_code=404, detail="Workspace not found or expired")
+    return workspace
+
+
+@app.post("/workspaces", status_code=201)
+@limiter.limit("10/minute")
+async def create_workspace(request: Request):
+    """Open an in-memory workspace that later uploads are merged into"""
+    if not workspace_store.enabled:
+        raise HTTPException(status_code=404, detail="Workspaces are disabled")
+    
+    token, _ = workspace_store.create()
+    return {"token": token, "ttl": WORKSPACE_TTL, "max_files": MAX_WORKSPACE_FILES}
+
+
+@app.post("/workspaces/{token}", response_class=ParseResponse)
+@limiter.limit("10/minute")
+async def add_to_workspace(request: Request, token: str):
+    """
+    Parse new files into a workspace and return only the campaigns they changed.
+    
+    Clients key the returned campaigns by unique_id to update the set they hold;
+    flags cover the whole workspace, indexed in order of first arrival.
+    """
+    workspace = get_workspace(token)
+    timer = StageTimer()
+    with timer.stage("read"):
+        uploads = await ingest_request(request)
+    if workspace.files + len(uploads) > MAX_WORKSPACE_FILES:
+        for upload in uploads:
+            upload.close()
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many files. Maximum {MAX_WORKSPACE_FILES} allowed per workspace."
+        )
+    
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(
+            stream_parse_results(uploads, workspace, timer=timer),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers={"Server-Timing": timer.server_timing()}
+        )
+    
+    async with workspace.lock:
+        first = workspace.reserve(len(uploads))
+        duplicates = workspace.deduplicator.duplicates
+        # Per file, campaigns without an ID and then changed slots, as a stream would send them
+        delta: List[Union[int, Tuple[str, CampaignBatch, int]]] = []
+        sent_slots = set()
+        errors = []
+        
+        for position, (upload, campaigns, error) in enumerate(await parse_uploads(uploads, timer)):
+            if error:
                 errors.append({
-                    "filename": filename,
-                    "error": "No campaigns found in file"
+                    "filename": upload.filename,
+                    "error": error
                 })
                 continue
             
-            for campaign in campaigns:
-                if not campaign.has_meaningful_data():
-                    continue
-                
-                unique_id = campaign.unique_id
-                campaign_dict = campaign.to_dict()
-                
-                if unique_id:
-                    if unique_id not in campaigns_by_id or file_index > campaigns_by_id[unique_id].get("_file_index", -1):
-                        campaign_dict["_file_index"] = file_index
-                        campaigns_by_id[unique_id] = campaign_dict
-                else:
-                    results.append({
-                        "filename": filename,
-                        "data": {"campaign": campaign_dict}
-                    })
-            
-            file_index += 1
-            
-        except EmptyReportError as e:
-            errors.append({
-                "filename": filename,
-                "error": f"Empty report: {e.message}"
-            })
-        except UnsupportedFormatError as e:
-            errors.append({
-                "filename": filename,
-                "error": f"Unsupported format: {e.message}"
-            })
-        except InvalidCampaignError as e:
-            errors.append({
-                "filename": filename,
-                "error": f"Invalid campaign: {e.message}"
-            })
-        except ParseError as e:
-            errors.append({
-                "filename": filename,
-                "error": f"Parse error: {e.message}"
-            })
-        except Exception as e:
-            errors.append({
-                "filename": filename,
-                "error": f"Failed to parse: {str(e)}"
+            with timer.stage("dedup"):
+                unkeyed, changed = workspace.add(campaigns, campaigns.meaningful_rows(), first + position)
+            delta.extend((upload.filename, campaigns, row) for row in unkeyed)
+            for slot in changed:
+                if slot not in sent_slots:
+                    sent_slots.add(slot)
+                    delta.append(slot)
+        
+        with timer.stage("serialize"):
+            results = [
+                ("deduplicated", *workspace.deduplicator.entry(item)) if isinstance(item, int) else item
+                for item in delta
+            ]
+            response = ParseResponse(results, errors, {
+                "workspace": {
+                    "campaigns": len(workspace),
+                    "files": workspace.files,
+                    "duplicates": workspace.deduplicator.duplicates - duplicates,
+                },
+                **summary_extras(workspace.entries()),
             })
+        metrics.observe_request(timer, len(results))
+        response.headers["Server-Timing"] = timer.server_timing([(upload.filename, upload.profile) for upload in uploads])
+        return response
+
+
+@app.delete("/workspaces/{token}", status_code=204)
+async def delete_workspace(token: str):
+    """Discard a workspace and everything parsed into it"""
+    if not workspace_store.discard(token):
+        raise HTTPException(status_code=404, detail="Workspace not found or expired")
+
+
+class AnalyticsCampaign(BaseModel):
+    """A campaign as returned by /parse; values of the wrong type are rejected with 422"""
+    platform: Optional[str] = None
+    subject: Optional[str] = None
+    email_title: Optional[str] = None
+    unique_id: Optional[str] = None
+    sent_at: Optional[str] = None
+    delivered: Optional[float] = None
+    opens: Optional[float] = None
+    open_rate: Optional[float] = None
+    clicks: Optional[float] = None
+    click_rate: Optional[float] = None
+    ctor: Optional[float] = None
+    unsubscribes: Optional[float] = None
+    unsubscribe_rate: Optional[float] = None
+    spam_complaints: Optional[float] = None
+    bounces: Optional[float] = None
+    bounce_rate: Optional[float] = None
+    hard_bounces: Optional[float] = None
+    hard_bounce_rate: Optional[float] = None
+    soft_bounces: Optional[float] = None
+    soft_bounce_rate: Optional[float] = None
+
+
+class AnalyticsRequest(BaseModel):
+    campaigns: List[AnalyticsCampaign]
+    selected: Optional[List[int]] = None
+
+
+class SelectionRequest(BaseModel):
+    selected: Optional[List[int]] = None
+
+
+@app.post("/analytics")
+@limiter.limit("60/minute")
+async def analytics(request: Request, body: AnalyticsRequest):
+    """
+    Dashboard aggregates, trends, outliers and heatmap for parsed campaigns.
     
-    for unique_id, campaign in campaigns_by_id.items():
-        campaign.pop("_file_index", None)
-        results.append({
-            "filename": "deduplicated",
-            "data": {"campaign": campaign}
-        })
+    The campaigns are kept for a while under the returned `dataset` token, so
+    later selections of the same campaigns can go to /analytics/{dataset}.
+    """
+    if len(body.campaigns) > MAX_ANALYTICS_CAMPAIGNS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many campaigns. Maximum {MAX_ANALYTICS_CAMPAIGNS} allowed."
+        )
     
-    return {
-        "results": results,
-        "errors": errors
-    }
+    batch = CampaignBatch({
+        field: [getattr(campaign, field) for campaign in body.campaigns]
+        for field in CAMPAIGN_FIELDS
+    })
+    dataset = secrets.token_urlsafe(16)
+    if not analytics_cache.put(dataset, batch):
+        dataset = None
+    return {**campaign_analytics(batch, body.selected), "dataset": dataset}
+
+
+@app.post("/analytics/{dataset}")
+@limiter.limit("300/minute")
+async def analytics_selection(request: Request, dataset: str, body: SelectionRequest):
+    """Analytics for another selection of campaigns already posted to /analytics"""
+    batch = analytics_cache.get(dataset)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Dataset not found or expired")
+    return {**campaign_analytics(batch, body.selected), "dataset": dataset}
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Request, upload, stage and parser metrics in the Prometheus text format"""
+    if not METRICS:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(metrics.render(), media_type=PROMETHEUS_MEDIA_TYPE)
 
 
 @app.get("/health")
@@ -194,27 +607,33 @@ async def health_check():
     return {
         "status": "healthy",
         "max_file_size": MAX_FILE_SIZE,
-        "max_files": MAX_FILES
+        "max_files": MAX_FILES,
+        "parse_cache": parse_cache.stats(),
+        "analytics_cache": analytics_cache.stats(),
+        "workspaces": workspace_store.stats()
     }
 
 
 if os.path.exists("frontend/dist"):
-    app.mount("/assets", StaticFiles(directory="frontend/dist/assets"), name="assets")
+    # Vite fingerprints everything under /assets, so it can be cached for good
+    app.mount("/assets", PrecompressedStaticFiles(directory="frontend/dist/assets", cache_control=IMMUTABLE), name="assets")
+    dist_files = PrecompressedStaticFiles(directory="frontend/dist", cache_control=REVALIDATE)
+    public_files = PrecompressedStaticFiles(directory="frontend/public", cache_control=REVALIDATE, check_dir=False)
     
     @app.get("/favicon.ico")
-    async def serve_favicon():
-        dist_favicon = "frontend/dist/favicon.ico"
-        if os.path.exists(dist_favicon):
-            return FileResponse(dist_favicon)
-        
-        public_favicon = "frontend/public/favicon.ico"
-        if os.path.exists(public_favicon):
-            return FileResponse(public_favicon)
+    async def serve_favicon(request: Request):
+        for files in (dist_files, public_files):
+            response = files.serve("favicon.ico", request.scope)
+            if response is not None:
+                return response
         raise HTTPException(status_code=404, detail="Favicon not found")
     
     @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
-        if full_path.startswith("parse"):
+    async def serve_spa(full_path: str, request: Request):
+        if full_path.startswith(("parse", "analytics", "workspaces", "metrics")):
             raise HTTPException(status_code=404, detail="Not found")
         
-        return FileResponse("frontend/dist/index.html")
+        response = dist_files.serve("index.html", request.scope)
+        if response is None:
+            raise HTTPException(status_code=404, detail="Not found")
+        return response
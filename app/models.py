@@ -1,10 +1,72 @@
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
 from datetime import datetime
 
 
+# Campaign fields in serialization order
+CAMPAIGN_FIELDS = (
+    "platform",
+    "subject",
+    "email_title",
+    "unique_id",
+    "sent_at",
+    "delivered",
+    "opens",
+    "open_rate",
+    "clicks",
+    "click_rate",
+    "ctor",
+    "unsubscribes",
+    "unsubscribe_rate",
+    "spam_complaints",
+    "bounces",
+    "bounce_rate",
+    "hard_bounces",
+    "hard_bounce_rate",
+    "soft_bounces",
+    "soft_bounce_rate",
+)
+
+
+def is_meaningful(platform, subject, email_title, unique_id, sent_at, delivered, opens, open_rate, clicks, click_rate) -> bool:
+    """Check that the required campaign fields are populated with meaningful values"""
+    # Check required fields exist and are not None
+    required_fields = [
+        platform,
+        subject,
+        email_title,
+        unique_id,
+        sent_at,
+        delivered,
+        opens,
+        open_rate,
+        clicks,
+        click_rate,
+    ]
+    
+    if not all(field is not None for field in required_fields):
+        return False
+    
+    # Check string fields are not empty (including whitespace-only strings)
+    if not subject or (isinstance(subject, str) and not subject.strip()):
+        return False
+    if not email_title or (isinstance(email_title, str) and not email_title.strip()):
+        return False
+    if not sent_at or (isinstance(sent_at, str) and not str(sent_at).strip()):
+        return False
+    
+    # Check numeric fields are meaningful (not just zeros)
+    # At least delivered should be > 0 for a real campaign
+    if not isinstance(delivered, (int, float)) or delivered <= 0:
+        return False
+    
+    return True
+
+
 class EmailCampaign:
     """Represents a single email campaign with metrics"""
     
+    __slots__ = CAMPAIGN_FIELDS
+    
     def __init__(
         self,
         platform: str,
@@ -51,33 +113,20 @@ class EmailCampaign:
     
     def to_dict(self) -> dict:
         """Convert campaign to dictionary for JSON serialization"""
-        return {
-            "platform": self.platform,
-            "subject": self.subject,
-            "email_title": self.email_title,
-            "unique_id": self.unique_id,
-            "sent_at": self.sent_at,
-            "delivered": self.delivered,
-            "opens": self.opens,
-            "open_rate": self.open_rate,
-            "clicks": self.clicks,
-            "click_rate": self.click_rate,
-            "ctor": self.ctor,
-            "unsubscribes": self.unsubscribes,
-            "unsubscribe_rate": self.unsubscribe_rate,
-            "spam_complaints": self.spam_complaints,
-            "bounces": self.bounces,
-            "bounce_rate": self.bounce_rate,
-            "hard_bounces": self.hard_bounces,
-            "hard_bounce_rate": self.hard_bounce_rate,
-            "soft_bounces": self.soft_bounces,
-            "soft_bounce_rate": self.soft_bounce_rate,
-        }
+        return {field: getattr(self, field) for field in CAMPAIGN_FIELDS}
+    
+    def to_row(self) -> tuple:
+        """Return field values in CAMPAIGN_FIELDS order"""
+        return tuple(getattr(self, field) for field in CAMPAIGN_FIELDS)
+    
+    @classmethod
+    def from_row(cls, row: Iterable) -> "EmailCampaign":
+        """Build a campaign from values in CAMPAIGN_FIELDS order"""
+        return cls(**dict(zip(CAMPAIGN_FIELDS, row)))
     
     def has_meaningful_data(self) -> bool:
         """Check if campaign has all required fields populated with meaningful values"""
-        # Check required fields exist and are not None
-        required_fields = [
+        return is_meaningful(
             self.platform,
             self.subject,
             self.email_title,
@@ -88,30 +137,84 @@ class EmailCampaign:
             self.open_rate,
             self.clicks,
             self.click_rate,
-        ]
-        
-        if not all(field is not None for field in required_fields):
-            return False
-        
-        # Check string fields are not empty (including whitespace-only strings)
-        if not self.subject or (isinstance(self.subject, str) and not self.subject.strip()):
-            return False
-        if not self.email_title or (isinstance(self.email_title, str) and not self.email_title.strip()):
-            return False
-        if not self.sent_at or (isinstance(self.sent_at, str) and not str(self.sent_at).strip()):
-            return False
-        
-        # Check numeric fields are meaningful (not just zeros)
-        # At least delivered should be > 0 for a real campaign
-        if not isinstance(self.delivered, (int, float)) or self.delivered <= 0:
-            return False
-        
-        return True
+        )
     
     def __repr__(self):
         return f"EmailCampaign(platform={self.platform}, subject={self.subject[:30] if self.subject else None}...)"
 
 
+class LinkClicks(NamedTuple):
+    """One row of a report's per-URL click table"""
+    url: str
+    unique_clicks: int
+    total_clicks: int
+
+
+class CampaignBatch:
+    """Struct-of-arrays collection of campaigns: one list per field instead of one object per campaign"""
+    
+    __slots__ = ("columns", "links")
+    
+    def __init__(self, columns: Optional[Dict[str, list]] = None):
+        columns = columns or {}
+        size = max((len(values) for values in columns.values()), default=0)
+        self.columns: Dict[str, list] = {
+            field: list(columns[field]) if field in columns else [None] * size
+            for field in CAMPAIGN_FIELDS
+        }
+        # Click table of the report, only extracted when requested
+        self.links: Optional[List[LinkClicks]] = None
+    
+    @classmethod
+    def from_campaigns(cls, campaigns: Iterable[EmailCampaign]) -> "CampaignBatch":
+        batch = cls()
+        for campaign in campaigns:
+            batch.append(campaign)
+        return batch
+    
+    def append(self, campaign: EmailCampaign):
+        for field in CAMPAIGN_FIELDS:
+            self.columns[field].append(getattr(campaign, field))
+    
+    def __len__(self) -> int:
+        return len(self.columns["platform"])
+    
+    def __getitem__(self, index: int) -> EmailCampaign:
+        return EmailCampaign.from_row(self.row(index))
+    
+    def __iter__(self) -> Iterator[EmailCampaign]:
+        return (EmailCampaign.from_row(row) for row in self.rows())
+    
+    def row(self, index: int) -> tuple:
+        """Field values of one campaign in CAMPAIGN_FIELDS order"""
+        return tuple(values[index] for values in self.columns.values())
+    
+    def rows(self) -> Iterator[tuple]:
+        """Field values of every campaign in CAMPAIGN_FIELDS order"""
+        return zip(*self.columns.values())
+    
+    def row_dict(self, index: int) -> dict:
+        """Serialize one campaign straight from the columns"""
+        return {field: values[index] for field, values in self.columns.items()}
+    
+    def meaningful_rows(self) -> List[int]:
+        """Indices of campaigns with all required fields populated"""
+        columns = self.columns
+        required = zip(
+            columns["platform"],
+            columns["subject"],
+            columns["email_title"],
+            columns["unique_id"],
+            columns["sent_at"],
+            columns["delivered"],
+            columns["opens"],
+            columns["open_rate"],
+            columns["clicks"],
+            columns["click_rate"],
+        )
+        return [index for index, values in enumerate(required) if is_meaningful(*values)]
+
+
 class ParseError(Exception):
     """Base class for parsing errors"""
     
@@ -1,17 +1,43 @@
+import io
 from abc import ABC, abstractmethod
-from typing import List
-from app.models import EmailCampaign
+from typing import Iterable, List, Optional, Tuple
+from app.models import CampaignBatch, EmailCampaign, LinkClicks
+from app.parsers.signatures import Signature, fingerprint
+from app.parsers.tokenizer import parse_link_table
 
 
 class BaseParser(ABC):
     """Abstract base parser for email campaign reports"""
     
-    @abstractmethod
+    # Markers identifying this report format within its first lines
+    signatures: Tuple[Signature, ...] = ()
+    # Order of the unique and total count columns in the report's click table, if it has one
+    link_columns: Optional[Tuple[str, str]] = None
+    
     def parse(self, text: str) -> List[EmailCampaign]:
         """Parse report text and return list of EmailCampaign instances"""
-        pass
+        return self.parse_lines(io.StringIO(text, newline=None))
+    
+    def parse_batch(self, lines: Iterable[str]) -> CampaignBatch:
+        """Parse report lines into a compact column-oriented batch"""
+        return CampaignBatch.from_campaigns(self.parse_lines(lines))
+    
+    def parse_links(self, lines: Iterable[str]) -> Optional[List[LinkClicks]]:
+        """
+        Parse the click table from the lines left once parse_lines has returned.
+
+        Parsers stop reading where their click table begins, so only the table
+        itself is left to read. Returns None for formats without a click table.
+        """
+        if self.link_columns is None:
+            return None
+        return parse_link_table(lines, self.link_columns)
     
     @abstractmethod
+    def parse_lines(self, lines: Iterable[str]) -> List[EmailCampaign]:
+        """Parse report lines from an incremental text stream"""
+        pass
+    
     def can_parse(self, text: str) -> bool:
         """Check if this parser can handle the given text"""
-        pass
+        return fingerprint([self], io.StringIO(text, newline=None)).parser is self
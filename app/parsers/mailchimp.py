@@ -1,107 +1,64 @@
-import re
-from typing import List
+from typing import Iterable, List
 from app.utils.id_generator import generate_unique_id
 from app.models import EmailCampaign, EmptyReportError
 from app.parsers.base_parser import BaseParser
+from app.parsers.signatures import Signature
+from app.parsers.tokenizer import integer, number_and_percent, sanitize_title, split_quoted_kv, text
 
-def parse_kv(line: str):
-    """Parse key-value pair from CSV format like '"Title:","Personal Styling (Amy 02)"'"""
-    parts = [p.strip().strip('"') for p in line.split('","') if p.strip()]
-    if len(parts) >= 2:
-        key = parts[0].strip(':').strip()
-        value = parts[1].strip()
-        return key, value
-    return None, None
 
+# Report key to campaign field setter
+FIELDS = {
+    "Title": text("campaign_title"),
+    "Subject Line": text("subject"),
+    "Delivery Date/Time": text("sent_at"),
+    "Successful Deliveries": integer("delivered"),
+    "Recipients Who Opened": number_and_percent("opens", "open_rate"),
+    "Recipients Who Clicked": number_and_percent("clicks", "click_rate"),
+    "Total Unsubs": integer("unsubscribes"),
+    "Total Abuse Complaints": integer("spam_complaints"),
+    "Bounces": number_and_percent("bounces", "bounce_rate"),
+}
 
-def extract_number_and_percent(value: str):
-    """Extract number and percentage from strings like '1 (100.0%)'"""
-    if not value:
-        return None, None
-    
-    # Extract main number
-    num_match = re.search(r'([\d,]+)', value)
-    num = int(num_match.group(1).replace(',', '')) if num_match else None
-    
-    # Extract percentage
-    pct_match = re.search(r'\(([\d.]+)%\)', value)
-    pct = float(pct_match.group(1)) / 100 if pct_match else None
-    
-    return num, pct
-
-
-def sanitize_title(subject: str) -> str:
-    """Remove special characters from subject line to create a clean title."""
-    if not subject:
-        return "Untitled"
-    cleaned = re.sub(r'[^\w\s\-.,!?]', '', subject)
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-    return cleaned if cleaned else "Untitled"
+RECORD_FIELDS = (
+    "campaign_title", "subject", "sent_at", "delivered", "opens", "open_rate",
+    "clicks", "click_rate", "unsubscribes", "spam_complaints", "bounces", "bounce_rate",
+)
 
 
 class MailChimpParser(BaseParser):
     """Parser for MailChimp individual single campaign reports"""
     
-    def can_parse(self, text: str) -> bool:
-        """Check if text is a MailChimp single campaign report"""
-        lines = [l.strip() for l in text.splitlines() if l.strip()]
-        return any("Email Campaign Report" in line for line in lines[:5]) and \
-               any("Overall Stats" in line for line in lines[:20])
+    signatures = (
+        Signature(("Email Campaign Report",), within=5),
+        Signature(("Overall Stats",), within=20),
+    )
+    # "Clicks by URL": URL, Total Clicks, Unique Clicks
+    link_columns = ("total", "unique")
     
-    def parse(self, text: str) -> List[EmailCampaign]:
+    def parse_lines(self, lines: Iterable[str]) -> List[EmailCampaign]:
         """Parse MailChimp individual single campaign report"""
-        lines = [l.strip() for l in text.splitlines() if l.strip()]
-        
-        subject = None
-        email_title = None
-        sent_at = None
-        delivered = None
-        opens = None
-        open_rate = None
-        clicks = None
-        click_rate = None
-        unsubscribes = None
-        unsubscribe_rate = None
-        spam_complaints = None
-        bounces = None
-        bounce_rate = None
-        ctor = None
+        record = dict.fromkeys(RECORD_FIELDS)
         
-        campaign_title = None
-        
-        for line in lines:
+        for raw in lines:
+            line = raw.strip()
+            if not line:
+                continue
             if line.startswith('"Clicks by URL"') or line.startswith('"URL"'):
                 break
-                
-            key, val = parse_kv(line)
-            
-            if not key:
-                continue
             
-            if key == "Title":
-                campaign_title = val
-            elif key == "Subject Line":
-                subject = val
-            elif key == "Delivery Date/Time":
-                sent_at = val
-            elif key == "Successful Deliveries":
-                delivered = int(val.replace(',', ''))
-            elif key == "Recipients Who Opened":
-                num, pct = extract_number_and_percent(val)
-                opens = num
-                open_rate = pct
-            elif key == "Recipients Who Clicked":
-                num, pct = extract_number_and_percent(val)
-                clicks = num
-                click_rate = pct
-            elif key == "Total Unsubs":
-                unsubscribes = int(val.replace(',', '')) if val != "0" else 0
-            elif key == "Total Abuse Complaints":
-                spam_complaints = int(val.replace(',', '')) if val != "0" else 0
-            elif key == "Bounces":
-                num, pct = extract_number_and_percent(val)
-                bounces = num
-                bounce_rate = pct
+            key, val = split_quoted_kv(line)
+            setter = FIELDS.get(key)
+            if setter is not None:
+                setter(record, val)
+        
+        subject = record["subject"]
+        sent_at = record["sent_at"]
+        delivered = record["delivered"]
+        opens = record["opens"]
+        clicks = record["clicks"]
+        unsubscribes = record["unsubscribes"]
+        ctor = None
+        unsubscribe_rate = None
         
         if opens and clicks and opens > 0:
             ctor = clicks / opens
@@ -109,7 +66,7 @@ class MailChimpParser(BaseParser):
         if delivered and unsubscribes is not None and delivered > 0:
             unsubscribe_rate = unsubscribes / delivered
         
-        title = sanitize_title(campaign_title or subject or "")
+        title = sanitize_title(record["campaign_title"] or subject or "")
         email_title = title
         
         unique_id = generate_unique_id(
@@ -127,15 +84,15 @@ class MailChimpParser(BaseParser):
             sent_at=sent_at,
             delivered=delivered,
             opens=opens,
-            open_rate=open_rate,
+            open_rate=record["open_rate"],
             clicks=clicks,
-            click_rate=click_rate,
+            click_rate=record["click_rate"],
             ctor=ctor,
             unsubscribes=unsubscribes,
             unsubscribe_rate=unsubscribe_rate,
-            spam_complaints=spam_complaints,
-            bounces=bounces,
-            bounce_rate=bounce_rate,
+            spam_complaints=record["spam_complaints"],
+            bounces=record["bounces"],
+            bounce_rate=record["bounce_rate"],
             hard_bounces=None,
             hard_bounce_rate=None,
             soft_bounces=None,
@@ -1,187 +1,156 @@
-import re
-from typing import List
-from datetime import datetime
+from typing import Iterable, Iterator, List
 from app.utils.id_generator import generate_unique_id
 from app.models import EmailCampaign, EmptyReportError
 from app.parsers.base_parser import BaseParser
+from app.parsers.signatures import Signature
+from app.parsers.tokenizer import integer, number_and_percent, sanitize_title, split_quoted_kv, text
 
-def parse_kv(line: str):
-    """Parse key-value pair from CSV format like '"Title:","COVERUP-29-04-2021"'"""
-    parts = [p.strip().strip('"') for p in line.split('","') if p.strip()]
-    if len(parts) >= 2:
-        key = parts[0].strip(':').strip()
-        value = parts[1].strip()
-        return key, value
-    return None, None
 
+# Report key to combination field setter
+COMBINATION_FIELDS = {
+    "Subject Line": text("subject"),
+    "Successful Deliveries": integer("delivered"),
+    "Recipients Who Opened": number_and_percent("opens", "open_rate"),
+    "Recipients Who Clicked": number_and_percent("clicks", "click_rate"),
+    "Total Unsubs": integer("unsubscribes"),
+    "Total Abuse Complaints": integer("spam_complaints"),
+    "Bounces": number_and_percent("bounces", "bounce_rate"),
+}
 
-def extract_number_and_percent(value: str):
-    """Extract number and percentage from strings like '141 (8.1%)'"""
-    if not value:
-        return None, None
-    
-    # Extract main number
-    num_match = re.search(r'([\d,]+)', value)
-    num = int(num_match.group(1).replace(',', '')) if num_match else None
-    
-    # Extract percentage
-    pct_match = re.search(r'\(([\d.]+)%\)', value)
-    pct = float(pct_match.group(1)) / 100 if pct_match else None
-    
-    return num, pct
+# Campaign-wide keys, which appear once before the combinations
+HEADER_FIELDS = {
+    "Title": text("campaign_title"),
+    "Delivery Date/Time": text("delivery_date"),
+}
 
 
-def sanitize_title(subject: str) -> str:
-    """Remove special characters from subject line to create a clean title."""
-    if not subject:
-        return "Untitled"
-    cleaned = re.sub(r'[^\w\s\-.,!?]', '', subject)
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-    return cleaned if cleaned else "Untitled"
+# Fields collected per combination block
+COMBINATION_RECORD = (
+    "subject", "delivered", "opens", "open_rate", "clicks", "click_rate",
+    "unsubscribes", "spam_complaints", "bounces", "bounce_rate",
+)
 
 
-def parse_combination(lines, start_idx):
-    """Parse a single combination's stats from the lines"""
-    data = {
-        "subject": None,
-        "sent_at": None,
-        "delivered": None,
-        "opens": None,
-        "open_rate": None,
-        "clicks": None,
-        "click_rate": None,
-        "unsubscribes": None,
-        "unsubscribe_rate": None,
-        "spam_complaints": None,
-        "bounces": None,
-        "bounce_rate": None,
-    }
-    
-    idx = start_idx
-    while idx < len(lines):
-        line = lines[idx].strip()
-        
-        # Stop if we hit next combination or clicks section
-        if line.startswith('"Combination') or line.startswith('"URL"'):
-            break
-            
-        key, val = parse_kv(line)
-        
-        if key == "Subject Line":
-            data["subject"] = val
-        elif key == "Successful Deliveries":
-            data["delivered"] = int(val.replace(',', ''))
-        elif key == "Recipients Who Opened":
-            num, pct = extract_number_and_percent(val)
-            data["opens"] = num
-            data["open_rate"] = pct
-        elif key == "Recipients Who Clicked":
-            num, pct = extract_number_and_percent(val)
-            data["clicks"] = num
-            data["click_rate"] = pct
-        elif key == "Total Unsubs":
-            data["unsubscribes"] = int(val.replace(',', '')) if val != "0" else 0
-        elif key == "Total Abuse Complaints":
-            data["spam_complaints"] = int(val.replace(',', '')) if val != "0" else 0
-        elif key == "Bounces":
-            num, pct = extract_number_and_percent(val)
-            data["bounces"] = num
-            data["bounce_rate"] = pct
-        
-        idx += 1
-    
-    # Calculate CTOR if we have data
-    if data["opens"] and data["clicks"] and data["opens"] > 0:
-        data["ctor"] = data["clicks"] / data["opens"]
-    else:
-        data["ctor"] = None
-    
-    # Calculate unsubscribe rate if we have delivered count
-    if data["delivered"] and data["unsubscribes"] is not None and data["delivered"] > 0:
-        data["unsubscribe_rate"] = data["unsubscribes"] / data["delivered"]
-    else:
-        data["unsubscribe_rate"] = None
-    
-    return data, idx
+def is_combination_line(line: str) -> bool:
+    return line.startswith('"Combination')
+
+
+def is_combination_header(line: str) -> bool:
+    return is_combination_line(line) and 'Stats' in line
+
+
+def is_url_table(line: str) -> bool:
+    return line.startswith('"Clicks by URL"') or line.startswith('"URL"')
 
 
 class MailChimpABParser(BaseParser):
     """Parser for MailChimp A/B test campaign reports"""
     
-    def can_parse(self, text: str) -> bool:
-        """Check if text is a MailChimp A/B test campaign report"""
-        lines = [l.strip() for l in text.splitlines() if l.strip()]
-        return any("Campaign Report" in line for line in lines[:5]) and \
-               any("Combination" in line and "Stats" in line for line in lines[:20])
+    signatures = (
+        Signature(("Campaign Report",), within=5),
+        Signature(("Combination", "Stats"), within=20),
+    )
+    # "Clicks by URL": URL, Total Clicks, Unique Clicks
+    link_columns = ("total", "unique")
     
-    def parse(self, text: str) -> List[EmailCampaign]:
+    def parse_lines(self, lines: Iterable[str]) -> List[EmailCampaign]:
         """Parse MailChimp individual campaign report (A/B test or single campaign)"""
-        lines = [l.strip() for l in text.splitlines() if l.strip()]
-        
-        campaign_title = None
-        delivery_date = None
-        
-        for i, line in enumerate(lines):
-            key, val = parse_kv(line)
-            if key == "Title":
-                campaign_title = val
-            elif key == "Delivery Date/Time":
-                delivery_date = val
+        campaigns = list(self.iter_campaigns(lines))
+        if not campaigns:
+            raise EmptyReportError("No combinations found in A/B test report")
+        return campaigns
+    
+    def iter_campaigns(self, lines: Iterable[str]) -> Iterator[EmailCampaign]:
+        """
+        Stream combinations in a single pass, yielding each campaign as its block closes.
         
-        campaigns = []
-        i = 0
-        combination_num = 1
+        The campaign-wide header precedes the first block, so only the block being
+        read is held, and reading stops where the "Clicks by URL" table begins.
+        A block opens on a "Combination ... Stats" header and closes on the next
+        line starting with "Combination", whether or not that opens another block.
+        """
+        header = {"campaign_title": None, "delivery_date": None}
+        record = None
+        combination_num = 0
         
-        while i < len(lines):
-            line = lines[i]
+        for raw in lines:
+            line = raw.strip()
+            if not line:
+                continue
+            
+            if is_combination_line(line) or is_url_table(line):
+                if record is not None:
+                    campaign = self._campaign(header, record, combination_num)
+                    if campaign.has_meaningful_data():
+                        yield campaign
+                    record = None
+                if is_url_table(line):
+                    return
+                if is_combination_header(line):
+                    combination_num += 1
+                    record = dict.fromkeys(COMBINATION_RECORD)
+                continue
             
-            if line.startswith('"Combination') and 'Stats' in line:
-                combo_data, next_idx = parse_combination(lines, i + 1)
-                
-                email_title = f"{campaign_title} - Combo {combination_num}" if campaign_title else f"{sanitize_title(combo_data['subject'])} {combination_num}"
-                
-                unique_id = generate_unique_id(
-                    title=campaign_title or "",
-                    subject=combo_data.get('subject', ''),
-                    sent_at=f"{delivery_date}_{combination_num}" if delivery_date else f"combo_{combination_num}",
-                    platform="mailchimp"
-                )
-                
-                campaign = EmailCampaign(
-                    platform="mailchimp_ab",
-                    subject=combo_data.get('subject'),
-                    email_title=email_title,
-                    unique_id=unique_id,
-                    sent_at=delivery_date,
-                    delivered=combo_data.get('delivered'),
-                    opens=combo_data.get('opens'),
-                    open_rate=combo_data.get('open_rate'),
-                    clicks=combo_data.get('clicks'),
-                    click_rate=combo_data.get('click_rate'),
-                    ctor=combo_data.get('ctor'),
-                    unsubscribes=combo_data.get('unsubscribes'),
-                    unsubscribe_rate=combo_data.get('unsubscribe_rate'),
-                    spam_complaints=combo_data.get('spam_complaints'),
-                    bounces=combo_data.get('bounces'),
-                    bounce_rate=combo_data.get('bounce_rate'),
-                    hard_bounces=None,
-                    hard_bounce_rate=None,
-                    soft_bounces=None,
-                    soft_bounce_rate=None,
-                )
-                
-                if campaign.has_meaningful_data():
-                    campaigns.append(campaign)
-                    
-                combination_num += 1
-                i = next_idx
+            key, val = split_quoted_kv(line)
+            if record is None:
+                setter, target = HEADER_FIELDS.get(key), header
             else:
-                i += 1
+                setter, target = COMBINATION_FIELDS.get(key), record
+            if setter is not None:
+                setter(target, val)
         
-        if not campaigns:
-            raise EmptyReportError("No combinations found in A/B test report")
+        if record is not None:
+            campaign = self._campaign(header, record, combination_num)
+            if campaign.has_meaningful_data():
+                yield campaign
+    
+    @staticmethod
+    def _campaign(header: dict, data: dict, combination_num: int) -> EmailCampaign:
+        """Build the campaign of one combination block"""
+        campaign_title = header["campaign_title"]
+        delivery_date = header["delivery_date"]
+        opens = data["opens"]
+        clicks = data["clicks"]
+        delivered = data["delivered"]
+        unsubscribes = data["unsubscribes"]
         
-        return campaigns
+        ctor = clicks / opens if opens and clicks and opens > 0 else None
+        if delivered and unsubscribes is not None and delivered > 0:
+            unsubscribe_rate = unsubscribes / delivered
+        else:
+            unsubscribe_rate = None
+        
+        email_title = f"{campaign_title} - Combo {combination_num}" if campaign_title else f"{sanitize_title(data['subject'])} {combination_num}"
+        
+        unique_id = generate_unique_id(
+            title=campaign_title or "",
+            subject=data["subject"],
+            sent_at=f"{delivery_date}_{combination_num}" if delivery_date else f"combo_{combination_num}",
+            platform="mailchimp"
+        )
+        
+        return EmailCampaign(
+            platform="mailchimp_ab",
+            subject=data["subject"],
+            email_title=email_title,
+            unique_id=unique_id,
+            sent_at=delivery_date,
+            delivered=delivered,
+            opens=opens,
+            open_rate=data["open_rate"],
+            clicks=clicks,
+            click_rate=data["click_rate"],
+            ctor=ctor,
+            unsubscribes=unsubscribes,
+            unsubscribe_rate=unsubscribe_rate,
+            spam_complaints=data["spam_complaints"],
+            bounces=data["bounces"],
+            bounce_rate=data["bounce_rate"],
+            hard_bounces=None,
+            hard_bounce_rate=None,
+            soft_bounces=None,
+            soft_bounce_rate=None,
+        )
 
 
 def parse_mailchimp_ab(text: str):
@@ -1,97 +1,165 @@
-import csv
-from io import StringIO
-from typing import List
-from datetime import datetime
-from app.utils.id_generator import generate_unique_id, normalize_datetime
-from app.models import EmailCampaign, EmptyReportError
+import io
+from typing import Iterable, List, Tuple
+import numpy as np
+import pandas as pd
+from app.utils.id_generator import DateNormalizer, generate_unique_ids
+from app.models import CampaignBatch, EmailCampaign, EmptyReportError
 from app.parsers.base_parser import BaseParser
+from app.parsers.signatures import Signature
+from app.parsers.tokenizer import INTEGER_PATTERN
+
+
+class _LineReader(io.TextIOBase):
+    """Read-only file-like view over an iterator of lines, so pandas can consume a stream"""
+
+    def __init__(self, lines: Iterable[str]):
+        self._lines = iter(lines)
+        self._pending = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        if size is None or size < 0:
+            data, self._pending = self._pending + "".join(self._lines), ""
+            return data
+
+        chunks = [self._pending]
+        length = len(self._pending)
+        for line in self._lines:
+            chunks.append(line)
+            length += len(line)
+            if length >= size:
+                break
+        data = "".join(chunks)
+        self._pending = data[size:]
+        return data[:size]
+
+
+def _int_column(frame: pd.DataFrame, name: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert a column to int64 the way int() would, returning values and a validity mask"""
+    if name not in frame:
+        return np.zeros(len(frame), dtype=np.int64), np.ones(len(frame), dtype=bool)
+
+    column = frame[name].str.strip()
+    valid = column.str.fullmatch(INTEGER_PATTERN).to_numpy(dtype=bool)
+    values = pd.to_numeric(column.where(valid, "0"), errors="coerce").fillna(0)
+    return values.to_numpy(dtype=np.int64), valid
+
+
+def _rate_column(frame: pd.DataFrame, name: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert a percentage column like '27.78%' to a ratio, returning values and a validity mask"""
+    if name not in frame:
+        return np.zeros(len(frame), dtype=np.float64), np.ones(len(frame), dtype=bool)
+
+    column = frame[name].str.strip("%")
+    values = pd.to_numeric(column.where(column != "", "0"), errors="coerce").to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    return np.where(valid, values / 100, 0.0), valid
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise numerator / denominator, 0 where the denominator is not positive"""
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros(len(numerator), dtype=np.float64),
+        where=denominator > 0
+    )
 
 
 class MailChimpAggregatedParser(BaseParser):
     """Parser for aggregated MailChimp CSV campaign reports"""
-    
-    def can_parse(self, text: str) -> bool:
-        """Check if text is a MailChimp aggregated report"""
-        return 'Unique Id' in text and 'Send Date' in text and 'Open Rate' in text
-    
-    def parse(self, text: str) -> List[EmailCampaign]:
+
+    signatures = (
+        Signature(("Unique Id", "Send Date", "Open Rate"), within=5),
+    )
+
+    def parse_lines(self, lines: Iterable[str]) -> List[EmailCampaign]:
         """Parse aggregated MailChimp CSV campaign report"""
-        reader = csv.DictReader(StringIO(text))
-        campaigns = []
-        
-        for row in reader:
-            try:
-                sent_at_raw = row.get('Send Date', '')
-                sent_at = normalize_datetime(sent_at_raw)
-                
-                delivered = int(row.get('Successful Deliveries', 0))
-                
-                open_rate_str = row.get('Open Rate', '0%').strip('%')
-                open_rate = float(open_rate_str) / 100 if open_rate_str else 0
-                
-                opens = int(row.get('Unique Opens', 0))
-                
-                click_rate_str = row.get('Click Rate', '0%').strip('%')
-                click_rate = float(click_rate_str) / 100 if click_rate_str else 0
-                
-                clicks = int(row.get('Unique Clicks', 0))
-                
-                hard_bounces = int(row.get('Hard Bounces', 0))
-                soft_bounces = int(row.get('Soft Bounces', 0))
-                
-                unsubscribes = int(row.get('Unsubscribes', 0))
-                
-                spam_complaints = int(row.get('Abuse Complaints', 0))
-                
-                hard_bounce_rate = hard_bounces / delivered if delivered > 0 else 0
-                soft_bounce_rate = soft_bounces / delivered if delivered > 0 else 0
-                unsubscribe_rate = unsubscribes / delivered if delivered > 0 else 0
-                
-                ctor = clicks / opens if opens > 0 else 0
-                
-                subject = row.get('Subject', '')
-                email_title = row.get('Title', '')
-                
-                unique_id = generate_unique_id(
-                    title=email_title,
-                    subject=subject,
-                    sent_at=sent_at,
-                    platform="mailchimp"
-                )
-                
-                campaign = EmailCampaign(
-                    platform="mailchimp_aggregated",
-                    subject=subject,
-                    email_title=email_title,
-                    unique_id=unique_id,
-                    sent_at=sent_at,
-                    delivered=delivered,
-                    opens=opens,
-                    open_rate=open_rate,
-                    clicks=clicks,
-                    click_rate=click_rate,
-                    ctor=ctor,
-                    unsubscribes=unsubscribes,
-                    unsubscribe_rate=unsubscribe_rate,
-                    spam_complaints=spam_complaints,
-                    hard_bounces=hard_bounces,
-                    hard_bounce_rate=hard_bounce_rate,
-                    soft_bounces=soft_bounces,
-                    soft_bounce_rate=soft_bounce_rate,
-                    bounces=None,
-                    bounce_rate=None,
-                )
-                
-                if campaign.has_meaningful_data():
-                    campaigns.append(campaign)
-                
-            except (ValueError, KeyError) as e:
-                continue
-        
-        if not campaigns:
+        return list(self.parse_batch(lines))
+
+    def parse_batch(self, lines: Iterable[str]) -> CampaignBatch:
+        """Parse aggregated MailChimp CSV campaign report straight into columns"""
+        try:
+            # Rows with extra trailing fields keep their named columns and drop the rest, as
+            # csv.DictReader did; index_col=False stops a long first row becoming the index
+            frame = pd.read_csv(
+                _LineReader(lines),
+                dtype=str,
+                keep_default_na=False,
+                skip_blank_lines=True,
+                index_col=False,
+                usecols=lambda name: True
+            )
+        except pd.errors.EmptyDataError:
             raise EmptyReportError("No valid campaigns found in aggregated report")
-        
-        return campaigns
+
+        frame = frame.fillna("")
+
+        delivered, valid = _int_column(frame, 'Successful Deliveries')
+        opens, opens_valid = _int_column(frame, 'Unique Opens')
+        clicks, clicks_valid = _int_column(frame, 'Unique Clicks')
+        hard_bounces, hard_valid = _int_column(frame, 'Hard Bounces')
+        soft_bounces, soft_valid = _int_column(frame, 'Soft Bounces')
+        unsubscribes, unsubs_valid = _int_column(frame, 'Unsubscribes')
+        spam_complaints, spam_valid = _int_column(frame, 'Abuse Complaints')
+        open_rate, open_rate_valid = _rate_column(frame, 'Open Rate')
+        click_rate, click_rate_valid = _rate_column(frame, 'Click Rate')
+
+        subject = frame['Subject'] if 'Subject' in frame else pd.Series([""] * len(frame), dtype=str)
+        email_title = frame['Title'] if 'Title' in frame else pd.Series([""] * len(frame), dtype=str)
+        sent_at_raw = frame['Send Date'] if 'Send Date' in frame else pd.Series([""] * len(frame), dtype=str)
+
+        # Rows with malformed numbers are skipped, as are rows without meaningful data
+        keep = (
+            valid & opens_valid & clicks_valid & hard_valid & soft_valid
+            & unsubs_valid & spam_valid & open_rate_valid & click_rate_valid
+            & (delivered > 0)
+            & (subject.str.strip() != "").to_numpy(dtype=bool)
+            & (email_title.str.strip() != "").to_numpy(dtype=bool)
+            & (sent_at_raw.str.strip() != "").to_numpy(dtype=bool)
+        )
+
+        hard_bounce_rate = _ratio(hard_bounces, delivered)
+        soft_bounce_rate = _ratio(soft_bounces, delivered)
+        unsubscribe_rate = _ratio(unsubscribes, delivered)
+        ctor = _ratio(clicks, opens)
+
+        rows = np.flatnonzero(keep)
+        if len(rows) == 0:
+            raise EmptyReportError("No valid campaigns found in aggregated report")
+
+        # Each distinct send date is normalized once, then broadcast back to its rows
+        normalize_datetime = DateNormalizer()
+        sent_at_codes, sent_at_values = pd.factorize(sent_at_raw.to_numpy()[rows])
+        sent_at = np.array([normalize_datetime(value) for value in sent_at_values], dtype=object)[sent_at_codes]
+
+        columns = {
+            "platform": ["mailchimp_aggregated"] * len(rows),
+            "subject": subject.to_numpy()[rows].tolist(),
+            "email_title": email_title.to_numpy()[rows].tolist(),
+            "sent_at": sent_at.tolist(),
+            "delivered": delivered[rows].tolist(),
+            "opens": opens[rows].tolist(),
+            "open_rate": open_rate[rows].tolist(),
+            "clicks": clicks[rows].tolist(),
+            "click_rate": click_rate[rows].tolist(),
+            "ctor": ctor[rows].tolist(),
+            "unsubscribes": unsubscribes[rows].tolist(),
+            "unsubscribe_rate": unsubscribe_rate[rows].tolist(),
+            "spam_complaints": spam_complaints[rows].tolist(),
+            "hard_bounces": hard_bounces[rows].tolist(),
+            "hard_bounce_rate": hard_bounce_rate[rows].tolist(),
+            "soft_bounces": soft_bounces[rows].tolist(),
+            "soft_bounce_rate": soft_bounce_rate[rows].tolist(),
+        }
+        # Send dates were normalized above, so the ID pass does not repeat it
+        columns["unique_id"] = generate_unique_ids(
+            columns["email_title"], columns["subject"], columns["sent_at"], "mailchimp", normalized=True
+        )
+
+        return CampaignBatch(columns)
 
 
 def parse_mailchimp_aggregated(text: str):
@@ -1,124 +1,108 @@
-import re
-from typing import List
+from typing import Iterable, List
 from app.utils.id_generator import generate_unique_id
 from app.models import EmailCampaign, EmptyReportError
 from app.parsers.base_parser import BaseParser
-
-def parse_kv(line: str):
-    parts = [p.strip().strip('"') for p in line.split(",") if p.strip()]
-    if len(parts) >= 2:
-        return parts[0], parts[1]
-    return None, None
-
-
-def extract_number_and_percent(value: str):
-    """Extract numeric value and percentage from a string like "1,234 (56.7%)"""
-    if not value:
-        return None, None
-    
-    num_match = re.search(r"([\d,]+)", value)
-    pct_match = re.search(r"\(([\d.]+)%\)", value)
-
-    num = int(num_match.group(1).replace(",", "")) if num_match else None
-    pct = float(pct_match.group(1)) / 100 if pct_match else None
-
-    return num, pct
-
-
-def sanitize_title(subject: str) -> str:
-    """Remove special characters from subject line to create a clean title."""
-    if not subject:
-        return "Untitled"
-    cleaned = re.sub(r'[^\w\s\-.,!?]', '', subject)
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-    return cleaned if cleaned else "Untitled"
+from app.parsers.signatures import Signature
+from app.parsers.tokenizer import (
+    integer, number, number_and_percent, sanitize_title, split_kv, text,
+)
+
+
+SECTION_HEADERS = {
+    'Campaign report': "campaign_report",
+    '"Campaign results"': "campaign_results",
+    '"Bad statistics"': "bad_statistics",
+    '"Reading environment"': "reading_environment",
+    '"Links activity"': "links_activity",
+}
+
+# Report key to campaign field setter, per section
+SECTION_FIELDS = {
+    "campaign_report": {
+        "Subject:": text("subject"),
+        "Sent": text("sent_at"),
+    },
+    "campaign_results": {
+        "Total emails sent:": integer("delivered"),
+        "Opened:": number_and_percent("opens", "open_rate"),
+        "Clicked:": number_and_percent("clicks", "click_rate"),
+    },
+    "bad_statistics": {
+        "Unsubscribed:": number_and_percent("unsubscribes", "unsubscribe_rate"),
+        "Spam complaints:": number("spam_complaints"),
+        "Hard bounce:": number_and_percent("hard_bounces", "hard_bounce_rate"),
+        "Soft bounce:": number_and_percent("soft_bounces", "soft_bounce_rate"),
+    },
+}
+
+FIELDS = (
+    "subject", "sent_at", "delivered", "opens", "open_rate", "clicks", "click_rate",
+    "unsubscribes", "unsubscribe_rate", "spam_complaints",
+    "hard_bounces", "hard_bounce_rate", "soft_bounces", "soft_bounce_rate",
+)
 
 
 class MailerLiteClassicParser(BaseParser):
     """Parser for MailerLite Classic campaign reports"""
     
-    def can_parse(self, text: str) -> bool:
-        """Check if text is a MailerLite Classic report"""
-        return 'Campaign report' in text and 'Campaign results' in text
+    signatures = (
+        Signature(("Campaign report",), within=5),
+        Signature(("Campaign results",)),
+    )
+    # "Links activity": Links, Unique clicks, Total clicks
+    link_columns = ("unique", "total")
     
-    def parse(self, text: str) -> List[EmailCampaign]:
-        """Parse MailerLite Classic campaign report"""
-        lines = [l.strip() for l in text.splitlines() if l.strip()]
-
-        if not lines:
-            raise EmptyReportError("Empty report")
-
+    def parse_lines(self, lines: Iterable[str]) -> List[EmailCampaign]:
+        """
+        Parse MailerLite Classic campaign report.
+
+        Lines are consumed as a section-driven state machine: lines outside the
+        sections holding campaign fields are skipped without being split, and
+        reading stops at the first header after every such section has ended,
+        so the "Links activity" table is never walked. A key repeated within its
+        section keeps its last value.
+        """
         section = None
-
-        subject = None
-        sent_at = None
-        delivered = None
-        opens = None
-        open_rate = None
-        clicks = None
-        click_rate = None
-        unsubscribes = None
-        unsubscribe_rate = None
-        spam_complaints = None
-        hard_bounces = None
-        hard_bounce_rate = None
-        soft_bounces = None
-        soft_bounce_rate = None
-
-        for line in lines:
-            if line == 'Campaign report':
-                section = "campaign_report"
+        fields = None
+        record = dict.fromkeys(FIELDS)
+        # Sections holding campaign fields that have not ended yet
+        pending = set(SECTION_FIELDS)
+        empty = True
+
+        for raw in lines:
+            line = raw.strip()
+            if not line:
                 continue
-            elif line == '"Campaign results"':
-                section = "campaign_results"
-                continue
-            elif line == '"Bad statistics"':
-                section = "bad_statistics"
-                continue
-            elif line == '"Links activity"':
-                section = "links_activity"
+            empty = False
+
+            header = SECTION_HEADERS.get(line)
+            if header is not None:
+                # A section ends where the next one begins
+                pending.discard(section)
+                if not pending:
+                    break
+                section = header
+                fields = SECTION_FIELDS.get(section) if section in pending else None
                 continue
 
-            if section == "campaign_report":
-                key, val = parse_kv(line)
-                if key == "Subject:":
-                    subject = val
-                elif key == "Sent":
-                    sent_at = val
-
-            elif section == "campaign_results":
-                key, val = parse_kv(line)
-                if key == "Total emails sent:":
-                    delivered = int(val.replace(",", ""))
-                elif key == "Opened:":
-                    num, pct = extract_number_and_percent(val)
-                    opens = num
-                    open_rate = pct
-                elif key == "Clicked:":
-                    num, pct = extract_number_and_percent(val)
-                    clicks = num
-                    click_rate = pct
-
-            elif section == "bad_statistics":
-                key, val = parse_kv(line)
-                num, pct = extract_number_and_percent(val)
-                if key == "Unsubscribed:":
-                    unsubscribes = num
-                    unsubscribe_rate = pct
-                elif key == "Spam complaints:":
-                    spam_complaints = num
-                elif key == "Hard bounce:":
-                    hard_bounces = num
-                    hard_bounce_rate = pct
-                elif key == "Soft bounce:":
-                    soft_bounces = num
-                    soft_bounce_rate = pct
+            if fields is not None:
+                key, val = split_kv(line)
+                setter = fields.get(key)
+                if setter is not None:
+                    setter(record, val)
+
+        if empty:
+            raise EmptyReportError("Empty report")
 
+        opens = record["opens"]
+        clicks = record["clicks"]
         if opens and clicks:
             ctor = clicks / opens
         else:
             ctor = None
 
+        subject = record["subject"]
+        sent_at = record["sent_at"]
         title = sanitize_title(subject or "")
         
         unique_id = generate_unique_id(
@@ -134,21 +118,21 @@ class MailerLiteClassicParser(BaseParser):
             email_title=title,
             unique_id=unique_id,
             sent_at=sent_at,
-            delivered=delivered,
+            delivered=record["delivered"],
             opens=opens,
-            open_rate=open_rate,
+            open_rate=record["open_rate"],
             clicks=clicks,
-            click_rate=click_rate,
+            click_rate=record["click_rate"],
             ctor=ctor,
-            unsubscribes=unsubscribes,
-            unsubscribe_rate=unsubscribe_rate,
-            spam_complaints=spam_complaints,
+            unsubscribes=record["unsubscribes"],
+            unsubscribe_rate=record["unsubscribe_rate"],
+            spam_complaints=record["spam_complaints"],
             bounces=None,
             bounce_rate=None,
-            hard_bounces=hard_bounces,
-            hard_bounce_rate=hard_bounce_rate,
-            soft_bounces=soft_bounces,
-            soft_bounce_rate=soft_bounce_rate,
+            hard_bounces=record["hard_bounces"],
+            hard_bounce_rate=record["hard_bounce_rate"],
+            soft_bounces=record["soft_bounces"],
+            soft_bounce_rate=record["soft_bounce_rate"],
         )
         
         if not campaign.has_meaningful_data():
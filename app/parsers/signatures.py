@@ -0,0 +1,73 @@
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+
+# Non-empty lines inspected by default when fingerprinting a report
+PREFIX_LINES = 20
+# Hard cap on physical lines read, so a run of blank lines cannot defeat the prefix bound
+MAX_SCAN_LINES = 1000
+
+
+class Signature(NamedTuple):
+    """Markers that must all appear together on one of the first `within` non-empty lines"""
+    markers: Tuple[str, ...]
+    within: int = PREFIX_LINES
+
+
+class Fingerprint(NamedTuple):
+    """Result of fingerprinting: the winning candidate (or None) and the raw lines consumed"""
+    parser: Optional[object]
+    prefix: List[str]
+
+
+def fingerprint(candidates: Sequence, lines: Iterable[str]) -> Fingerprint:
+    """
+    Match the signatures of all candidates against a bounded prefix in a single pass.
+
+    Candidates are checked in priority order: the first one whose signatures are all
+    satisfied wins. Reading stops as soon as the winner is certain, or once the
+    largest signature window has been consumed, so cost is O(prefix) regardless of
+    document size. Consumed lines are returned so the caller can replay them.
+    """
+    signatures = [tuple(candidate.signatures) for candidate in candidates]
+    markers = {marker for sigs in signatures for sig in sigs for marker in sig.markers}
+    window = max((sig.within for sigs in signatures for sig in sigs), default=0)
+    pending = [set(range(len(sigs))) for sigs in signatures]
+    dead = [not sigs for sigs in signatures]
+
+    prefix: List[str] = []
+    seen = 0
+    for raw in lines:
+        prefix.append(raw)
+        line = raw.strip()
+        if line:
+            found = {marker for marker in markers if marker in line}
+            for c, sigs in enumerate(signatures):
+                if dead[c]:
+                    continue
+                for s in list(pending[c]):
+                    sig = sigs[s]
+                    if seen < sig.within and found.issuperset(sig.markers):
+                        pending[c].discard(s)
+                    elif seen + 1 >= sig.within:
+                        # Window closed without a match
+                        dead[c] = True
+                        break
+            seen += 1
+
+            for c, candidate in enumerate(candidates):
+                if dead[c]:
+                    continue
+                if not pending[c]:
+                    return Fingerprint(candidate, prefix)
+                # A higher-priority candidate is still undecided
+                break
+            else:
+                return Fingerprint(None, prefix)
+
+        if seen >= window or len(prefix) >= MAX_SCAN_LINES:
+            break
+
+    for c, candidate in enumerate(candidates):
+        if not dead[c] and not pending[c]:
+            return Fingerprint(candidate, prefix)
+    return Fingerprint(None, prefix)
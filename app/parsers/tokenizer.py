@@ -0,0 +1,147 @@
+import csv
+import re
+from typing import Callable, Iterable, List, Optional, Tuple
+from app.models import LinkClicks
+
+
+# Compiled once at import instead of on every line
+NUMBER_PATTERN = re.compile(r"[\d,]+")
+PERCENT_PATTERN = re.compile(r"\(([\d.]+)%\)")
+TITLE_STRIP_PATTERN = re.compile(r"[^\w\s\-.,!?]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# Whole-value integer check, shared with the vectorized aggregated parser
+INTEGER_PATTERN = r"[+-]?\d+"
+
+KeyValue = Tuple[Optional[str], Optional[str]]
+Setter = Callable[[dict, str], None]
+
+
+def _split_pair(line: str, separator: str) -> KeyValue:
+    """First two non-blank fields of a line, with whitespace and quotes stripped"""
+    parts = line.split(separator)
+    if len(parts) >= 2:
+        # Common case: the first two fields are both populated, so nothing needs filtering
+        key = parts[0].strip().strip('"')
+        value = parts[1].strip().strip('"')
+        if key and value:
+            return key, value
+
+    parts = [p.strip().strip('"') for p in parts if p.strip()]
+    if len(parts) >= 2:
+        return parts[0], parts[1]
+    return None, None
+
+
+def split_kv(line: str) -> KeyValue:
+    """Parse a comma separated pair like '"Subject:","Hello"', keeping the key as written"""
+    return _split_pair(line, ",")
+
+
+def split_quoted_kv(line: str) -> KeyValue:
+    """Parse a quoted CSV pair like '"Title:","Summer Sale"' into ('Title', 'Summer Sale')"""
+    parts = line.split('","')
+    if len(parts) >= 2:
+        key = parts[0].strip().strip('"')
+        value = parts[1].strip().strip('"')
+        if key and value:
+            return key.strip(':').strip(), value.strip()
+
+    key, value = _split_pair(line, '","')
+    if key is None:
+        return None, None
+    return key.strip(':').strip(), value.strip()
+
+
+def parse_int(value: str) -> int:
+    """Parse an integer that may contain thousands separators, like '1,234'"""
+    return int(value.replace(",", ""))
+
+
+def _plain_number(value: str) -> bool:
+    """Whether the whole value is digits and thousands separators, so it is its own first match"""
+    return value.replace(",", "").isdecimal()
+
+
+def extract_number(value: str) -> Optional[int]:
+    """Extract the leading number from a string like '1,234 (56.7%)'"""
+    if not value:
+        return None
+    head = value.partition(" (")[0]
+    if _plain_number(head):
+        return int(head.replace(",", ""))
+    match = NUMBER_PATTERN.search(value)
+    return int(match.group().replace(",", "")) if match else None
+
+
+def extract_number_and_percent(value: str) -> Tuple[Optional[int], Optional[float]]:
+    """Extract numeric value and percentage from a string like '1,234 (56.7%)'"""
+    if not value:
+        return None, None
+
+    # Fast path for the usual "count" and "count (rate%)" shapes, without any regex
+    head, separator, tail = value.partition(" (")
+    if _plain_number(head):
+        if not separator:
+            return int(head.replace(",", "")), None
+        if tail.endswith("%)") and tail[:-2].replace(".", "").isdecimal():
+            return int(head.replace(",", "")), float(tail[:-2]) / 100
+
+    pct_match = PERCENT_PATTERN.search(value)
+    return extract_number(value), float(pct_match.group(1)) / 100 if pct_match else None
+
+
+def parse_link_table(lines: Iterable[str], columns: Tuple[str, str]) -> List[LinkClicks]:
+    """
+    Read per-URL click rows like '"https://…","12","9"' from the rest of a report.
+
+    `columns` names the two count columns after the URL, "unique" and "total",
+    in the order the report lists them. Rows that are not a URL and two counts,
+    such as the table's own header, are skipped.
+    """
+    unique_at = columns.index("unique") + 1
+    total_at = columns.index("total") + 1
+    links = []
+    for row in csv.reader(line for line in lines if line.strip()):
+        if len(row) != 3:
+            continue
+        unique, total = row[unique_at].strip(), row[total_at].strip()
+        if _plain_number(unique) and _plain_number(total):
+            links.append(LinkClicks(row[0].strip(), parse_int(unique), parse_int(total)))
+    return links
+
+
+def sanitize_title(subject: str) -> str:
+    """Remove special characters from subject line to create a clean title."""
+    if not subject:
+        return "Untitled"
+    cleaned = TITLE_STRIP_PATTERN.sub('', subject)
+    cleaned = WHITESPACE_PATTERN.sub(' ', cleaned).strip()
+    return cleaned if cleaned else "Untitled"
+
+
+def text(field: str) -> Setter:
+    """Setter storing the raw value"""
+    def setter(record: dict, value: str):
+        record[field] = value
+    return setter
+
+
+def integer(field: str) -> Setter:
+    """Setter storing the value parsed as an integer"""
+    def setter(record: dict, value: str):
+        record[field] = parse_int(value)
+    return setter
+
+
+def number(field: str) -> Setter:
+    """Setter storing the leading number of a 'count (rate%)' value"""
+    def setter(record: dict, value: str):
+        record[field] = extract_number(value)
+    return setter
+
+
+def number_and_percent(count_field: str, rate_field: str) -> Setter:
+    """Setter storing both halves of a 'count (rate%)' value"""
+    def setter(record: dict, value: str):
+        record[count_field], record[rate_field] = extract_number_and_percent(value)
+    return setter
@@ -0,0 +1,301 @@
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.models import CampaignBatch
+from app.utils.id_generator import DateNormalizer
+
+
+# Metrics averaged across the selected campaigns
+AVERAGED_FIELDS = (
+    "delivered",
+    "opens",
+    "open_rate",
+    "clicks",
+    "click_rate",
+    "ctor",
+    "unsubscribes",
+    "unsubscribe_rate",
+    "hard_bounces",
+    "hard_bounce_rate",
+    "soft_bounces",
+    "soft_bounce_rate",
+)
+
+# Metrics charted over time; rates are reported as percentages, as they are displayed
+TREND_FIELDS = (
+    "delivered",
+    "opens",
+    "clicks",
+    "open_rate",
+    "click_rate",
+    "ctor",
+    "unsubscribe_rate",
+    "hard_bounce_rate",
+    "soft_bounce_rate",
+)
+PERCENT_FIELDS = {field for field in TREND_FIELDS if field.endswith("_rate") or field == "ctor"}
+
+# Metrics flagged for outliers when campaigns are parsed
+OUTLIER_METRICS = (
+    "delivered",
+    "open_rate",
+    "click_rate",
+    "ctor",
+    "unsubscribe_rate",
+    "hard_bounce_rate",
+    "soft_bounce_rate",
+)
+# "iqr": outside 1.5 IQR of the metric, as the dashboard has always done
+# "zscore": more than Z_SCORE_THRESHOLD standard deviations from the metric's mean
+OUTLIER_METHODS = ("iqr", "zscore")
+Z_SCORE_THRESHOLD = 3.0
+
+# Fewer campaigns than this and quartiles are meaningless
+MIN_OUTLIER_CAMPAIGNS = 4
+# Campaigns delivering under this share of the median are flagged as low volume
+LOW_VOLUME_RATIO = 0.5
+
+# What normalize_datetime produces when it recognizes a date
+NORMALIZED_DATETIME = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}")
+
+# Send-time heatmap grid: weekdays (Sunday = 0) by hours
+HEATMAP_DAYS = 7
+HEATMAP_HOURS = 24
+# Cell of a campaign whose send time cannot be read
+NO_SEND_CELL = -1
+
+
+def metric_column(batch: CampaignBatch, field: str, rows: Optional[Sequence[int]] = None) -> np.ndarray:
+    """A metric as float64, with missing or non-numeric values read as 0"""
+    values = batch.columns[field]
+    if rows is not None:
+        values = [values[row] for row in rows]
+    return float_column(values)
+
+
+def float_column(values: Sequence) -> np.ndarray:
+    """Values as float64, with missing or non-numeric values read as 0"""
+    try:
+        # None becomes NaN here, and numeric strings are read the way the dashboard reads them
+        column = np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        column = np.array([_number(value) for value in values], dtype=np.float64)
+    return np.nan_to_num(column, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def trendlines(series: np.ndarray) -> np.ndarray:
+    """Least-squares line through each row of a (metrics, campaigns) array, against x = 0..n-1"""
+    n = series.shape[1]
+    if n < 2:
+        return series.copy()
+
+    x = np.arange(n, dtype=np.float64)
+    sum_x = x.sum()
+    sum_xx = (x * x).sum()
+    sum_y = series.sum(axis=1)
+    sum_xy = series @ x
+
+    slope = (n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x * sum_x)
+    intercept = (sum_y - slope * sum_x) / n
+    return slope[:, None] * x + intercept[:, None]
+
+
+def outlier_mask(metrics: np.ndarray, method: str = "iqr") -> np.ndarray:
+    """
+    Outliers of each row of a (metrics, campaigns) array, all rows in one pass.
+
+    IQR quartiles are taken at floor(n * q) of the sorted values, as the dashboard
+    took them; z-scores use the population standard deviation, and a constant
+    metric has no outliers.
+    """
+    if method not in OUTLIER_METHODS:
+        raise ValueError(f"Unknown outlier method: {method}")
+    n = metrics.shape[1]
+    if n < MIN_OUTLIER_CAMPAIGNS:
+        return np.zeros(metrics.shape, dtype=bool)
+
+    if method == "zscore":
+        mean = metrics.mean(axis=1, keepdims=True)
+        std = metrics.std(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.abs(metrics - mean) / std
+        return (std > 0) & (scores > Z_SCORE_THRESHOLD)
+
+    ordered = np.sort(metrics, axis=1)
+    q1 = ordered[:, int(n * 0.25), None]
+    q3 = ordered[:, int(n * 0.75), None]
+    iqr = q3 - q1
+    return (metrics < q1 - 1.5 * iqr) | (metrics > q3 + 1.5 * iqr)
+
+
+def delivery_outliers(delivered: np.ndarray) -> List[int]:
+    """Indices outside 1.5 IQR of deliveries"""
+    return np.flatnonzero(outlier_mask(delivered[None, :])[0]).tolist()
+
+
+def low_volume_mask(delivered: np.ndarray) -> np.ndarray:
+    """Campaigns that delivered something, but under half the median of campaigns that did"""
+    sent = delivered[delivered > 0]
+    if len(delivered) < 2 or len(sent) < 2:
+        return np.zeros(delivered.shape, dtype=bool)
+
+    threshold = np.median(sent) * LOW_VOLUME_RATIO
+    return (delivered > 0) & (delivered < threshold)
+
+
+def low_volume(delivered: np.ndarray) -> List[int]:
+    """Indices of low-volume campaigns"""
+    return np.flatnonzero(low_volume_mask(delivered)).tolist()
+
+
+def campaign_flags(entries: Sequence[Tuple[CampaignBatch, int]], method: str = "iqr") -> dict:
+    """
+    Per-metric outlier and low-volume indices for campaigns spread over several batches.
+
+    Indices are positions in `entries`, so a client can toggle flagged campaigns
+    without rescanning them.
+    """
+    metrics = np.empty((len(OUTLIER_METRICS), len(entries)), dtype=np.float64)
+    for index, field in enumerate(OUTLIER_METRICS):
+        metrics[index] = float_column([batch.columns[field][row] for batch, row in entries])
+    mask = outlier_mask(metrics, method)
+
+    return {
+        "method": method,
+        "outliers": {field: np.flatnonzero(mask[index]).tolist() for index, field in enumerate(OUTLIER_METRICS)},
+        "low_volume": np.flatnonzero(low_volume_mask(metrics[0])).tolist(),
+    }
+
+
+def send_time_cells(sent_at: Sequence[Optional[str]], normalizer: Optional[DateNormalizer] = None) -> np.ndarray:
+    """Heatmap cell (weekday * 24 + hour) of each send time, or NO_SEND_CELL where it cannot be read"""
+    normalize = normalizer or DateNormalizer()
+    # Reports repeat send dates, so each distinct value is normalized once; anything but a string is unreadable
+    distinct: Dict[Optional[str], int] = {}
+    codes = np.fromiter(
+        (distinct.setdefault(value if isinstance(value, str) else None, len(distinct)) for value in sent_at),
+        dtype=np.int64,
+        count=len(sent_at)
+    )
+    stamps = [normalize(value or "") for value in distinct]
+    valid = np.array([NORMALIZED_DATETIME.fullmatch(stamp) is not None for stamp in stamps], dtype=bool)
+    iso = [stamp.replace(" ", "T") for stamp, ok in zip(stamps, valid) if ok]
+    try:
+        times = np.array(iso, dtype="datetime64[m]")
+    except ValueError:
+        # Right shape but out of range, like "2021-02-30 10:00"; only those are dropped
+        times = np.array([_datetime64(stamp) for stamp in iso], dtype="datetime64[m]")
+    readable = ~np.isnat(times)
+    minutes = times[readable].astype(np.int64)
+
+    cells = np.full(len(stamps), NO_SEND_CELL, dtype=np.int16)
+    # 1970-01-01 was a Thursday
+    weekdays = (minutes // (24 * 60) + 4) % HEATMAP_DAYS
+    hours = (minutes // 60) % HEATMAP_HOURS
+    cells[np.flatnonzero(valid)[readable]] = weekdays * HEATMAP_HOURS + hours
+    return cells[codes]
+
+
+class SendTimeHeatmap:
+    """Campaign counts and metric totals binned by weekday and hour of sending, in fixed (7, 24) arrays"""
+
+    def __init__(self):
+        shape = (HEATMAP_DAYS, HEATMAP_HOURS)
+        self.counts = np.zeros(shape, dtype=np.int64)
+        self.open_rate_totals = np.zeros(shape, dtype=np.float64)
+        self.delivered_totals = np.zeros(shape, dtype=np.float64)
+
+    def add(self, batch: CampaignBatch, rows: Sequence[int], cells: np.ndarray) -> "SendTimeHeatmap":
+        """Bin the given rows of a batch, whose send cells from send_time_cells are `cells`"""
+        sent = cells != NO_SEND_CELL
+        cells = cells[sent]
+
+        size = HEATMAP_DAYS * HEATMAP_HOURS
+        bins = lambda weights=None: np.bincount(cells, weights=weights, minlength=size).reshape(self.counts.shape)
+        self.counts += bins()
+        self.open_rate_totals += bins(metric_column(batch, "open_rate", rows)[sent])
+        self.delivered_totals += bins(metric_column(batch, "delivered", rows)[sent])
+        return self
+
+    def mean(self, totals: np.ndarray) -> np.ndarray:
+        """Per-cell mean of a metric's totals, 0 where nothing was sent"""
+        return np.divide(totals, self.counts, out=np.zeros(totals.shape), where=self.counts > 0)
+
+
+def send_time_heatmap(batch: CampaignBatch, rows: Sequence[int]) -> List[dict]:
+    """Non-empty weekday/hour cells (Sunday = 0) with counts, mean open rate and campaign titles"""
+    sent_at = batch.columns["sent_at"]
+    cells = send_time_cells([sent_at[row] for row in rows])
+    heatmap = SendTimeHeatmap().add(batch, rows, cells)
+    open_rates = heatmap.mean(heatmap.open_rate_totals) * 100
+
+    titles: Dict[int, List[str]] = {}
+    for cell, row in zip(cells.tolist(), rows):
+        if cell != NO_SEND_CELL:
+            titles.setdefault(cell, []).append(_title(batch, row))
+
+    return [
+        {
+            "day": day,
+            "hour": hour,
+            "count": int(heatmap.counts[day, hour]),
+            "avg_open_rate": float(open_rates[day, hour]),
+            "total_delivered": float(heatmap.delivered_totals[day, hour]),
+            "campaigns": titles[day * HEATMAP_HOURS + hour],
+        }
+        for day, hour in zip(*(index.tolist() for index in np.nonzero(heatmap.counts)))
+    ]
+
+
+def campaign_analytics(batch: CampaignBatch, selected: Optional[Sequence[int]] = None) -> dict:
+    """
+    Everything the dashboard derives from its campaigns, computed column-wise.
+
+    Outlier and low-volume indices cover every campaign in the batch, so they can be
+    toggled in and out of the selection; averages, trends and the heatmap cover the
+    selected campaigns, in selection order.
+    """
+    size = len(batch)
+    rows = [row for row in (range(size) if selected is None else selected) if 0 <= row < size]
+
+    averages = {
+        field: float(metric_column(batch, field, rows).mean()) if rows else 0.0
+        for field in AVERAGED_FIELDS
+    }
+
+    series = np.empty((len(TREND_FIELDS), len(rows)), dtype=np.float64)
+    for index, field in enumerate(TREND_FIELDS):
+        series[index] = metric_column(batch, field, rows) * (100 if field in PERCENT_FIELDS else 1)
+    trend = trendlines(series)
+
+    delivered = metric_column(batch, "delivered")
+    return {
+        "total_campaigns": len(rows),
+        "averages": averages,
+        "labels": [_title(batch, row) for row in rows],
+        "trends": {
+            field: {"values": series[index].tolist(), "trend": trend[index].tolist()}
+            for index, field in enumerate(TREND_FIELDS)
+        },
+        "outliers": delivery_outliers(delivered),
+        "low_volume": low_volume(delivered),
+        "heatmap": send_time_heatmap(batch, rows),
+    }
+
+
+def _datetime64(stamp: str) -> np.datetime64:
+    try:
+        return np.datetime64(stamp, "m")
+    except ValueError:
+        return np.datetime64("NaT", "m")
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _title(batch: CampaignBatch, row: int) -> str:
+    return batch.columns["email_title"][row] or batch.columns["subject"][row] or "Untitled"
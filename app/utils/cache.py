@@ -0,0 +1,121 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+from app.models import CampaignBatch
+
+
+# Bump whenever parser output changes so results cached by an older parser are never served
+PARSER_VERSION = "1"
+
+
+def cache_key(digest: str, links: bool = False) -> str:
+    """Cache key for an upload: its content hash, scoped to the current parser version and mode"""
+    return f"{PARSER_VERSION}:links:{digest}" if links else f"{PARSER_VERSION}:{digest}"
+
+
+def estimate_batch_size(batch: CampaignBatch) -> int:
+    """Approximate memory held by a batch, used to enforce the cache byte budget"""
+    return sum(
+        sys.getsizeof(values) + sum(map(sys.getsizeof, values))
+        for values in batch.columns.values()
+    ) + (
+        sys.getsizeof(batch.links) + sum(sys.getsizeof(link) + sys.getsizeof(link.url) for link in batch.links)
+        if batch.links is not None else 0
+    )
+
+
+class _Entry(NamedTuple):
+    batch: CampaignBatch
+    size: int
+    expires_at: float
+
+
+class ParseCache:
+    """
+    In-process LRU cache of parsed campaign batches, keyed by upload content hash.
+
+    Only the hash and the parsed metrics are kept, never the uploaded bytes. Entries
+    are evicted least recently used first once the byte budget is exceeded, and expire
+    `ttl` seconds after they were parsed no matter how often they are read.
+    A budget or TTL of zero disables the cache.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.ttl > 0
+
+    def get(self, key: str) -> Optional[CampaignBatch]:
+        """Return the cached batch for a key, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= self.clock():
+            self._discard(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.batch
+
+    def put(self, key: str, batch: CampaignBatch) -> bool:
+        """Store a parsed batch, evicting least recently used entries to stay within budget; False if it cannot fit"""
+        if not self.enabled:
+            return False
+
+        size = estimate_batch_size(batch)
+        if size > self.max_bytes:
+            return False
+
+        self.purge_expired()
+        if key in self._entries:
+            self._discard(key)
+        self._entries[key] = _Entry(batch, size, self.clock() + self.ttl)
+        self.size += size
+
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+        return True
+
+    def purge_expired(self):
+        """Drop every expired entry; runs on each insert so stale metrics do not linger"""
+        now = self.clock()
+        for key in [key for key, entry in self._entries.items() if entry.expires_at <= now]:
+            self._discard(key)
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        """Counters for monitoring"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key)
+        self.size -= entry.size
@@ -0,0 +1,162 @@
+from typing import Dict, Iterable, Iterator, List, Tuple
+from app.models import CAMPAIGN_FIELDS, CampaignBatch
+
+
+# "latest": the copy from the latest upload wins, and the first copy wins within an upload
+# "max_delivered": the copy with the most deliveries wins, ties broken as for "latest"
+# "merge": every field takes the value from the latest copy where it is not null
+DEDUP_POLICIES = ("latest", "max_delivered", "merge")
+
+
+class Deduplicator:
+    """
+    Cross-file campaign deduplication by unique_id.
+
+    Each unique_id maps to a slot holding a reference to the winning (batch, row),
+    so losing copies are never copied or serialized. Adding a row is O(1), or
+    O(fields) under the "merge" policy, whose combined rows live in a batch of
+    their own. Rows without a unique_id are not deduplicated and are left to the caller.
+    """
+
+    def __init__(self, policy: str = "latest"):
+        if policy not in DEDUP_POLICIES:
+            raise ValueError(f"Unknown dedup policy: {policy}")
+        self.policy = policy
+        self.slots: Dict[str, int] = {}
+        self.duplicates = 0
+        self.merged = CampaignBatch()
+        self._merged_columns = [self.merged.columns[field] for field in CAMPAIGN_FIELDS]
+        self._batches: List[CampaignBatch] = []
+        self._rows: List[int] = []
+        self._sources: List[int] = []
+        self._merged_rows: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def add(self, batch: CampaignBatch, rows: Iterable[int], source: int) -> List[int]:
+        """
+        Offer rows of a batch uploaded at position `source`.
+
+        Returns the slots whose winning campaign changed, in the order they changed.
+        """
+        if self.policy == "latest":
+            return self._add_latest(batch, rows, source)
+
+        slots = self.slots
+        batches, winners, sources = self._batches, self._rows, self._sources
+        unique_ids = batch.columns["unique_id"]
+        changed: List[int] = []
+        duplicates = 0
+
+        if self.policy == "max_delivered":
+            delivered = batch.columns["delivered"]
+            wins = lambda slot, row: (
+                (_delivered(delivered[row]), source)
+                > (_delivered(batches[slot].columns["delivered"][winners[slot]]), sources[slot])
+            )
+        else:
+            columns = [batch.columns[field] for field in CAMPAIGN_FIELDS]
+            wins = lambda slot, row: self._merge(slot, columns, row, source)
+        # Merging updates its own row in place rather than swapping the reference
+        replace = self.policy != "merge"
+
+        for row in rows:
+            unique_id = unique_ids[row]
+            if not unique_id:
+                continue
+
+            slot = slots.get(unique_id)
+            if slot is None:
+                slot = slots[unique_id] = len(winners)
+                batches.append(batch)
+                winners.append(row)
+                sources.append(source)
+                changed.append(slot)
+                continue
+
+            duplicates += 1
+            if not wins(slot, row):
+                continue
+
+            if replace:
+                batches[slot] = batch
+                winners[slot] = row
+                sources[slot] = source
+            changed.append(slot)
+
+        self.duplicates += duplicates
+        return changed
+
+    def _add_latest(self, batch: CampaignBatch, rows: Iterable[int], source: int) -> List[int]:
+        """The default policy on its own loop, with no per-row policy dispatch or merge bookkeeping"""
+        slots = self.slots
+        batches, winners, sources = self._batches, self._rows, self._sources
+        unique_ids = batch.columns["unique_id"]
+        changed: List[int] = []
+        seen = len(slots)
+        offered = 0
+
+        for row in rows:
+            unique_id = unique_ids[row]
+            if not unique_id:
+                continue
+            offered += 1
+
+            slot = slots.get(unique_id)
+            if slot is None:
+                slot = slots[unique_id] = len(winners)
+                batches.append(batch)
+                winners.append(row)
+                sources.append(source)
+                changed.append(slot)
+            elif source > sources[slot]:
+                batches[slot] = batch
+                winners[slot] = row
+                sources[slot] = source
+                changed.append(slot)
+
+        self.duplicates += offered - (len(slots) - seen)
+        return changed
+
+    def entry(self, slot: int) -> Tuple[CampaignBatch, int]:
+        """The (batch, row) currently holding a slot's campaign"""
+        if slot in self._merged_rows:
+            return self.merged, self._merged_rows[slot]
+        return self._batches[slot], self._rows[slot]
+
+    def entries(self) -> Iterator[Tuple[CampaignBatch, int]]:
+        """Winning campaigns in order of first appearance"""
+        if not self._merged_rows:
+            return zip(self._batches, self._rows)
+        return map(self.entry, range(len(self._rows)))
+
+    def _merge(self, slot: int, columns: List[list], row: int, source: int) -> bool:
+        """Fold a copy into a slot field by field; returns whether any value changed"""
+        merged = self._merged_columns
+        if slot not in self._merged_rows:
+            current = self._batches[slot].columns
+            current_row = self._rows[slot]
+            self._merged_rows[slot] = len(self.merged)
+            for field, values in zip(CAMPAIGN_FIELDS, merged):
+                values.append(current[field][current_row])
+
+        target = self._merged_rows[slot]
+        newer = source > self._sources[slot]
+        changed = False
+        for values, merged_values in zip(columns, merged):
+            value = values[row]
+            if value is None:
+                continue
+            current = merged_values[target]
+            if current is None or (newer and value != current):
+                merged_values[target] = value
+                changed = True
+
+        if newer:
+            self._sources[slot] = source
+        return changed
+
+
+def _delivered(value) -> int:
+    return value if value is not None else -1
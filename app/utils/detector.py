@@ -1,9 +1,20 @@
-from typing import List
+import io
+import time
+from itertools import chain
+from typing import Iterable, List, NamedTuple, Optional
+from app.parsers.base_parser import BaseParser
 from app.parsers.mailerlite_classic import MailerLiteClassicParser
 from app.parsers.mailchimp_ab import MailChimpABParser
 from app.parsers.mailchimp import MailChimpParser
 from app.parsers.mailchimp_aggregated import MailChimpAggregatedParser
-from app.models import EmailCampaign, UnsupportedFormatError
+from app.parsers.signatures import fingerprint
+from app.models import CampaignBatch, EmailCampaign, UnsupportedFormatError
+
+
+class Detection(NamedTuple):
+    """Parser selected for a report and the raw lines read while detecting it"""
+    parser: BaseParser
+    prefix: List[str]
 
 
 class ParserFactory:
@@ -22,16 +33,46 @@ class ParserFactory:
             ]
         return cls._instance
     
+    def detect(self, lines: Iterable[str]) -> Detection:
+        """Fingerprint a bounded prefix of the lines against every parser in one pass"""
+        parser, prefix = fingerprint(self.parsers, lines)
+        if parser is None:
+            raise UnsupportedFormatError("Unsupported or unrecognized report format")
+        return Detection(parser, prefix)
+    
     def get_parser(self, text: str):
         """Detect and return appropriate parser for the given text"""
-        for parser in self.parsers:
-            if parser.can_parse(text):
-                return parser
-        raise UnsupportedFormatError("Unsupported or unrecognized report format")
+        return self.detect(io.StringIO(text, newline=None)).parser
 
 
 def detect_and_parse(text: str) -> List[EmailCampaign]:
     """Detect the platform and parse accordingly, returning EmailCampaign instances"""
-    factory = ParserFactory()
-    parser = factory.get_parser(text)
-    return parser.parse(text)
+    return detect_and_parse_stream(io.StringIO(text, newline=None))
+
+
+def detect_and_parse_stream(lines: Iterable[str]) -> List[EmailCampaign]:
+    """Detect the platform from a bounded prefix of a text stream, then parse the stream incrementally"""
+    lines = iter(lines)
+    parser, prefix = ParserFactory().detect(lines)
+    return parser.parse_lines(chain(prefix, lines))
+
+
+def detect_and_parse_batch(lines: Iterable[str], links: bool = False, profile: Optional[dict] = None) -> CampaignBatch:
+    """
+    Detect the platform from a text stream and parse it into a column-oriented batch.
+
+    With `links`, reading continues past the campaign fields into the report's
+    click table, which is kept on the batch. Given a `profile` dict, the parser
+    class name and the seconds spent detecting and parsing are recorded in it.
+    """
+    start = time.perf_counter()
+    lines = iter(lines)
+    parser, prefix = ParserFactory().detect(lines)
+    detected = time.perf_counter()
+    lines = chain(prefix, lines)
+    batch = parser.parse_batch(lines)
+    if links:
+        batch.links = parser.parse_links(lines)
+    if profile is not None:
+        profile.update(parser=type(parser).__name__, detect=detected - start, parse=time.perf_counter() - detected)
+    return batch
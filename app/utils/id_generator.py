@@ -1,53 +1,218 @@
 import hashlib
+import os
 import re
+import threading
 from datetime import datetime
+from typing import Callable, Dict, List, Optional, Pattern, Sequence, Tuple, Union
 
 
-def normalize_datetime(date_str: str) -> str:
+WHITESPACE_PATTERN = re.compile(r'\s+')
+ID_STRIP_PATTERN = re.compile(r'[^\w\s-]')
+
+# "sha256" keeps IDs identical to earlier releases; "blake2b" is faster but yields different IDs
+UNIQUE_ID_HASH = os.getenv("UNIQUE_ID_HASH", "sha256").lower()
+ID_LENGTH = 12
+
+# Formats tried in order when no fast path applies. The order matters: "06/09/2018"
+# is read month-first before day-first. MailChimp formats:
+# "Mon, Apr 26, 2021 12:25", "6/9/2018 21:30", "Jun 09, 2018 09:30 pm"
+# MailerLite: "2021-04-26 12:25:00". (strptime has no "%-m" directive, so unpadded
+# dates are covered by "%m", which already accepts a single digit.)
+DATETIME_FORMATS = (
+    "%a, %b %d, %Y %H:%M",    # Mon, Apr 26, 2021 12:25
+    "%Y-%m-%d %H:%M:%S",       # 2021-04-26 12:25:00
+    "%Y-%m-%d %H:%M",          # 2021-04-26 12:25 (already normalized)
+    "%m/%d/%Y %H:%M",          # 6/9/2018 21:30
+    "%m/%d/%y %H:%M",          # 6/9/18 21:30
+    "%d/%m/%Y %H:%M",          # 09/06/2018 21:30
+    "%b %d, %Y %I:%M %p",      # Jun 09, 2018 09:30 pm
+)
+
+MONTHS = {
+    name: number for number, name in enumerate(
+        ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1
+    )
+}
+WEEKDAYS = {"mon", "tue", "wed", "thu", "fri", "sat", "sun"}
+
+
+def _format(dt: datetime) -> str:
+    """Format as YYYY-MM-DD HH:MM, the normalized form used for hashing"""
+    if dt.year < 1000:
+        return dt.strftime("%Y-%m-%d %H:%M")
+    return "%04d-%02d-%02d %02d:%02d" % (dt.year, dt.month, dt.day, dt.hour, dt.minute)
+
+
+def _iso(match) -> datetime:
+    year, month, day, hour, minute, second = match.groups()
+    return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second or 0))
+
+
+def _weekday_month_day_year(match) -> datetime:
+    weekday, month, day, year, hour, minute = match.groups()
+    if weekday.lower() not in WEEKDAYS:
+        raise ValueError(weekday)
+    return datetime(int(year), MONTHS[month.lower()], int(day), int(hour), int(minute))
+
+
+def _slashed(match) -> datetime:
+    first, second, year, hour, minute = match.groups()
+    if len(year) == 2:
+        # Same pivot as strptime's %y
+        year = int(year) + (1900 if int(year) >= 69 else 2000)
+        return datetime(year, int(first), int(second), int(hour), int(minute))
+    try:
+        return datetime(int(year), int(first), int(second), int(hour), int(minute))
+    except ValueError:
+        # Not a valid month/day order, so fall back to day/month like the format list
+        return datetime(int(year), int(second), int(first), int(hour), int(minute))
+
+
+def _month_day_year_12h(match) -> datetime:
+    month, day, year, hour, minute, meridiem = match.groups()
+    hour = int(hour)
+    if not 1 <= hour <= 12:
+        raise ValueError(hour)
+    hour = hour % 12 + (12 if meridiem.lower() == "pm" else 0)
+    return datetime(int(year), MONTHS[month.lower()], int(day), hour, int(minute))
+
+
+_MONTH = "(" + "|".join(MONTHS) + ")"
+
+# Regex fast paths for the common shapes. The shapes are mutually exclusive and each
+# one resolves ambiguity the same way as DATETIME_FORMATS, so results never depend on
+# which shape is tried first. A shape that matches but does not build a valid
+# datetime falls back to the format list.
+FAST_PATHS: Tuple[Tuple[Pattern, Callable], ...] = (
+    (
+        re.compile(r"([0-9]{4})-([0-9]{1,2})-([0-9]{1,2}) ([0-9]{1,2}):([0-9]{1,2})(?::([0-9]{1,2}))?"),
+        _iso,
+    ),
+    (
+        re.compile(r"([a-z]{3}), " + _MONTH + r" ([0-9]{1,2}), ([0-9]{4}) ([0-9]{1,2}):([0-9]{1,2})", re.IGNORECASE),
+        _weekday_month_day_year,
+    ),
+    (
+        re.compile(r"([0-9]{1,2})/([0-9]{1,2})/([0-9]{4}|[0-9]{2}) ([0-9]{1,2}):([0-9]{1,2})"),
+        _slashed,
+    ),
+    (
+        re.compile(_MONTH + r" ([0-9]{1,2}), ([0-9]{4}) ([0-9]{1,2}):([0-9]{1,2}) ([ap]m)", re.IGNORECASE),
+        _month_day_year_12h,
+    ),
+)
+
+
+class DateNormalizer:
     """
-    Normalize various datetime formats to a consistent string for hashing.
-    Tries to parse common formats and returns a normalized string.
+    Normalizes send dates, remembering what worked.
+
+    The shape that matched last is tried first, since a report uses one date format
+    throughout, and results are memoized in a bounded cache keyed by the raw string.
+    Both are updated without locking, so an instance must not be shared between threads.
     """
-    if not date_str:
-        return ""
-    
-    # Common MailChimp formats: 
-    # "Mon, Apr 26, 2021 12:25" 
-    # "Sat, May 1, 2021 10:15"
-    # "6/9/2018 21:30" (M/D/YYYY H:MM)
-    # "Jun 09, 2018 09:30 pm" (with am/pm)
-    # "2018-06-09 21:30" (ISO-like)
-    # Common MailerLite formats: "2021-04-26 12:25:00"
-    
-    # Try to parse various formats
-    formats = [
-        "%a, %b %d, %Y %H:%M",    # Mon, Apr 26, 2021 12:25
-        "%Y-%m-%d %H:%M:%S",       # 2021-04-26 12:25:00
-        "%Y-%m-%d %H:%M",          # 2021-04-26 12:25 (already normalized)
-        "%m/%d/%Y %H:%M",          # 6/9/2018 21:30
-        "%m/%d/%y %H:%M",          # 6/9/18 21:30
-        "%-m/%-d/%Y %H:%M",        # 6/9/2018 21:30 (no padding)
-        "%-m/%-d/%y %H:%M",        # 6/9/18 21:30 (no padding)
-        "%d/%m/%Y %H:%M",          # 09/06/2018 21:30
-        "%b %d, %Y %I:%M %p",      # Jun 09, 2018 09:30 pm
-    ]
-    
-    # Clean up the string first
-    clean_str = re.sub(r'\s+', ' ', date_str.strip())
-    
-    for fmt in formats:
+
+    def __init__(self, max_cache: int = 4096):
+        self.max_cache = max_cache
+        self._cache: Dict[str, str] = {}
+        self._paths = list(FAST_PATHS)
+
+    def __call__(self, date_str: str) -> str:
+        if not date_str:
+            return ""
+
+        cached = self._cache.get(date_str)
+        if cached is not None:
+            return cached
+
+        normalized = self._normalize(date_str)
+        if len(self._cache) >= self.max_cache:
+            # Drop the oldest entry; dicts keep insertion order
+            del self._cache[next(iter(self._cache))]
+        self._cache[date_str] = normalized
+        return normalized
+
+    def _normalize(self, date_str: str) -> str:
+        clean_str = WHITESPACE_PATTERN.sub(' ', date_str.strip())
+
+        for index, (pattern, build) in enumerate(self._paths):
+            match = pattern.fullmatch(clean_str)
+            if match is None:
+                continue
+            try:
+                dt = build(match)
+            except ValueError:
+                break
+            if index:
+                # Learn the shape so the next date from this report matches first time
+                self._paths.insert(0, self._paths.pop(index))
+            return _format(dt)
+
+        return _parse_with_formats(clean_str)
+
+
+def _parse_with_formats(clean_str: str) -> str:
+    """Try every known format in priority order, returning the cleaned string if none fit"""
+    for fmt in DATETIME_FORMATS:
         try:
-            dt = datetime.strptime(clean_str, fmt)
-            # Return ISO format for consistency: YYYY-MM-DD HH:MM
-            return dt.strftime("%Y-%m-%d %H:%M")
+            return _format(datetime.strptime(clean_str, fmt))
         except ValueError:
             continue
-    
-    # If parsing fails, just clean and return the string
     return clean_str
 
 
-def generate_unique_id(title: str = "", subject: str = "", sent_at: str = "", platform: str = "") -> str:
+# One default normalizer per thread, as threaded parse workers would otherwise share its state
+_default_normalizers = threading.local()
+
+
+def _default_normalizer() -> DateNormalizer:
+    normalizer = getattr(_default_normalizers, "normalizer", None)
+    if normalizer is None:
+        normalizer = _default_normalizers.normalizer = DateNormalizer()
+    return normalizer
+
+
+def normalize_datetime(date_str: str, normalizer: Optional[DateNormalizer] = None) -> str:
+    """
+    Normalize various datetime formats to a consistent string for hashing.
+    Tries to parse common formats and returns a normalized string.
+    """
+    return (normalizer or _default_normalizer())(date_str)
+
+
+def _hash_sha256(composite: str) -> str:
+    return hashlib.sha256(composite.encode()).hexdigest()[:ID_LENGTH]
+
+
+def _hash_blake2b(composite: str) -> str:
+    return hashlib.blake2b(composite.encode(), digest_size=ID_LENGTH // 2).hexdigest()
+
+
+ID_HASHES = {
+    "sha256": _hash_sha256,
+    "blake2b": _hash_blake2b,
+}
+
+
+def _id_hasher(hash_mode: Optional[str]) -> Callable[[str], str]:
+    hash_mode = hash_mode or UNIQUE_ID_HASH
+    if hash_mode not in ID_HASHES:
+        raise ValueError(f"Unknown unique ID hash: {hash_mode}")
+    return ID_HASHES[hash_mode]
+
+
+def clean_id_component(value: str) -> str:
+    """Reduce a title or subject to word characters joined by underscores"""
+    return WHITESPACE_PATTERN.sub('_', ID_STRIP_PATTERN.sub('', value or "").strip())
+
+
+def generate_unique_id(
+    title: str = "",
+    subject: str = "",
+    sent_at: str = "",
+    platform: str = "",
+    hash_mode: Optional[str] = None
+) -> str:
     """
     Generate a consistent unique ID based on campaign title, subject, and send date/time.
     
@@ -56,31 +221,57 @@ def generate_unique_id(title: str = "", subject: str = "", sent_at: str = "", pl
         subject: Campaign subject line
         sent_at: Send date/time string
         platform: Optional platform name for additional uniqueness
+        hash_mode: "sha256" or "blake2b"; defaults to UNIQUE_ID_HASH
     
     Returns:
-        A short hash-based unique ID (first 12 chars of SHA256)
+        A short hash-based unique ID (12 hex characters)
     """
+    hasher = _id_hasher(hash_mode)
     if not title and not subject and not sent_at:
         # Fallback if all are empty
-        return hashlib.sha256(f"{platform}_unknown".encode()).hexdigest()[:12]
-    
-    # Normalize the datetime
-    normalized_date = normalize_datetime(sent_at)
+        return hasher(f"{platform}_unknown")
     
-    # Clean title and subject
-    clean_title = re.sub(r'[^\w\s-]', '', title or "").strip()
-    clean_title = re.sub(r'\s+', '_', clean_title)
-    
-    clean_subject = re.sub(r'[^\w\s-]', '', subject or "").strip()
-    clean_subject = re.sub(r'\s+', '_', clean_subject)
+    composite = (
+        f"{clean_id_component(title)}_{clean_id_component(subject)}_{normalize_datetime(sent_at)}_{platform}"
+    ).lower()
+    return hasher(composite)
+
+
+def generate_unique_ids(
+    titles: Sequence[str],
+    subjects: Sequence[str],
+    sent_ats: Sequence[str],
+    platforms: Union[str, Sequence[str]] = "",
+    normalized: bool = False,
+    hash_mode: Optional[str] = None
+) -> List[str]:
+    """
+    Generate unique IDs for columns of campaigns, matching generate_unique_id row for row.
     
-    # Create composite string with all components
-    composite = f"{clean_title}_{clean_subject}_{normalized_date}_{platform}".lower()
+    Each distinct title, subject and send date is cleaned once. Pass normalized=True
+    when sent_ats already went through normalize_datetime, so it is not repeated
+    (a whitespace-only date then counts as empty, which only matters for rows with
+    no title or subject either).
+    A single platform string applies to every row.
+    """
+    hasher = _id_hasher(hash_mode)
+    if isinstance(platforms, str):
+        platforms = [platforms] * len(titles)
     
-    # Generate hash
-    hash_value = hashlib.sha256(composite.encode()).hexdigest()[:12]
+    clean = {value: clean_id_component(value) for value in {*titles, *subjects}}
+    if normalized:
+        dates = {value: value for value in sent_ats}
+    else:
+        normalizer = DateNormalizer()
+        dates = {value: normalizer(value) for value in set(sent_ats)}
     
-    return hash_value
+    ids = []
+    for title, subject, sent_at, platform in zip(titles, subjects, sent_ats, platforms):
+        if not title and not subject and not sent_at:
+            ids.append(hasher(f"{platform}_unknown"))
+        else:
+            ids.append(hasher(f"{clean[title]}_{clean[subject]}_{dates[sent_at]}_{platform}".lower()))
+    return ids
 
 
 def generate_readable_id(title: str = "", subject: str = "", sent_at: str = "", platform: str = "") -> str:
@@ -100,8 +291,7 @@ def generate_readable_id(title: str = "", subject: str = "", sent_at: str = "",
     name = title or subject or "untitled"
     
     # Clean name to create prefix (max 30 chars)
-    clean_name = re.sub(r'[^\w\s-]', '', name).strip()
-    clean_name = re.sub(r'\s+', '_', clean_name).lower()
+    clean_name = clean_id_component(name).lower()
     prefix = clean_name[:30]
     
     # Generate hash for uniqueness
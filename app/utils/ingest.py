@@ -0,0 +1,375 @@
+import hashlib
+import io
+import zipfile
+import zlib
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, BinaryIO, List, Optional, Tuple
+from python_multipart.multipart import MultipartParser, parse_options_header
+from python_multipart.exceptions import MultipartParseError
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+ARCHIVE_EXTENSIONS = (".zip",)
+COMPRESSED_EXTENSIONS = (".csv.gz",)
+# zlib window bits selecting the gzip container
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class UploadRejectedError(Exception):
+    """Raised when an upload breaks a request-wide limit and must be aborted"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(self.message)
+
+
+class IngestedFile:
+    """A single uploaded file, spooled as it streams in with its size enforced"""
+
+    def __init__(self, filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.filename = filename
+        self.size = 0
+        self.error: Optional[str] = None
+        # Parser and detect/parse seconds, filled in once a worker has parsed the file
+        self.profile: Optional[dict] = None
+        # Anything above one chunk rolls over to a temporary file, so memory
+        # per upload stays bounded by the chunk size rather than the file size
+        self._buffer = SpooledTemporaryFile(max_size=chunk_size)
+        # Content hash built as bytes arrive, so identical uploads can be recognized without a re-read
+        self._hash = hashlib.blake2b(digest_size=32)
+
+    def write(self, data: bytes):
+        """Append data unless the file has already been rejected"""
+        if self.error is None:
+            self._buffer.write(data)
+            self._hash.update(data)
+
+    @property
+    def digest(self) -> str:
+        """Hex digest of the bytes received so far"""
+        return self._hash.hexdigest()
+
+    def reject(self, error: str):
+        """Mark the file as failed and release whatever was buffered so far"""
+        self.error = error
+        self._buffer.close()
+
+    def open_text(self) -> io.TextIOWrapper:
+        """Return an incremental UTF-8 text stream over the uploaded bytes"""
+        self._buffer.seek(0)
+        return io.TextIOWrapper(self._buffer, encoding="utf-8", errors="ignore", newline=None)
+
+    def open_binary(self) -> BinaryIO:
+        """Return a seekable binary stream over the uploaded bytes"""
+        self._buffer.seek(0)
+        return self._buffer
+
+    def read_bytes(self) -> bytes:
+        """Return the full uploaded content"""
+        self._buffer.seek(0)
+        return self._buffer.read()
+
+    def count_lines(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """Count lines in the uploaded bytes, a final line without a newline included, reading a chunk at a time"""
+        self._buffer.seek(0)
+        lines = 0
+        last = b"\n"
+        for chunk in iter(lambda: self._buffer.read(chunk_size), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+        return lines + (last != b"\n")
+
+    def close(self):
+        self._buffer.close()
+
+
+class MultipartIngestor:
+    """Streams a multipart/form-data body into IngestedFile buffers, enforcing limits as bytes arrive"""
+
+    def __init__(
+        self,
+        field_name: str = "files",
+        max_files: int = 12,
+        max_file_size: int = 10 * 1024 * 1024,
+        max_total_size: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        allowed_extensions: Tuple[str, ...] = (".csv",),
+        archive_extensions: Tuple[str, ...] = (),
+        max_archive_size: Optional[int] = None,
+        compressed_extensions: Tuple[str, ...] = (),
+    ):
+        self.field_name = field_name
+        self.max_files = max_files
+        self.max_file_size = max_file_size
+        self.max_total_size = max_total_size if max_total_size is not None else max_file_size * max_files
+        self.chunk_size = chunk_size
+        self.allowed_extensions = allowed_extensions
+        # Archives are accepted whole here and unpacked by expand_archives
+        self.archive_extensions = archive_extensions
+        self.max_archive_size = max_archive_size if max_archive_size is not None else max_file_size
+        # Gzipped parts are inflated as they arrive, and limited by their inflated size
+        self.compressed_extensions = compressed_extensions
+
+        self.files: List[IngestedFile] = []
+        self.total_size = 0
+        self._current: Optional[IngestedFile] = None
+        self._current_limit = max_file_size
+        self._decompressor = None
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def on_part_begin(self):
+        self._current = None
+        self._decompressor = None
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        if name != self.field_name or b"filename" not in options:
+            # Other form fields are drained but never stored
+            return
+
+        if len(self.files) >= self.max_files:
+            raise UploadRejectedError(
+                f"Too many files. Maximum {self.max_files} files allowed per upload.",
+                status_code=400
+            )
+
+        filename = options[b"filename"].decode("utf-8", errors="replace")
+        if self.compressed_extensions and filename.lower().endswith(self.compressed_extensions):
+            # Reported under the name of the CSV inside
+            filename = filename[:-len(".gz")]
+            self._decompressor = zlib.decompressobj(GZIP_WBITS)
+        upload = IngestedFile(filename, chunk_size=self.chunk_size)
+        if not filename.lower().endswith(self.allowed_extensions + self.archive_extensions):
+            upload.reject("Only CSV files supported")
+        archive = self.archive_extensions and filename.lower().endswith(self.archive_extensions)
+        self._current_limit = self.max_archive_size if archive else self.max_file_size
+
+        self.files.append(upload)
+        self._current = upload
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        size = end - start
+        self.total_size += size
+        if self.total_size > self.max_total_size:
+            raise UploadRejectedError(
+                f"Total upload size exceeds maximum allowed ({self.max_total_size // (1024 * 1024)}MB)",
+                status_code=413
+            )
+
+        upload = self._current
+        if upload is None or upload.error is not None:
+            return
+
+        data = data[start:end]
+        if self._decompressor is not None:
+            try:
+                # Never inflate more than one byte past what the file may hold
+                data = self._decompressor.decompress(data, self._current_limit - upload.size + 1)
+            except zlib.error:
+                upload.reject("Invalid gzip file")
+                return
+
+        upload.size += len(data)
+        if upload.size > self._current_limit:
+            upload.reject(f"File too large. Maximum size is {self._current_limit // (1024 * 1024)}MB")
+            return
+        upload.write(data)
+
+    def on_part_end(self):
+        upload = self._current
+        if upload is not None and upload.error is None and self._decompressor is not None:
+            if not self._decompressor.eof:
+                upload.reject("Invalid gzip file")
+        self._current = None
+        self._decompressor = None
+
+    async def ingest(self, content_type: str, stream: AsyncIterator[bytes]) -> List[IngestedFile]:
+        """Consume the request body chunk by chunk and return the uploaded files"""
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise UploadRejectedError("Expected a multipart/form-data upload", status_code=400)
+
+        parser = MultipartParser(boundary, {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        })
+
+        try:
+            async for chunk in stream:
+                parser.write(chunk)
+            parser.finalize()
+        except MultipartParseError:
+            self.close()
+            raise UploadRejectedError("Malformed multipart upload", status_code=400)
+        except UploadRejectedError:
+            self.close()
+            raise
+
+        if not self.files:
+            raise UploadRejectedError("No files uploaded", status_code=400)
+
+        return self.files
+
+    def close(self):
+        for upload in self.files:
+            upload.close()
+
+
+async def ingest_multipart(content_type: str, stream: AsyncIterator[bytes], **limits) -> List[IngestedFile]:
+    """Stream a multipart upload into bounded per-file buffers"""
+    return await MultipartIngestor(**limits).ingest(content_type, stream)
+
+
+async def gunzip_stream(stream: AsyncIterator[bytes], chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Inflate a gzip-encoded request body as it arrives.
+
+    At most chunk_size bytes are inflated at a time, so a consumer enforcing
+    its own size limits stops a compression bomb after one chunk too many.
+    """
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    try:
+        async for chunk in stream:
+            data = chunk
+            while data:
+                inflated = decompressor.decompress(data, chunk_size)
+                if inflated:
+                    yield inflated
+                data = decompressor.unconsumed_tail
+    except zlib.error:
+        raise UploadRejectedError("Malformed gzip request body", status_code=400)
+    if not decompressor.eof:
+        raise UploadRejectedError("Truncated gzip request body", status_code=400)
+
+
+class ArchiveExpander:
+    """
+    Replaces uploaded ZIP archives with their members, in archive order.
+
+    Members are decompressed one at a time, chunk by chunk, into bounded buffers
+    of their own, so a zip bomb is cut off at `max_member_size` per member and
+    `max_uncompressed` across the request, whatever sizes the archive declares.
+    Members that cannot be used come back as rejected files named
+    "archive.zip/member.csv", to be reported like any other per-file error.
+    """
+
+    def __init__(
+        self,
+        max_members: int = 500,
+        max_member_size: int = 10 * 1024 * 1024,
+        max_uncompressed: int = 256 * 1024 * 1024,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        self.max_members = max_members
+        self.max_member_size = max_member_size
+        self.max_uncompressed = max_uncompressed
+        self.chunk_size = chunk_size
+        self.uncompressed = 0
+
+    def expand(self, uploads: List[IngestedFile]) -> List[IngestedFile]:
+        """Swap each archive for its members, closing the archive once unpacked"""
+        expanded: List[IngestedFile] = []
+        for upload in uploads:
+            if upload.error or not upload.filename.lower().endswith(ARCHIVE_EXTENSIONS):
+                expanded.append(upload)
+                continue
+            try:
+                expanded.extend(self._expand_zip(upload))
+            finally:
+                upload.close()
+        return expanded
+
+    def _expand_zip(self, upload: IngestedFile) -> List[IngestedFile]:
+        try:
+            archive = zipfile.ZipFile(upload.open_binary())
+        except (zipfile.BadZipFile, OSError):
+            return [self._rejected(upload.filename, "Invalid ZIP archive")]
+
+        with archive:
+            members = [info for info in archive.infolist() if not info.is_dir() and not _is_metadata(info.filename)]
+            if not members:
+                return [self._rejected(upload.filename, "No CSV files found in archive")]
+            if len(members) > self.max_members:
+                return [self._rejected(
+                    upload.filename,
+                    f"Too many files in archive. Maximum {self.max_members} files allowed per archive."
+                )]
+
+            files = []
+            for info in members:
+                member = IngestedFile(f"{upload.filename}/{info.filename}", chunk_size=self.chunk_size)
+                files.append(member)
+                if not info.filename.lower().endswith(".csv"):
+                    member.reject("Only CSV files supported")
+                elif info.file_size > self.max_member_size:
+                    member.reject(self._too_large())
+                elif self.uncompressed + info.file_size > self.max_uncompressed:
+                    member.reject("Archive exceeds the decompressed size limit")
+                else:
+                    self._extract(archive, info, member)
+            return files
+
+    def _extract(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo, member: IngestedFile):
+        """Decompress one member, trusting what it inflates to rather than its declared size"""
+        try:
+            with archive.open(info) as source:
+                while True:
+                    chunk = source.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    member.size += len(chunk)
+                    self.uncompressed += len(chunk)
+                    if member.size > self.max_member_size:
+                        member.reject(self._too_large())
+                        break
+                    if self.uncompressed > self.max_uncompressed:
+                        member.reject("Archive exceeds the decompressed size limit")
+                        break
+                    member.write(chunk)
+        except RuntimeError:
+            # zipfile raises RuntimeError for encrypted members
+            member.reject("Encrypted archive members are not supported")
+        except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError):
+            member.reject("Could not extract file from archive")
+
+    def _rejected(self, filename: str, error: str) -> IngestedFile:
+        failed = IngestedFile(filename, chunk_size=self.chunk_size)
+        failed.reject(error)
+        return failed
+
+    def _too_large(self) -> str:
+        return f"File too large. Maximum size is {self.max_member_size // (1024 * 1024)}MB"
+
+
+def _is_metadata(name: str) -> bool:
+    """Finder and Explorer bookkeeping entries that are never reports"""
+    base = name.rsplit("/", 1)[-1]
+    return name.startswith("__MACOSX/") or base.startswith("._") or base in (".DS_Store", "Thumbs.db")
+
+
+def expand_archives(uploads: List[IngestedFile], **limits) -> List[IngestedFile]:
+    """Unpack uploaded ZIP archives into bounded per-member files"""
+    return ArchiveExpander(**limits).expand(uploads)
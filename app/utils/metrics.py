@@ -0,0 +1,249 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds of histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = tuple(1024 * 4 ** power for power in range(10))  # 1KB to 256MB
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000, 50000)
+
+# Files timed individually in a Server-Timing header, which archives could otherwise inflate
+SERVER_TIMING_FILES = 50
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _quoted(value: str) -> str:
+    """A Server-Timing description as a quoted string, with anything but printable ASCII replaced"""
+    value = "".join(char if " " <= char <= "~" else "?" for char in value)
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic count per label values"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def samples(self) -> Iterator[str]:
+        for labelvalues, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}"
+
+
+class Histogram:
+    """Bucketed observations per label values, kept as per-bucket counts until rendered"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # Label values to [per-bucket counts, with an overflow slot last; sum of observations]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+        # Bucket bounds are inclusive, so a value equal to a bound lands in that bucket
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return sum(series[0]) if series is not None else 0
+
+    def samples(self) -> Iterator[str]:
+        for labelvalues, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labelvalues)} {cumulative}"
+
+
+class StageTimer:
+    """Seconds one request spends in each stage, summed over its files where a stage runs per file"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def milliseconds(self) -> Dict[str, float]:
+        return {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()}
+
+    def server_timing(self, files: Sequence[Tuple[str, Optional[dict]]] = ()) -> str:
+        """
+        A Server-Timing header value with each stage, then each (filename, profile) in upload order.
+
+        Files are numbered from 1 and described by filename; those a worker
+        parsed carry their detect plus parse time, cache hits and rejected
+        files carry no duration.
+        """
+        entries = [f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in self.stages.items()]
+        for number, (filename, profile) in enumerate(files[:SERVER_TIMING_FILES], 1):
+            duration = f";dur={(profile['detect'] + profile['parse']) * 1000:.3f}" if profile else ""
+            entries.append(f"file-{number}{duration};desc={_quoted(filename)}")
+        return ", ".join(entries)
+
+
+class MetricsRegistry:
+    """
+    Metrics rendered in the Prometheus text exposition format.
+
+    Recording is a dict lookup and an increment with no locking: every
+    observation is made on the event loop thread, and parse timings measured
+    in worker processes are recorded there once the result comes back.
+    """
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self, name: str, documentation: str, buckets: Sequence[float], labelnames: Tuple[str, ...] = ()
+    ) -> Histogram:
+        metric = Histogram(name, documentation, buckets, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class ServiceMetrics(MetricsRegistry):
+    """The metrics this service exposes on /metrics"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = self.counter(
+            "simpledash_requests_total", "HTTP requests by route and outcome", ("route", "outcome")
+        )
+        self.request_seconds = self.histogram(
+            "simpledash_request_duration_seconds", "HTTP request latency by route", LATENCY_BUCKETS, ("route",)
+        )
+        self.upload_bytes = self.histogram(
+            "simpledash_upload_file_bytes", "Size of each uploaded file, after decompression", SIZE_BUCKETS
+        )
+        self.stage_seconds = self.histogram(
+            "simpledash_stage_duration_seconds",
+            "Time per upload request spent in each stage; detect and parse sum worker time over the files, "
+            "and parse includes decoding, which happens as lines are read",
+            LATENCY_BUCKETS,
+            ("stage",),
+        )
+        self.parser_seconds = self.histogram(
+            "simpledash_parser_duration_seconds",
+            "Detection and parsing time per file, by the parser selected",
+            LATENCY_BUCKETS,
+            ("parser",),
+        )
+        self.campaigns = self.histogram(
+            "simpledash_campaigns_per_request", "Campaigns returned per upload request", COUNT_BUCKETS
+        )
+        self.errors = self.counter(
+            "simpledash_file_errors_total", "Files that failed, by exception type", ("error",)
+        )
+
+    def observe_file(self, upload_bytes: int, profile: Optional[dict], timer: StageTimer):
+        """Record a file that reached a parser, with the detect and parse timings its worker measured"""
+        self.upload_bytes.observe(upload_bytes)
+        if profile:
+            timer.add("detect", profile["detect"])
+            timer.add("parse", profile["parse"])
+            self.parser_seconds.observe(profile["detect"] + profile["parse"], profile["parser"])
+
+    def observe_error(self, error: str):
+        self.errors.inc(error)
+
+    def observe_request(self, timer: StageTimer, campaigns: int):
+        """Record the stage timings and campaign count of a finished upload request"""
+        for stage, seconds in timer.stages.items():
+            self.stage_seconds.observe(seconds, stage)
+        self.campaigns.observe(campaigns)
+
+
+class MetricsMiddleware:
+    """Counts and times every HTTP request by the route template it matched"""
+
+    def __init__(self, app: ASGIApp, metrics: ServiceMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            # Route templates rather than raw paths, so label cardinality stays fixed
+            label = getattr(route, "path", "other")
+            outcome = "success" if status < 400 else "client_error" if status < 500 else "server_error"
+            self.metrics.requests.inc(label, outcome)
+            self.metrics.request_seconds.observe(time.perf_counter() - start, label)
@@ -0,0 +1,121 @@
+import json
+import math
+from json.encoder import encode_basestring
+from typing import Dict, List, Optional, Tuple
+from starlette.responses import Response
+from app.models import CAMPAIGN_FIELDS, CampaignBatch
+
+
+# One "%s" slot per field, in CAMPAIGN_FIELDS order
+CAMPAIGN_TEMPLATE = "{" + ",".join(f'"{field}":%s' for field in CAMPAIGN_FIELDS) + "}"
+RESULT_TEMPLATE = '{"filename":%s,"data":{"campaign":%s}}'
+RESULT_RECORD_TEMPLATE = '{"type":"result","filename":%s,"data":{"campaign":%s}}\n'
+
+
+def _encode_float(value: float) -> str:
+    if math.isfinite(value):
+        return float.__repr__(value)
+    return "null"
+
+
+def _encode_other(value) -> str:
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+_ENCODERS = {
+    str: encode_basestring,
+    int: int.__repr__,
+    float: _encode_float,
+    bool: lambda value: "true" if value else "false",
+    type(None): lambda value: "null",
+}
+
+
+def encode_value(value) -> str:
+    """Encode a scalar campaign value to JSON text"""
+    return _ENCODERS.get(type(value), _encode_other)(value)
+
+
+def encode_column(values: list) -> List[str]:
+    """Encode a column of values, using a single C-level encoder when the column has one type"""
+    kinds = set(map(type, values))
+    if len(kinds) != 1:
+        return list(map(encode_value, values))
+
+    kind = kinds.pop()
+    if kind is float and all(map(math.isfinite, values)):
+        return list(map(float.__repr__, values))
+    return list(map(_ENCODERS.get(kind, _encode_other), values))
+
+
+def encode_campaigns(batch: CampaignBatch, rows: List[int]) -> List[str]:
+    """Encode selected campaigns of a batch to JSON objects, one column at a time"""
+    encoded_columns = [
+        encode_column([values[row] for row in rows])
+        for values in batch.columns.values()
+    ]
+    return [CAMPAIGN_TEMPLATE % values for values in zip(*encoded_columns)]
+
+
+def encode_parse_response(
+    results: List[Tuple[str, CampaignBatch, int]],
+    errors: List[dict],
+    extras: Optional[dict] = None
+) -> bytes:
+    """Encode the /parse payload straight from campaign batches, without intermediate dicts; extras follow errors"""
+    # Group rows per batch so every column is encoded in a single sweep
+    groups: Dict[int, Tuple[CampaignBatch, List[int], List[int]]] = {}
+    for position, (_, batch, row) in enumerate(results):
+        _, rows, positions = groups.setdefault(id(batch), (batch, [], []))
+        rows.append(row)
+        positions.append(position)
+
+    campaigns: List[str] = [""] * len(results)
+    for batch, rows, positions in groups.values():
+        for position, encoded in zip(positions, encode_campaigns(batch, rows)):
+            campaigns[position] = encoded
+
+    encoded_results = ",".join(
+        RESULT_TEMPLATE % (encode_basestring(filename), campaign)
+        for (filename, _, _), campaign in zip(results, campaigns)
+    )
+    encoded_extras = "".join(
+        "," + encode_basestring(name) + ":" + _encode_other(value)
+        for name, value in (extras or {}).items()
+    )
+    return (
+        '{"results":[' + encoded_results + '],"errors":' + _encode_other(errors) + encoded_extras + "}"
+    ).encode("utf-8")
+
+
+def result_records(filenames: List[str], batch: CampaignBatch, rows: List[int]) -> List[str]:
+    """Encode campaigns as NDJSON result records, one line each"""
+    return [
+        RESULT_RECORD_TEMPLATE % (encode_basestring(filename), campaign)
+        for filename, campaign in zip(filenames, encode_campaigns(batch, rows))
+    ]
+
+
+def encode_result_records(filenames: List[str], batch: CampaignBatch, rows: List[int]) -> str:
+    """Encode campaigns as NDJSON result records, mirroring the entries of the JSON results list"""
+    return "".join(result_records(filenames, batch, rows))
+
+
+def encode_record(record_type: str, **fields) -> str:
+    """Encode a single NDJSON record"""
+    return _encode_other({"type": record_type, **fields}) + "\n"
+
+
+class ParseResponse(Response):
+    """JSON response for /parse, serialized directly from campaign batches"""
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        results: List[Tuple[str, CampaignBatch, int]],
+        errors: List[dict],
+        extras: Optional[dict] = None,
+        **kwargs
+    ):
+        super().__init__(content=encode_parse_response(results, errors, extras), **kwargs)
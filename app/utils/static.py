@@ -0,0 +1,71 @@
+import os
+import stat
+from mimetypes import guess_type
+from typing import Optional
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+from app.utils.compression import accepts_encoding
+
+
+# Variants written next to each file by the frontend build, in order of preference
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# Hashed build output never changes under the same name
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Unhashed entry points are kept but revalidated against their ETag on every use
+REVALIDATE = "no-cache"
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    Static files served from precompressed .br/.gz siblings when the client accepts them.
+
+    Each variant is a file of its own, so it gets its own ETag, and conditional
+    requests are answered with 304 whichever representation was negotiated.
+    """
+
+    def __init__(self, *, cache_control: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache_control = cache_control
+
+    def file_response(
+        self,
+        full_path: "os.PathLike[str] | str",
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = guess_type(str(full_path))[0] or "text/plain"
+        accept_encoding = request_headers.get("accept-encoding", "")
+
+        response = None
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if not accepts_encoding(accept_encoding, encoding):
+                continue
+            variant = f"{full_path}{suffix}"
+            try:
+                variant_stat = os.stat(variant)
+            except OSError:
+                continue
+            if stat.S_ISREG(variant_stat.st_mode):
+                response = FileResponse(variant, status_code=status_code, stat_result=variant_stat, media_type=media_type)
+                response.headers["content-encoding"] = encoding
+                break
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, media_type=media_type)
+
+        response.headers.add_vary_header("Accept-Encoding")
+        if self.cache_control:
+            response.headers["cache-control"] = self.cache_control
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def serve(self, path: str, scope: Scope) -> Optional[Response]:
+        """Respond with a file below the directory by its relative path, or None if there is no such file"""
+        full_path, stat_result = self.lookup_path(path)
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            return None
+        return self.file_response(full_path, stat_result, scope)
@@ -0,0 +1,100 @@
+import heapq
+from typing import Dict, Iterable, List, Tuple
+from app.models import CampaignBatch
+
+
+class TopLinks:
+    """
+    Most clicked URLs across reports, in memory bounded by `capacity` counters.
+
+    Uses the weighted Space-Saving algorithm: once every counter is in use, a
+    new URL takes over the counter with the fewest clicks and inherits its
+    count as a possible overestimate, recorded as the URL's error. Any URL
+    with more than (all clicks / capacity) total clicks is guaranteed a
+    counter, and a reported count is never more than `error` above the truth.
+    Unique clicks are summed alongside, from the moment the URL got its counter.
+    """
+
+    def __init__(self, capacity: int = 200):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.reports = 0
+        self.clicks = 0
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._unique: Dict[str, int] = {}
+        # (count, url) entries, possibly stale; rebuilt before it outgrows the counters
+        self._heap: List[Tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, url: str, total_clicks: int, unique_clicks: int = 0):
+        """Count clicks of one URL in one report"""
+        counts = self._counts
+        self.clicks += total_clicks
+        if url in counts:
+            counts[url] += total_clicks
+            self._unique[url] += unique_clicks
+        elif len(counts) < self.capacity:
+            counts[url] = total_clicks
+            self._errors[url] = 0
+            self._unique[url] = unique_clicks
+        else:
+            evicted, floor = self._pop_min()
+            del counts[evicted], self._errors[evicted], self._unique[evicted]
+            counts[url] = floor + total_clicks
+            self._errors[url] = floor
+            self._unique[url] = unique_clicks
+
+        heapq.heappush(self._heap, (counts[url], url))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, url) for url, count in counts.items()]
+            heapq.heapify(self._heap)
+
+    def add_batch(self, batch: CampaignBatch):
+        """Count the click table of a parsed report, if it has one and it was extracted"""
+        if batch.links is None:
+            return
+        self.reports += 1
+        for link in batch.links:
+            self.add(link.url, link.total_clicks, link.unique_clicks)
+
+    def add_batches(self, batches: Iterable[CampaignBatch]):
+        """Count each distinct report once, however many of its campaigns are listed"""
+        seen = set()
+        for batch in batches:
+            if id(batch) not in seen:
+                seen.add(id(batch))
+                self.add_batch(batch)
+
+    def _pop_min(self) -> Tuple[str, int]:
+        """Remove the heap entry of the URL with the fewest clicks, skipping stale entries"""
+        while True:
+            count, url = heapq.heappop(self._heap)
+            if self._counts.get(url) == count:
+                return url, count
+
+    def top(self, k: int) -> List[dict]:
+        """The k URLs with the most total clicks, most clicked first"""
+        ranked = heapq.nlargest(k, self._counts.items(), key=lambda item: (item[1], item[0]))
+        return [
+            {
+                "url": url,
+                "total_clicks": count,
+                "unique_clicks": self._unique[url],
+                "error": self._errors[url],
+            }
+            for url, count in ranked
+        ]
+
+    def payload(self, k: int) -> dict:
+        """Ranking and counters for the response"""
+        return {
+            "top": self.top(k),
+            "reports": self.reports,
+            "total_clicks": self.clicks,
+            "tracked": len(self._counts),
+            "capacity": self.capacity,
+        }
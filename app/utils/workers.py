@@ -0,0 +1,129 @@
+import asyncio
+import io
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple, Union
+from app.models import CampaignBatch
+from app.utils.cache import ParseCache, cache_key
+from app.utils.detector import detect_and_parse_batch
+from app.utils.ingest import IngestedFile
+
+
+def parse_upload_job(upload: IngestedFile, links: bool = False) -> Tuple[CampaignBatch, dict]:
+    """Parse an uploaded file by streaming it straight from its spooled buffer; returns the batch and its profile"""
+    profile = {}
+    with upload.open_text() as stream:
+        batch = detect_and_parse_batch(stream, links, profile)
+    return batch, profile
+
+
+def parse_bytes_job(data: bytes, links: bool = False) -> Tuple[CampaignBatch, dict]:
+    """Parse raw report bytes; used where the upload cannot be shared with the worker"""
+    profile = {}
+    with io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", errors="ignore", newline=None) as stream:
+        batch = detect_and_parse_batch(stream, links, profile)
+    return batch, profile
+
+
+class ParseExecutor:
+    """Runs CPU-bound report parsing off the event loop on a thread or process pool"""
+
+    def __init__(
+        self,
+        kind: str = "process",
+        max_workers: int = 2,
+        timeout: Optional[float] = None,
+        cache: Optional[ParseCache] = None
+    ):
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unknown parse executor: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = cache
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def pool(self) -> Executor:
+        """Create the pool on first use so importing the app never spawns workers"""
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="parse")
+        return self._pool
+
+    def slots(self) -> asyncio.Semaphore:
+        """One slot per worker, for the running event loop; a semaphore cannot be shared across loops"""
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._slots_loop = loop
+        return self._slots
+
+    async def parse(self, upload: IngestedFile, links: bool = False) -> CampaignBatch:
+        """
+        Parse one upload in the pool into a batch, raising asyncio.TimeoutError if it takes too long.
+
+        With `links`, the report's click table is extracted onto the batch as well.
+        The timings measured in the worker are left on `upload.profile`; a cache
+        hit leaves it as None.
+
+        Jobs wait for a free worker slot before the upload is read or the
+        timeout starts, so the timeout covers parsing alone and the pool holds
+        at most one file per worker in memory. A worker cannot be interrupted
+        mid-parse, so a job that times out keeps its slot until it finishes.
+        """
+        key = None
+        if self.cache is not None and self.cache.enabled:
+            key = cache_key(upload.digest, links)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        loop = asyncio.get_running_loop()
+        slots = self.slots()
+        await slots.acquire()
+        try:
+            if self.kind == "process":
+                # Worker processes cannot see the spooled buffer, so the bytes are copied over
+                job = loop.run_in_executor(self.pool, parse_bytes_job, upload.read_bytes(), links)
+            else:
+                job = loop.run_in_executor(self.pool, parse_upload_job, upload, links)
+        except BaseException:
+            slots.release()
+            raise
+        job.add_done_callback(lambda _: slots.release())
+        # Shielded, so giving up on the job does not free its slot before the worker is free
+        batch, upload.profile = await asyncio.wait_for(asyncio.shield(job), self.timeout)
+        
+        if key is not None:
+            self.cache.put(key, batch)
+        return batch
+
+    async def parse_all(self, uploads: List[IngestedFile], links: bool = False) -> list:
+        """Fan uploads out across the pool; returns a batch or the raised exception per upload"""
+        return await asyncio.gather(*(self.parse(upload, links) for upload in uploads), return_exceptions=True)
+
+    async def parse_as_completed(
+        self, uploads: List[IngestedFile], links: bool = False
+    ) -> AsyncIterator[Tuple[IngestedFile, Union[CampaignBatch, Exception]]]:
+        """Yield (upload, batch or raised exception) pairs in the order parsing finishes"""
+        async def run(upload: IngestedFile):
+            try:
+                return upload, await self.parse(upload, links)
+            except Exception as e:
+                return upload, e
+
+        for finished in asyncio.as_completed([run(upload) for upload in uploads]):
+            yield await finished
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,143 @@
+import asyncio
+import secrets
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple, Union
+from app.models import CampaignBatch
+from app.utils.dedup import Deduplicator
+
+
+# A deduplicator slot, or (batch, row) for a campaign without a unique_id
+Arrival = Union[int, Tuple[CampaignBatch, int]]
+
+
+class Workspace:
+    """
+    Deduplicated campaigns accumulated over one or more uploads.
+
+    Campaigns are kept in order of first arrival, which is the order a client
+    keying the records it receives by unique_id ends up holding them in, so
+    indices into entries() mean the same thing on both ends.
+    """
+
+    def __init__(self, policy: str = "latest"):
+        self.deduplicator = Deduplicator(policy)
+        self.lock = asyncio.Lock()
+        self.files = 0
+        self.expires_at = 0.0
+        self._arrivals: List[Arrival] = []
+
+    def __len__(self) -> int:
+        return len(self._arrivals)
+
+    def reserve(self, count: int) -> int:
+        """Claim upload positions for `count` new files; returns the first, later files winning ties"""
+        first = self.files
+        self.files += count
+        return first
+
+    def add(self, batch: CampaignBatch, rows: List[int], source: int) -> Tuple[List[int], List[int]]:
+        """
+        Merge rows of a parsed file uploaded at position `source`.
+
+        Returns the rows kept as-is for lacking a unique_id, and the deduplicator
+        slots whose winning campaign changed.
+        """
+        unique_ids = batch.columns["unique_id"]
+        unkeyed = [row for row in rows if not unique_ids[row]]
+        known = len(self.deduplicator)
+        changed = self.deduplicator.add(batch, rows, source)
+
+        self._arrivals.extend((batch, row) for row in unkeyed)
+        # Slots are numbered as they are created, so new ones follow the last known
+        self._arrivals.extend(range(known, len(self.deduplicator)))
+        return unkeyed, changed
+
+    def entries(self) -> List[Tuple[CampaignBatch, int]]:
+        """Current (batch, row) of every campaign, in order of first arrival"""
+        entry = self.deduplicator.entry
+        return [entry(arrival) if isinstance(arrival, int) else arrival for arrival in self._arrivals]
+
+
+class WorkspaceStore:
+    """
+    Short-lived workspaces keyed by opaque tokens, held in memory only.
+
+    A workspace expires once unused for `ttl` seconds, and the least recently
+    used is evicted when more than `max_workspaces` are open.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_workspaces: int,
+        policy: str = "latest",
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ttl = ttl
+        self.max_workspaces = max_workspaces
+        self.policy = policy
+        self.clock = clock
+        self.evictions = 0
+        self.expirations = 0
+        self._workspaces: "OrderedDict[str, Workspace]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_workspaces > 0 and self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._workspaces)
+
+    def create(self) -> Tuple[str, Workspace]:
+        """Open an empty workspace, returning its token"""
+        self.purge_expired()
+        while len(self._workspaces) >= self.max_workspaces:
+            self._workspaces.popitem(last=False)
+            self.evictions += 1
+
+        token = secrets.token_urlsafe(24)
+        workspace = Workspace(self.policy)
+        workspace.expires_at = self.clock() + self.ttl
+        self._workspaces[token] = workspace
+        return token, workspace
+
+    def get(self, token: str) -> Optional[Workspace]:
+        """Return a live workspace and extend its lifetime, or None if unknown or expired"""
+        workspace = self._workspaces.get(token)
+        if workspace is None:
+            return None
+
+        now = self.clock()
+        if workspace.expires_at <= now:
+            del self._workspaces[token]
+            self.expirations += 1
+            return None
+
+        workspace.expires_at = now + self.ttl
+        self._workspaces.move_to_end(token)
+        return workspace
+
+    def discard(self, token: str) -> bool:
+        """Close a workspace early; returns whether it existed"""
+        return self._workspaces.pop(token, None) is not None
+
+    def purge_expired(self):
+        """Drop every expired workspace"""
+        now = self.clock()
+        for token in [token for token, workspace in self._workspaces.items() if workspace.expires_at <= now]:
+            del self._workspaces[token]
+            self.expirations += 1
+
+    def clear(self):
+        self._workspaces.clear()
+
+    def stats(self) -> dict:
+        """Counters for monitoring"""
+        return {
+            "workspaces": len(self._workspaces),
+            "max_workspaces": self.max_workspaces,
+            "ttl": self.ttl,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
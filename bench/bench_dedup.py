@@ -0,0 +1,80 @@
+"""Benchmark cross-file deduplication of 100k campaigns with a high duplicate ratio.
+
+Run from the repository root:
+
+    python -m bench.bench_dedup
+"""
+import random
+import time
+from typing import Dict, List, Tuple
+from app.models import CampaignBatch
+from app.utils.dedup import DEDUP_POLICIES, Deduplicator
+
+
+FILES = 10
+ROWS_PER_FILE = 10000
+UNIQUE_CAMPAIGNS = 10000  # 90% of the 100k rows are duplicates
+
+
+def make_batches() -> List[CampaignBatch]:
+    """One batch per uploaded file, each drawing from the same pool of campaigns"""
+    random.seed(12)
+    batches = []
+    for _ in range(FILES):
+        ids = [f"{random.randrange(UNIQUE_CAMPAIGNS):012x}" for _ in range(ROWS_PER_FILE)]
+        delivered = [random.choice([None, random.randrange(1, 5000)]) for _ in range(ROWS_PER_FILE)]
+        batches.append(CampaignBatch({
+            "platform": ["mailchimp_aggregated"] * ROWS_PER_FILE,
+            "unique_id": ids,
+            "delivered": delivered,
+            "opens": [random.randrange(0, 1000) for _ in range(ROWS_PER_FILE)],
+        }))
+    return batches
+
+
+def inline_latest(batches: List[CampaignBatch]) -> list:
+    """The previous request-loop dedup: a dict of (file index, batch, row) tuples"""
+    campaigns_by_id: Dict[str, Tuple[int, CampaignBatch, int]] = {}
+    for file_index, batch in enumerate(batches):
+        unique_ids = batch.columns["unique_id"]
+        for row in range(len(batch)):
+            unique_id = unique_ids[row]
+            if unique_id not in campaigns_by_id or file_index > campaigns_by_id[unique_id][0]:
+                campaigns_by_id[unique_id] = (file_index, batch, row)
+    return [(batch, row) for _, batch, row in campaigns_by_id.values()]
+
+
+def engine(policy: str):
+    def run(batches: List[CampaignBatch]) -> list:
+        deduplicator = Deduplicator(policy)
+        for source, batch in enumerate(batches):
+            deduplicator.add(batch, range(len(batch)), source)
+        return list(deduplicator.entries())
+    return run
+
+
+def measure(func, batches) -> Tuple[float, list]:
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        result = func(batches)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    batches = make_batches()
+    rows = FILES * ROWS_PER_FILE
+    baseline, expected = measure(inline_latest, batches)
+    print(f"{rows} campaigns, {UNIQUE_CAMPAIGNS} unique")
+    print(f"{'':>16} {'ms':>8} {'ns/row':>8} {'kept':>7}")
+    print(f"{'inline latest':>16} {baseline * 1000:>8.1f} {baseline / rows * 1e9:>8.0f} {len(expected):>7}")
+    for policy in DEDUP_POLICIES:
+        elapsed, result = measure(engine(policy), batches)
+        if policy == "latest":
+            assert result == expected
+        print(f"{policy:>16} {elapsed * 1000:>8.1f} {elapsed / rows * 1e9:>8.0f} {len(result):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark MailChimp A/B parsing: the previous two-pass parser vs the single-pass stream.
+
+Run from the repository root:
+
+    python -m bench.bench_mailchimp_ab
+"""
+import time
+import tracemalloc
+from typing import Iterable, List
+from app.parsers.mailchimp_ab import COMBINATION_FIELDS, HEADER_FIELDS, MailChimpABParser
+from app.parsers.tokenizer import split_quoted_kv
+from bench.generators import mailchimp_ab
+
+
+SIZES = ((2, 10), (24, 1000), (48, 10000), (96, 100000))
+
+
+def two_pass(lines: Iterable[str]) -> List[dict]:
+    """The previous parser's scans: a header pass over every line, then a pass per combination"""
+    lines = [l.strip() for l in lines if l.strip()]
+
+    header = {"campaign_title": None, "delivery_date": None}
+    for line in lines:
+        key, val = split_quoted_kv(line)
+        setter = HEADER_FIELDS.get(key)
+        if setter is not None:
+            setter(header, val)
+
+    combinations = []
+    i = 0
+    while i < len(lines):
+        if lines[i].startswith('"Combination') and 'Stats' in lines[i]:
+            data = {}
+            i += 1
+            while i < len(lines) and not lines[i].startswith(('"Combination', '"URL"')):
+                key, val = split_quoted_kv(lines[i])
+                setter = COMBINATION_FIELDS.get(key)
+                if setter is not None:
+                    setter(data, val)
+                i += 1
+            combinations.append(data)
+        else:
+            i += 1
+    return [{"delivered": data.get("delivered"), "opens": data.get("opens")} for data in combinations]
+
+
+def single_pass(lines: Iterable[str]) -> List[dict]:
+    return [
+        {"delivered": campaign.delivered, "opens": campaign.opens}
+        for campaign in MailChimpABParser().iter_campaigns(lines)
+    ]
+
+
+def measure(func, lines: List[str]):
+    """Best-of-five milliseconds and peak traced KB, fed line by line as a file would be"""
+    timings = []
+    for _ in range(5):
+        stream = iter(lines)
+        start = time.perf_counter()
+        func(stream)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(iter(lines))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings) * 1000, peak / 1024
+
+
+def main():
+    print(f"{'combinations':>12} {'urls':>7} {'two-pass ms':>12} {'KB':>7} {'single ms':>10} {'KB':>7} {'speedup':>8}")
+    for combinations, urls in SIZES:
+        lines = mailchimp_ab(combinations, urls).splitlines(keepends=True)
+        assert two_pass(lines) == single_pass(lines)
+        legacy, legacy_peak = measure(two_pass, lines)
+        stream, stream_peak = measure(single_pass, lines)
+        print(
+            f"{combinations:>12} {urls:>7} {legacy:>12.2f} {legacy_peak:>7.0f} "
+            f"{stream:>10.2f} {stream_peak:>7.0f} {legacy / stream:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark MailerLite Classic parsing as the "Links activity" table grows: full scan vs early termination.
+
+Run from the repository root:
+
+    python -m bench.bench_mailerlite
+"""
+import time
+from typing import Iterable, List
+from app.parsers.mailerlite_classic import FIELDS, SECTION_FIELDS, SECTION_HEADERS, MailerLiteClassicParser
+from app.parsers.tokenizer import split_kv
+from bench.generators import mailerlite_classic
+
+
+LINKS = (10, 1000, 10000, 100000)
+
+
+def full_scan(lines: Iterable[str]) -> dict:
+    """The previous field loop, which walked every line of the report"""
+    fields = None
+    record = dict.fromkeys(FIELDS)
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            continue
+        section = SECTION_HEADERS.get(line)
+        if section is not None:
+            fields = SECTION_FIELDS.get(section)
+            continue
+        if fields is not None:
+            key, val = split_kv(line)
+            setter = fields.get(key)
+            if setter is not None:
+                setter(record, val)
+    return record
+
+
+def state_machine(lines: Iterable[str]) -> dict:
+    """The parser itself, so also building the campaign and its unique_id"""
+    campaign = MailerLiteClassicParser().parse_lines(lines)[0].to_dict()
+    return {field: campaign[field] for field in FIELDS}
+
+
+def measure(func, lines: List[str]) -> float:
+    """Best-of-five microseconds per report, fed line by line as a file would be"""
+    timings = []
+    for _ in range(5):
+        stream = iter(lines)
+        start = time.perf_counter()
+        func(stream)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1e6
+
+
+def main():
+    print(f"{'links':>8} {'full scan (us)':>15} {'early exit (us)':>16} {'speedup':>9}")
+    for links in LINKS:
+        lines = mailerlite_classic(links).splitlines(keepends=True)
+        assert full_scan(lines) == state_machine(lines)
+        scan = measure(full_scan, lines)
+        early = measure(state_machine, lines)
+        print(f"{links:>8} {scan:>15.0f} {early:>16.0f} {scan / early:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Benchmark every parser, and detect_and_parse end to end, on synthetic reports of growing size.
+
+Reports throughput (input rows/s, MB/s, campaigns/s), peak traced memory and
+latency percentiles per case. The JSON written with --output can be passed to
+--compare on a later commit to print the change in median latency per case.
+
+Run from the repository root:
+
+    python -m bench.bench_parsers [--quick] [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional
+import numpy as np
+from app.parsers.base_parser import BaseParser
+from app.parsers.mailchimp import MailChimpParser
+from app.parsers.mailchimp_ab import MailChimpABParser
+from app.parsers.mailchimp_aggregated import MailChimpAggregatedParser
+from app.parsers.mailerlite_classic import MailerLiteClassicParser
+from app.utils.detector import detect_and_parse
+from bench import generators
+
+
+# Seconds spent timing each case, within the iteration bounds below
+TIME_BUDGET = 2.0
+MIN_ITERATIONS = 5
+MAX_ITERATIONS = 200
+
+
+class Case(NamedTuple):
+    name: str
+    parser: BaseParser
+    text: str
+    campaigns: int
+
+
+def make_cases(quick: bool) -> List[Case]:
+    """Reports of each format, scaled along the part that grows in real exports"""
+    sizes = (10, 1000) if quick else (10, 1000, 10000)
+    rows = (100, 1000) if quick else (100, 10000, 50000)
+    combinations = ((2, 10), (24, 1000)) if quick else ((2, 10), (24, 1000), (48, 10000))
+
+    cases = []
+    for links in sizes:
+        cases.append(Case(f"mailerlite_classic/links={links}", MailerLiteClassicParser(), generators.mailerlite_classic(links), 1))
+    for urls in sizes:
+        cases.append(Case(f"mailchimp/urls={urls}", MailChimpParser(), generators.mailchimp_single(urls), 1))
+    for count, urls in combinations:
+        cases.append(Case(
+            f"mailchimp_ab/combinations={count},urls={urls}",
+            MailChimpABParser(),
+            generators.mailchimp_ab(count, urls),
+            count,
+        ))
+    for count in rows:
+        cases.append(Case(f"mailchimp_aggregated/rows={count}", MailChimpAggregatedParser(), generators.mailchimp_aggregated(count), count))
+    return cases
+
+
+def parser_target(case: Case) -> Callable[[], int]:
+    return lambda: len(case.parser.parse_batch(io.StringIO(case.text, newline=None)))
+
+
+def detect_target(case: Case) -> Callable[[], int]:
+    return lambda: len(detect_and_parse(case.text))
+
+
+def peak_memory(target: Callable[[], int]) -> int:
+    """Peak bytes allocated by Python while running the target once"""
+    tracemalloc.start()
+    try:
+        target()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(case: Case, mode: str, target: Callable[[], int], max_iterations: int) -> dict:
+    # The first run warms caches and sizes the iteration count
+    start = time.perf_counter()
+    target()
+    estimate = time.perf_counter() - start
+    iterations = int(min(max_iterations, max(MIN_ITERATIONS, TIME_BUDGET / max(estimate, 1e-9))))
+
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        target()
+        timings[i] = time.perf_counter() - start
+
+    median = float(np.median(timings))
+    rows = case.text.count("\n")
+    size = len(case.text.encode())
+    p50, p90, p99 = np.percentile(timings, (50, 90, 99)) * 1000
+    return {
+        "case": case.name,
+        "mode": mode,
+        "iterations": iterations,
+        "input_rows": rows,
+        "input_bytes": size,
+        "campaigns": case.campaigns,
+        "rows_per_s": rows / median,
+        "mb_per_s": size / median / 1e6,
+        "campaigns_per_s": case.campaigns / median,
+        "peak_memory_bytes": peak_memory(target),
+        "latency_ms": {
+            "min": float(timings.min()) * 1000,
+            "mean": float(timings.mean()) * 1000,
+            "p50": float(p50),
+            "p90": float(p90),
+            "p99": float(p99),
+        },
+    }
+
+
+def commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results: List[dict], baseline: Dict[tuple, dict]):
+    header = f"{'case':<44} {'mode':<8} {'p50 ms':>9} {'p99 ms':>9} {'rows/s':>11} {'MB/s':>7} {'peak KB':>9}"
+    if baseline:
+        header += f" {'vs base':>8}"
+    print(header, file=sys.stderr)
+    for result in results:
+        latency = result["latency_ms"]
+        line = (
+            f"{result['case']:<44} {result['mode']:<8} {latency['p50']:>9.3f} {latency['p99']:>9.3f} "
+            f"{result['rows_per_s']:>11.0f} {result['mb_per_s']:>7.1f} {result['peak_memory_bytes'] / 1024:>9.0f}"
+        )
+        previous = baseline.get((result["case"], result["mode"]))
+        if previous is not None:
+            line += f" {latency['p50'] / previous['latency_ms']['p50']:>7.2f}x"
+        print(line, file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="smaller reports and fewer iterations")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare median latency against")
+    args = parser.parse_args(argv)
+
+    max_iterations = 20 if args.quick else MAX_ITERATIONS
+    results = []
+    for case in make_cases(args.quick):
+        # Parsing directly and through detection must agree before either is timed
+        campaigns = parser_target(case)()
+        assert campaigns == detect_target(case)() == case.campaigns, case.name
+        results.append(measure(case, "parser", parser_target(case), max_iterations))
+        results.append(measure(case, "detect", detect_target(case), max_iterations))
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {(result["case"], result["mode"]): result for result in json.load(f)["results"]}
+    print_table(results, baseline)
+
+    report = {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "quick": args.quick,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
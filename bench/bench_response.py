@@ -0,0 +1,83 @@
+"""Benchmark /parse response serialization: FastAPI's generic encoder vs ParseResponse.
+
+Run from the repository root:
+
+    python -m bench.bench_response
+"""
+import statistics
+import time
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.models import CampaignBatch, EmailCampaign
+from app.utils.responses import ParseResponse
+
+
+SIZES = (10, 1000, 50000)
+
+
+def make_results(count: int):
+    """Build a batch of synthetic campaigns and the (filename, batch, row) result entries"""
+    batch = CampaignBatch.from_campaigns(
+        EmailCampaign(
+            platform="mailchimp_aggregated",
+            subject=f"Weekly Newsletter #{i} – Product Updates",
+            email_title=f"Campaign {i}",
+            unique_id=f"{i:012x}",
+            sent_at="2021-08-07 16:00",
+            delivered=3902 + i,
+            opens=1489,
+            open_rate=0.3891,
+            clicks=33,
+            click_rate=0.0086,
+            ctor=33 / 1489,
+            unsubscribes=97,
+            unsubscribe_rate=97 / 3902,
+            spam_complaints=0,
+            hard_bounces=21,
+            hard_bounce_rate=21 / 3902,
+            soft_bounces=54,
+            soft_bounce_rate=54 / 3902,
+        )
+        for i in range(count)
+    )
+    return [("deduplicated", batch, row) for row in range(count)]
+
+
+def generic_encoder(results, errors) -> bytes:
+    """The previous path: per-campaign dicts, jsonable_encoder, then JSONResponse"""
+    content = {
+        "results": [
+            {"filename": filename, "data": {"campaign": batch.row_dict(row)}}
+            for filename, batch, row in results
+        ],
+        "errors": errors,
+    }
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def fast_encoder(results, errors) -> bytes:
+    return ParseResponse(results, errors).body
+
+
+def measure(func, results, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(results, [])
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    print(f"{'campaigns':>10} {'generic (ms)':>14} {'ParseResponse (ms)':>20} {'speedup':>9}")
+    for size in SIZES:
+        results = make_results(size)
+        assert generic_encoder(results, []) == fast_encoder(results, [])
+        repeat = 5 if size >= 10000 else 50
+        generic = measure(generic_encoder, results, repeat)
+        fast = measure(fast_encoder, results, repeat)
+        print(f"{size:>10} {generic * 1000:>14.2f} {fast * 1000:>20.2f} {generic / fast:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark per-line tokenizing: the per-module helpers the parsers used to copy vs app.parsers.tokenizer.
+
+Run from the repository root:
+
+    python -m bench.bench_tokenizer
+"""
+import re
+import time
+from app.parsers.mailchimp import FIELDS
+from app.parsers.tokenizer import extract_number_and_percent, split_quoted_kv
+from tests.fixtures import MAILCHIMP_SINGLE_SAMPLE
+
+
+LINES = [line.strip() for line in MAILCHIMP_SINGLE_SAMPLE.splitlines() if line.strip()]
+VALUES = [value for _, value in map(split_quoted_kv, LINES) if value and value[0].isdigit()]
+REPEAT = 20000
+
+
+def legacy_parse_kv(line: str):
+    parts = [p.strip().strip('"') for p in line.split('","') if p.strip()]
+    if len(parts) >= 2:
+        key = parts[0].strip(':').strip()
+        value = parts[1].strip()
+        return key, value
+    return None, None
+
+
+def legacy_extract_number_and_percent(value: str):
+    if not value:
+        return None, None
+    num_match = re.search(r'([\d,]+)', value)
+    num = int(num_match.group(1).replace(',', '')) if num_match else None
+    pct_match = re.search(r'\(([\d.]+)%\)', value)
+    pct = float(pct_match.group(1)) / 100 if pct_match else None
+    return num, pct
+
+
+def legacy_line(line: str, data: dict):
+    """One line of the old if/elif chain from the MailChimp parser"""
+    key, val = legacy_parse_kv(line)
+    if not key:
+        return
+    if key == "Title":
+        data["campaign_title"] = val
+    elif key == "Subject Line":
+        data["subject"] = val
+    elif key == "Delivery Date/Time":
+        data["sent_at"] = val
+    elif key == "Successful Deliveries":
+        data["delivered"] = int(val.replace(',', ''))
+    elif key == "Recipients Who Opened":
+        data["opens"], data["open_rate"] = legacy_extract_number_and_percent(val)
+    elif key == "Recipients Who Clicked":
+        data["clicks"], data["click_rate"] = legacy_extract_number_and_percent(val)
+    elif key == "Total Unsubs":
+        data["unsubscribes"] = int(val.replace(',', '')) if val != "0" else 0
+    elif key == "Total Abuse Complaints":
+        data["spam_complaints"] = int(val.replace(',', '')) if val != "0" else 0
+    elif key == "Bounces":
+        data["bounces"], data["bounce_rate"] = legacy_extract_number_and_percent(val)
+
+
+def tokenizer_line(line: str, data: dict):
+    key, val = split_quoted_kv(line)
+    setter = FIELDS.get(key)
+    if setter is not None:
+        setter(data, val)
+
+
+def measure(func, inputs) -> float:
+    """Best-of-five nanoseconds per input"""
+    timings = []
+    for _ in range(5):
+        data = {}
+        start = time.perf_counter()
+        for _ in range(REPEAT):
+            for item in inputs:
+                func(item, data)
+        timings.append(time.perf_counter() - start)
+    return min(timings) / (REPEAT * len(inputs)) * 1e9
+
+
+CASES = (
+    ("split", LINES, lambda line, data: legacy_parse_kv(line), lambda line, data: split_quoted_kv(line)),
+    (
+        "number",
+        VALUES,
+        lambda value, data: legacy_extract_number_and_percent(value),
+        lambda value, data: extract_number_and_percent(value),
+    ),
+    ("line", LINES, legacy_line, tokenizer_line),
+)
+
+
+def main():
+    legacy_data, tokenizer_data = {}, {}
+    for line in LINES:
+        legacy_line(line, legacy_data)
+        tokenizer_line(line, tokenizer_data)
+    assert legacy_data == tokenizer_data
+
+    print(f"{'':>8} {'legacy (ns)':>12} {'tokenizer (ns)':>15} {'speedup':>9}")
+    for name, inputs, legacy_func, tokenizer_func in CASES:
+        legacy = measure(legacy_func, inputs)
+        tokenizer = measure(tokenizer_func, inputs)
+        print(f"{name:>8} {legacy:>12.0f} {tokenizer:>15.0f} {legacy / tokenizer:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
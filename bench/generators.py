@@ -0,0 +1,153 @@
+"""Synthetic reports in every supported format, scaled by their repeating parts.
+
+Each generator is deterministic for a given seed and mirrors the layout of the
+anonymized fixtures in tests/fixtures.py.
+"""
+import random
+from typing import List
+
+
+AGGREGATED_HEADER = (
+    'Title,Subject,List,"Send Date","Send Weekday","Total Recipients","Successful Deliveries",'
+    '"Soft Bounces","Hard Bounces","Total Bounces","Times Forwarded","Forwarded Opens","Unique Opens",'
+    '"Open Rate","Total Opens","Unique Clicks","Click Rate","Total Clicks",Unsubscribes,"Abuse Complaints",'
+    '"Times Liked on Facebook","Folder Id","Unique Id","Total Orders","Total Gross Sales","Total Revenue"'
+)
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+def _percent(part: int, whole: int) -> str:
+    return f"{part / whole * 100:.2f}%" if whole else "0%"
+
+
+def _links(rng: random.Random, count: int) -> List[str]:
+    return [f"https://example.com/articles/{rng.randrange(10 ** 6)}?utm_campaign=weekly&position={i}" for i in range(count)]
+
+
+def mailerlite_classic(links: int = 10, seed: int = 0) -> str:
+    """MailerLite Classic report with `links` rows in its "Links activity" section"""
+    rng = random.Random(seed)
+    sent = rng.randrange(1000, 50000)
+    opened = rng.randrange(sent // 10, sent // 2)
+    clicked = rng.randrange(1, opened // 4)
+    lines = [
+        "Campaign report",
+        f'"Subject:","Weekly Newsletter #{rng.randrange(1000)} - Product Updates"',
+        f'"Sent","2021-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d} {rng.randrange(24):02d}:00:00"',
+        "",
+        '"Campaign results"',
+        f'"Total emails sent:","{sent}"',
+        f'"Opened:","{opened} ({_percent(opened, sent)})"',
+        f'"Clicked:","{clicked} ({_percent(clicked, sent)})"',
+        "",
+        '"Bad statistics"',
+        f'"Unsubscribed:","{sent // 100} ({_percent(sent // 100, sent)})"',
+        '"Spam complaints:","0 (0%)"',
+        f'"Hard bounce:","{sent // 200} ({_percent(sent // 200, sent)})"',
+        f'"Soft bounce:","{sent // 80} ({_percent(sent // 80, sent)})"',
+        "",
+        '"Reading environment"',
+        '"Mobile:","34.92%"',
+        '"Webmail:","61.38%"',
+        '"Desktop:","3.7%"',
+        "",
+        '"Links activity"',
+        '"Links","Unique clicks","Total clicks"',
+    ]
+    for url in _links(rng, links):
+        unique = rng.randrange(clicked + 1)
+        lines.append(f'"{url}","{unique}","{unique + rng.randrange(5)}"')
+    lines.append('"Unsubscribe link","83","90"')
+    return "\n".join(lines) + "\n"
+
+
+def _mailchimp_stats(rng: random.Random) -> List[str]:
+    recipients = rng.randrange(1000, 50000)
+    bounces = rng.randrange(recipients // 100 + 1)
+    delivered = recipients - bounces
+    opened = rng.randrange(delivered // 10, delivered // 2)
+    clicked = rng.randrange(1, opened // 4)
+    return [
+        f'"Total Recipients:","{recipients:,}"',
+        f'"Successful Deliveries:","{delivered:,}"',
+        f'"Bounces:","{bounces} ({_percent(bounces, recipients)})"',
+        '"Times Forwarded:","0"',
+        '"Forwarded Opens:","0"',
+        f'"Recipients Who Opened:","{opened:,} ({_percent(opened, delivered)})"',
+        f'"Total Opens:","{opened + rng.randrange(opened):,}"',
+        '"Last Open Date:","4/30/21 6:04"',
+        f'"Recipients Who Clicked:","{clicked:,} ({_percent(clicked, delivered)})"',
+        f'"Total Clicks:","{clicked + rng.randrange(clicked + 1):,}"',
+        '"Last Click Date:","4/30/21 6:01"',
+        f'"Total Unsubs:","{rng.randrange(20)}"',
+        '"Total Abuse Complaints:","0"',
+    ]
+
+
+def _clicks_by_url(rng: random.Random, urls: int) -> List[str]:
+    lines = ["", '"Clicks by URL"', '"URL","Total Clicks","Unique Clicks"']
+    for url in _links(rng, urls):
+        unique = rng.randrange(100)
+        lines.append(f'"{url}","{unique + rng.randrange(5)}","{unique}"')
+    return lines
+
+
+def mailchimp_single(urls: int = 10, seed: int = 0) -> str:
+    """MailChimp single campaign report with `urls` rows under "Clicks by URL\""""
+    rng = random.Random(seed)
+    lines = [
+        "Email Campaign Report",
+        f'"Title:","Summer Sale Campaign {rng.randrange(1000)}"',
+        '"Subject Line:","Get 20% Off Today Only!"',
+        f'"Delivery Date/Time:","Mon, {rng.choice(MONTHS)} {rng.randrange(1, 29)}, 2021 12:25"',
+        "",
+        '"Overall Stats"',
+        *_mailchimp_stats(rng),
+        '"Times Liked on Facebook:","0"',
+        *_clicks_by_url(rng, urls),
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def mailchimp_ab(combinations: int = 2, urls: int = 10, seed: int = 0) -> str:
+    """MailChimp A/B report with `combinations` blocks followed by `urls` rows under "Clicks by URL\""""
+    rng = random.Random(seed)
+    lines = [
+        "Campaign Report",
+        f'"Title:","Spring Promo AB Test {rng.randrange(1000)}"',
+        f'"Delivery Date/Time:","Sat, {rng.choice(MONTHS)} {rng.randrange(1, 29)}, 2021 10:15"',
+    ]
+    for combination in range(1, combinations + 1):
+        lines += [
+            "",
+            f'"Combination {combination} Stats"',
+            f'"Subject Line:","Spring Sale - Variant {combination}"',
+            '"From Name:","Company Store"',
+            '"From Email:","hello@example.com"',
+            *_mailchimp_stats(rng),
+        ]
+    lines += _clicks_by_url(rng, urls)
+    return "\n".join(lines) + "\n"
+
+
+def mailchimp_aggregated(rows: int = 100, seed: int = 0) -> str:
+    """Aggregated MailChimp CSV export with `rows` campaigns"""
+    rng = random.Random(seed)
+    lines = [AGGREGATED_HEADER]
+    for row in range(rows):
+        recipients = rng.randrange(100, 50000)
+        soft, hard = rng.randrange(recipients // 100 + 1), rng.randrange(recipients // 200 + 1)
+        delivered = recipients - soft - hard
+        opened = rng.randrange(delivered // 10, delivered // 2 + 1)
+        clicked = rng.randrange(opened // 4 + 1)
+        lines.append(
+            f'"Campaign {row}","Newsletter #{row}","Main List",'
+            f'"{rng.choice(MONTHS)} {rng.randrange(1, 29):02d}, {rng.randrange(2015, 2025)} '
+            f'{rng.randrange(1, 13):02d}:{rng.randrange(60):02d} {rng.choice(("am", "pm"))}",'
+            f"{rng.choice(WEEKDAYS)},{recipients},{delivered},{soft},{hard},{soft + hard},0,0,"
+            f"{opened},{_percent(opened, delivered)},{opened + rng.randrange(opened + 1)},"
+            f"{clicked},{_percent(clicked, delivered)},{clicked + rng.randrange(clicked + 1)},"
+            f"{rng.randrange(20)},0,0,0,{rng.getrandbits(40):010x},0,0,0"
+        )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,98 @@
+export const NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+export interface StreamedCampaign {
+  unique_id?: string
+}
+
+export interface ResultRecord<T extends StreamedCampaign> {
+  type: 'result'
+  filename: string
+  data: { campaign: T }
+}
+
+export interface ErrorRecord {
+  type: 'error'
+  filename: string
+  error: string
+}
+
+/**
+ * Per-metric outlier and low-volume campaigns, as indices into the parsed campaigns.
+ */
+export interface CampaignFlags {
+  method: string
+  outliers: Record<string, number[]>
+  low_volume: number[]
+}
+
+export interface SummaryRecord {
+  type: 'summary'
+  campaigns: number
+  files: number
+  errors: number
+  duplicates: number
+  flags?: CampaignFlags
+}
+
+export type ParseRecord<T extends StreamedCampaign> = ResultRecord<T> | ErrorRecord | SummaryRecord
+
+export interface ParseStreamState<T extends StreamedCampaign> {
+  results: Map<string, { filename: string; data: { campaign: T } }>
+  errors: Array<{ filename: string; error: string }>
+  summary: SummaryRecord | null
+}
+
+export const createParseStreamState = <T extends StreamedCampaign>(): ParseStreamState<T> => ({
+  results: new Map(),
+  errors: [],
+  summary: null,
+})
+
+/**
+ * Fold one streamed record into the running state. The server only sends a campaign
+ * when it supersedes earlier copies, so keying by unique_id reproduces its deduplication.
+ */
+export const applyParseRecord = <T extends StreamedCampaign>(
+  state: ParseStreamState<T>,
+  record: ParseRecord<T>
+): ParseStreamState<T> => {
+  if (record.type === 'result') {
+    const key = record.data.campaign.unique_id || `${record.filename}#${state.results.size}`
+    state.results.set(key, { filename: record.filename, data: record.data })
+  } else if (record.type === 'error') {
+    state.errors.push({ filename: record.filename, error: record.error })
+  } else if (record.type === 'summary') {
+    state.summary = record
+  }
+  return state
+}
+
+/**
+ * Read an NDJSON response body incrementally, invoking onRecord for each complete line.
+ */
+export const readNdjson = async <T>(response: Response, onRecord: (record: T) => void) => {
+  if (!response.body) {
+    const text = await response.text()
+    text.split('\n').filter(line => line.trim()).forEach(line => onRecord(JSON.parse(line) as T))
+    return
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+
+  while (true) {
+    const { done, value } = await reader.read()
+    buffer += decoder.decode(value, { stream: !done })
+
+    const lines = buffer.split('\n')
+    buffer = lines.pop() ?? ''
+    lines.filter(line => line.trim()).forEach(line => onRecord(JSON.parse(line) as T))
+
+    if (done) break
+  }
+
+  if (buffer.trim()) {
+    onRecord(JSON.parse(buffer) as T)
+  }
+}
@@ -1,14 +1,55 @@
+import { readdirSync, readFileSync, statSync, writeFileSync } from 'node:fs'
+import { join, resolve } from 'node:path'
 import { fileURLToPath, URL } from 'node:url'
+import { brotliCompressSync, constants, gzipSync } from 'node:zlib'
 
+import type { Plugin } from 'vite'
 import { defineConfig } from 'vitest/config'
 import vue from '@vitejs/plugin-vue'
 import vueDevTools from 'vite-plugin-vue-devtools'
 
+const COMPRESSIBLE = /\.(html|js|mjs|css|svg|json|ico|txt)$/
+const MIN_COMPRESS_SIZE = 1024
+
+// Write .br and .gz siblings of the build output; the backend serves them to clients that accept them
+const precompress = (): Plugin => {
+  let outDir = 'dist'
+  const walk = (dir: string): string[] =>
+    readdirSync(dir).flatMap(name => {
+      const path = join(dir, name)
+      return statSync(path).isDirectory() ? walk(path) : [path]
+    })
+
+  return {
+    name: 'precompress',
+    apply: 'build',
+    configResolved(config) {
+      outDir = resolve(config.root, config.build.outDir)
+    },
+    closeBundle() {
+      for (const path of walk(outDir)) {
+        if (!COMPRESSIBLE.test(path)) continue
+        const content = readFileSync(path)
+        if (content.length < MIN_COMPRESS_SIZE) continue
+
+        const variants: Array<[string, Buffer]> = [
+          ['.br', brotliCompressSync(content, { params: { [constants.BROTLI_PARAM_QUALITY]: 11 } })],
+          ['.gz', gzipSync(content, { level: 9 })],
+        ]
+        for (const [suffix, compressed] of variants) {
+          if (compressed.length < content.length) writeFileSync(path + suffix, compressed)
+        }
+      }
+    },
+  }
+}
+
 // https://vite.dev/config/
 export default defineConfig({
   plugins: [
     vue(),
     vueDevTools(),
+    precompress(),
   ],
   resolve: {
     alias: {
@@ -1,8 +1,829 @@
 """Unit tests for FastAPI endpoints."""
 import pytest
 from fastapi.testclient import TestClient
-from app.main import app
+from app.main import app, limiter, metrics, parse_cache, workspace_store
+from app.utils.ingest import ArchiveExpander, IngestedFile, MultipartIngestor, UploadRejectedError, gunzip_stream
+from tests.fixtures import MAILERLITE_CLASSIC_SAMPLE, MAILCHIMP_AGGREGATED_SAMPLE, MAILCHIMP_SINGLE_SAMPLE
 import io
+import zipfile
+import gzip
+import json
+import asyncio
 
 
 client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def disable_rate_limit():
+    limiter.enabled = False
+    yield
+    limiter.enabled = True
+
+
+@pytest.fixture(autouse=True)
+def clear_parse_cache():
+    parse_cache.clear()
+    yield
+    parse_cache.clear()
+
+
+class TestParseEndpoint:
+    """Test /parse upload handling"""
+    
+    def test_parse_valid_csv(self):
+        """Test a valid report is parsed into campaigns"""
+        response = client.post("/parse", files=[
+            ("files", ("report.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv")),
+        ])
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["errors"] == []
+        assert len(data["results"]) == 1
+        assert data["results"][0]["data"]["campaign"]["platform"] == "mailerlite_classic"
+    
+    def test_parse_rejects_non_csv(self):
+        """Test non-CSV files are reported as per-file errors"""
+        response = client.post("/parse", files=[
+            ("files", ("report.txt", b"hello", "text/plain")),
+            ("files", ("report.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv")),
+        ])
+        
+        data = response.json()
+        assert data["errors"] == [{"filename": "report.txt", "error": "Only CSV files supported"}]
+        assert len(data["results"]) == 3
+    
+    def test_parse_too_many_files(self, monkeypatch):
+        """Test uploads over MAX_FILES are rejected"""
+        monkeypatch.setattr("app.main.MAX_FILES", 1)
+        response = client.post("/parse", files=[
+            ("files", ("a.csv", b"a", "text/csv")),
+            ("files", ("b.csv", b"b", "text/csv")),
+        ])
+        
+        assert response.status_code == 400
+        assert "Too many files" in response.json()["detail"]
+    
+    def test_parse_file_too_large(self, monkeypatch):
+        """Test a single oversized file is reported without failing the request"""
+        monkeypatch.setattr("app.main.MAX_FILE_SIZE", 1024 * 1024)
+        response = client.post("/parse", files=[
+            ("files", ("big.csv", b"x" * (1024 * 1024 + 1), "text/csv")),
+            ("files", ("report.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv")),
+        ])
+        
+        data = response.json()
+        assert response.status_code == 200
+        assert data["errors"][0]["filename"] == "big.csv"
+        assert "File too large" in data["errors"][0]["error"]
+        assert len(data["results"]) == 1
+    
+    def test_parse_deduplicates_across_files(self):
+        """Test the same campaign uploaded twice is returned once"""
+        response = client.post("/parse", files=[
+            ("files", ("a.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv")),
+            ("files", ("b.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv")),
+        ])
+        
+        data = response.json()
+        assert len(data["results"]) == 3
+        assert all(r["filename"] == "deduplicated" for r in data["results"])
+        assert all("_file_index" not in r["data"]["campaign"] for r in data["results"])
+    
+    def test_parse_unsupported_format(self):
+        """Test unrecognized content is reported as unsupported"""
+        response = client.post("/parse", files=[
+            ("files", ("random.csv", b"not,a,report\n1,2,3\n", "text/csv")),
+        ])
+        
+        data = response.json()
+        assert data["results"] == []
+        assert data["errors"][0]["error"].startswith("Unsupported format")
+
+
+class TestParseCaching:
+    """Test repeated uploads are served from the parse cache"""
+    
+    def test_repeat_upload_hits_cache(self):
+        """Test identical content is parsed once, whatever the filename"""
+        hits = parse_cache.hits
+        first = client.post("/parse", files=[
+            ("files", ("march.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv")),
+        ])
+        second = client.post("/parse", files=[
+            ("files", ("march-again.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv")),
+        ])
+        
+        assert second.json() == first.json()
+        assert parse_cache.hits == hits + 1
+        assert client.get("/health").json()["parse_cache"]["entries"] == 1
+
+
+class TestMultipartIngestor:
+    """Test streaming multipart ingestion limits"""
+    
+    @staticmethod
+    def _body(parts, boundary="XBOUNDARY"):
+        body = b""
+        for filename, content in parts:
+            body += (
+                f'--{boundary}\r\nContent-Disposition: form-data; name="files"; filename="{filename}"\r\n'
+                f'Content-Type: text/csv\r\n\r\n'
+            ).encode() + content + b"\r\n"
+        return body + f"--{boundary}--\r\n".encode()
+    
+    @staticmethod
+    def _run(ingestor, body, chunk=7):
+        async def stream():
+            for i in range(0, len(body), chunk):
+                yield body[i:i + chunk]
+        
+        return asyncio.run(ingestor.ingest("multipart/form-data; boundary=XBOUNDARY", stream()))
+    
+    def test_ingest_streams_into_text(self):
+        """Test small chunks are reassembled into the original text"""
+        uploads = self._run(MultipartIngestor(), self._body([("a.csv", b"line 1\r\nline 2\n")]))
+        
+        with uploads[0].open_text() as stream:
+            assert list(stream) == ["line 1\n", "line 2\n"]
+        assert uploads[0].size == len(b"line 1\r\nline 2\n")
+    
+    def test_total_limit_aborts_early(self):
+        """Test the total limit aborts before the body is fully consumed"""
+        consumed = []
+        body = self._body([("a.csv", b"x" * 100), ("b.csv", b"y" * 100)])
+        
+        async def stream():
+            for i in range(0, len(body), 10):
+                consumed.append(i)
+                yield body[i:i + 10]
+        
+        ingestor = MultipartIngestor(max_file_size=1000, max_total_size=150)
+        with pytest.raises(UploadRejectedError) as exc_info:
+            asyncio.run(ingestor.ingest("multipart/form-data; boundary=XBOUNDARY", stream()))
+        
+        assert exc_info.value.status_code == 413
+        assert len(consumed) * 10 < len(body)
+    
+    def test_missing_boundary(self):
+        """Test non-multipart bodies are rejected"""
+        async def stream():
+            yield b"hello"
+        
+        with pytest.raises(UploadRejectedError):
+            asyncio.run(MultipartIngestor().ingest("text/plain", stream()))
+
+
+class TestParseStreaming:
+    """Test NDJSON streaming mode for /parse"""
+    
+    @staticmethod
+    def _records(response):
+        return [json.loads(line) for line in response.text.splitlines()]
+    
+    def test_stream_records_and_summary(self):
+        """Test results, errors and a final summary are streamed as NDJSON"""
+        response = client.post("/parse", headers={"Accept": "application/x-ndjson"}, files=[
+            ("files", ("report.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv")),
+            ("files", ("notes.txt", b"hello", "text/plain")),
+        ])
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        records = self._records(response)
+        assert [r["type"] for r in records] == ["error", "result", "summary"]
+        assert records[0] == {"type": "error", "filename": "notes.txt", "error": "Only CSV files supported"}
+        assert records[1]["data"]["campaign"]["platform"] == "mailerlite_classic"
+        summary = dict(records[2])
+        flags = summary.pop("flags")
+        assert summary == {"type": "summary", "campaigns": 1, "files": 2, "errors": 1, "duplicates": 0}
+        assert flags["low_volume"] == [] and not any(flags["outliers"].values())
+    
+    @pytest.mark.parametrize("policy, delivered", [
+        ("latest", [100, 133, 134]),
+        ("max_delivered", [108, 133, 134]),
+        ("merge", [100, 133, 134]),
+    ])
+    def test_stream_converges_to_deduplicated_set(self, policy, delivered, monkeypatch):
+        """Test keying streamed results by unique_id matches the JSON response"""
+        monkeypatch.setattr("app.main.DEDUP_POLICY", policy)
+        # Same campaigns with fewer deliveries, so the policies disagree on the winner
+        resent = MAILCHIMP_AGGREGATED_SAMPLE.replace(",110,108,", ",110,100,")
+        files = [
+            ("files", ("a.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv")),
+            ("files", ("b.csv", resent.encode(), "text/csv")),
+        ]
+        streamed = self._records(client.post("/parse", headers={"Accept": "application/x-ndjson"}, files=files))
+        regular = client.post("/parse", files=files).json()
+        
+        by_id = {}
+        for record in streamed:
+            if record["type"] == "result":
+                campaign = record["data"]["campaign"]
+                by_id[campaign["unique_id"]] = campaign
+        
+        expected = {r["data"]["campaign"]["unique_id"]: r["data"]["campaign"] for r in regular["results"]}
+        assert by_id == expected
+        assert sorted(campaign["delivered"] for campaign in by_id.values()) == delivered
+        assert streamed[-1]["campaigns"] == 3
+        assert streamed[-1]["duplicates"] == 3
+
+
+class TestAnalyticsEndpoint:
+    """Test /analytics aggregation"""
+    
+    def test_analytics_of_parsed_campaigns(self):
+        """Test campaigns returned by /parse can be analyzed as-is"""
+        parsed = client.post("/parse", files=[
+            ("files", ("report.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv")),
+        ]).json()
+        campaigns = [result["data"]["campaign"] for result in parsed["results"]]
+        
+        response = client.post("/analytics", json={"campaigns": campaigns, "selected": [0, 1]})
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_campaigns"] == 2
+        delivered = [campaign["delivered"] for campaign in campaigns[:2]]
+        assert data["averages"]["delivered"] == sum(delivered) / 2
+        assert data["trends"]["delivered"]["values"] == delivered
+    
+    def test_selection_by_dataset(self):
+        """Test a later selection sent with only the dataset token matches sending every campaign again"""
+        parsed = client.post("/parse", files=[
+            ("files", ("report.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv")),
+        ]).json()
+        campaigns = [result["data"]["campaign"] for result in parsed["results"]]
+        dataset = client.post("/analytics", json={"campaigns": campaigns}).json()["dataset"]
+        
+        response = client.post(f"/analytics/{dataset}", json={"selected": [2, 0]})
+        
+        assert response.status_code == 200
+        expected = client.post("/analytics", json={"campaigns": campaigns, "selected": [2, 0]}).json()
+        assert {**response.json(), "dataset": None} == {**expected, "dataset": None}
+    
+    def test_selection_of_unknown_dataset(self):
+        """Test an expired or unknown dataset is a 404, so the client resends its campaigns"""
+        response = client.post("/analytics/not-a-dataset", json={"selected": [0]})
+        
+        assert response.status_code == 404
+    
+    @pytest.mark.parametrize("campaign", [
+        {"sent_at": 5, "delivered": 3},
+        {"sent_at": ["2021-08-07 16:00:00"], "delivered": 3},
+        {"sent_at": "2021-08-07 16:00:00", "delivered": "lots"},
+    ])
+    def test_analytics_rejects_wrongly_typed_values(self, campaign):
+        """Test valid JSON with values of the wrong type is a 422 rather than a server error"""
+        response = client.post("/analytics", json={"campaigns": [campaign]})
+        
+        assert response.status_code == 422
+    
+    def test_analytics_too_many_campaigns(self, monkeypatch):
+        """Test requests over MAX_ANALYTICS_CAMPAIGNS are rejected"""
+        monkeypatch.setattr("app.main.MAX_ANALYTICS_CAMPAIGNS", 1)
+        response = client.post("/analytics", json={"campaigns": [{}, {}]})
+        
+        assert response.status_code == 413
+
+
+class TestParseFlags:
+    """Test outlier and low-volume flags returned alongside parsed campaigns"""
+    
+    def _files(self):
+        # One campaign sent to a small segment, so the aggregated report has a low-volume row
+        small = MAILCHIMP_AGGREGATED_SAMPLE.replace(",110,108,", ",12,10,")
+        return [
+            ("files", ("a.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv")),
+            ("files", ("b.csv", small.replace("2021", "2022").encode(), "text/csv")),
+            ("files", ("c.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv")),
+        ]
+    
+    def test_flags_index_results(self):
+        """Test JSON flags are indices into the results list"""
+        data = client.post("/parse", files=self._files()).json()
+        campaigns = [result["data"]["campaign"] for result in data["results"]]
+        
+        delivered = [campaign["delivered"] or 0 for campaign in campaigns]
+        flags = data["flags"]
+        assert flags["method"] == "iqr"
+        assert set(flags["outliers"]) == {
+            "delivered", "open_rate", "click_rate", "ctor", "unsubscribe_rate", "hard_bounce_rate", "soft_bounce_rate"
+        }
+        assert flags["low_volume"] == [i for i, value in enumerate(delivered) if 0 < value < 50]
+        assert flags["low_volume"]
+    
+    def test_stream_flags_follow_arrival_order(self):
+        """Test streamed flags index campaigns as a client keying by unique_id collects them"""
+        response = client.post("/parse", headers={"Accept": "application/x-ndjson"}, files=self._files())
+        records = [json.loads(line) for line in response.text.splitlines()]
+        
+        collected = {}
+        for record in records:
+            if record["type"] == "result":
+                campaign = record["data"]["campaign"]
+                collected[campaign["unique_id"] or f"{record['filename']}#{len(collected)}"] = campaign
+        campaigns = list(collected.values())
+        
+        regular = client.post("/parse", files=self._files()).json()
+        flagged = lambda items, indices: sorted(items[i]["unique_id"] for i in indices)
+        regular_campaigns = [result["data"]["campaign"] for result in regular["results"]]
+        flags = records[-1]["flags"]
+        assert flagged(campaigns, flags["low_volume"]) == flagged(regular_campaigns, regular["flags"]["low_volume"])
+        for metric, indices in flags["outliers"].items():
+            assert flagged(campaigns, indices) == flagged(regular_campaigns, regular["flags"]["outliers"][metric])
+    
+    def test_no_heatmap_in_parse_responses(self):
+        """Test the send-time heatmap is left to /analytics, which covers the dashboard's selection"""
+        data = client.post("/parse", files=self._files()).json()
+        streamed = client.post("/parse", headers={"Accept": "application/x-ndjson"}, files=self._files())
+        summary = json.loads(streamed.text.splitlines()[-1])
+        
+        assert "heatmap" not in data
+        assert "heatmap" not in summary
+    
+    def test_zscore_method(self, monkeypatch):
+        """Test OUTLIER_METHOD selects z-score flags"""
+        monkeypatch.setattr("app.main.OUTLIER_METHOD", "zscore")
+        data = client.post("/parse", files=self._files()).json()
+        
+        assert data["flags"]["method"] == "zscore"
+
+
+class TestWorkspaces:
+    """Test incremental uploads into a session workspace"""
+    
+    @pytest.fixture(autouse=True)
+    def clear_workspaces(self):
+        workspace_store.clear()
+        yield
+        workspace_store.clear()
+    
+    def _token(self):
+        response = client.post("/workspaces")
+        assert response.status_code == 201
+        return response.json()["token"]
+    
+    def _campaigns(self, data):
+        return {r["data"]["campaign"]["unique_id"]: r["data"]["campaign"] for r in data["results"]}
+    
+    def test_adds_return_only_the_delta(self):
+        """Test later uploads return only the campaigns they changed"""
+        token = self._token()
+        resent = MAILCHIMP_AGGREGATED_SAMPLE.replace(",110,108,", ",110,120,")
+        
+        first = client.post(f"/workspaces/{token}", files=[
+            ("files", ("a.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv")),
+        ]).json()
+        second = client.post(f"/workspaces/{token}", files=[
+            ("files", ("b.csv", resent.encode(), "text/csv")),
+            ("files", ("c.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv")),
+        ]).json()
+        
+        assert len(first["results"]) == 3
+        assert first["workspace"] == {"campaigns": 3, "files": 1, "duplicates": 0}
+        # "latest" replaces all three MailChimp campaigns, and the MailerLite one is new
+        assert len(second["results"]) == 4
+        assert second["workspace"] == {"campaigns": 4, "files": 3, "duplicates": 3}
+        
+        held = {**self._campaigns(first), **self._campaigns(second)}
+        stateless = client.post("/parse", files=[
+            ("files", ("a.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv")),
+            ("files", ("b.csv", resent.encode(), "text/csv")),
+            ("files", ("c.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv")),
+        ]).json()
+        assert held == self._campaigns(stateless)
+    
+    def test_losing_campaigns_are_not_resent(self):
+        """Test campaigns a new file does not replace are left out of the delta"""
+        smaller = MAILCHIMP_AGGREGATED_SAMPLE.replace(",110,108,", ",110,100,")
+        files = lambda text: [("files", ("a.csv", text.encode(), "text/csv"))]
+        
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            monkeypatch.setattr(workspace_store, "policy", "max_delivered")
+            token = self._token()
+        client.post(f"/workspaces/{token}", files=files(MAILCHIMP_AGGREGATED_SAMPLE))
+        data = client.post(f"/workspaces/{token}", files=files(smaller)).json()
+        
+        # Equal deliveries go to the later file, but the campaign sent to fewer stays put
+        assert sorted(r["data"]["campaign"]["delivered"] for r in data["results"]) == [133, 134]
+        assert data["workspace"] == {"campaigns": 3, "files": 2, "duplicates": 3}
+    
+    def test_streamed_delta(self):
+        """Test NDJSON adds stream the delta and summarize the whole workspace"""
+        token = self._token()
+        client.post(f"/workspaces/{token}", files=[
+            ("files", ("a.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv")),
+        ])
+        response = client.post(f"/workspaces/{token}", headers={"Accept": "application/x-ndjson"}, files=[
+            ("files", ("c.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv")),
+        ])
+        records = [json.loads(line) for line in response.text.splitlines()]
+        
+        assert [r["type"] for r in records] == ["result", "summary"]
+        assert records[0]["data"]["campaign"]["platform"] == "mailerlite_classic"
+        assert records[1]["campaigns"] == 4
+        assert records[1]["files"] == 1
+    
+    def test_unknown_and_deleted_workspaces(self):
+        """Test unknown tokens and deleted workspaces are rejected"""
+        files = [("files", ("a.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv"))]
+        assert client.post("/workspaces/nope", files=files).status_code == 404
+        
+        token = self._token()
+        assert client.delete(f"/workspaces/{token}").status_code == 204
+        assert client.post(f"/workspaces/{token}", files=files).status_code == 404
+        assert client.delete(f"/workspaces/{token}").status_code == 404
+    
+    def test_workspace_file_limit(self, monkeypatch):
+        """Test a workspace stops accepting files past MAX_WORKSPACE_FILES"""
+        monkeypatch.setattr("app.main.MAX_WORKSPACE_FILES", 1)
+        token = self._token()
+        files = [("files", ("a.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv"))]
+        
+        assert client.post(f"/workspaces/{token}", files=files).status_code == 200
+        assert client.post(f"/workspaces/{token}", files=files).status_code == 413
+
+
+def make_zip(members, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=compression) as archive:
+        for name, content in members:
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+class TestArchiveUploads:
+    """Test .zip uploads unpacked member by member"""
+    
+    def test_members_are_parsed_and_errors_reported(self):
+        """Test CSV members are parsed and unusable members reported per file"""
+        archive = make_zip([
+            ("june/report.csv", MAILERLITE_CLASSIC_SAMPLE),
+            ("aggregated.csv", MAILCHIMP_AGGREGATED_SAMPLE),
+            ("notes.txt", "hello"),
+            ("__MACOSX/june/._report.csv", "resource fork"),
+            ("empty/", ""),
+        ])
+        response = client.post("/parse", files=[("files", ("reports.zip", archive, "application/zip"))])
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["errors"] == [{"filename": "reports.zip/notes.txt", "error": "Only CSV files supported"}]
+        assert len(data["results"]) == 4
+    
+    def test_zip_alongside_csv(self):
+        """Test archives and plain CSV parts mix in one upload"""
+        response = client.post("/parse", files=[
+            ("files", ("a.zip", make_zip([("a.csv", MAILCHIMP_AGGREGATED_SAMPLE)]), "application/zip")),
+            ("files", ("b.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv")),
+        ])
+        
+        data = response.json()
+        assert data["errors"] == []
+        assert len(data["results"]) == 4
+    
+    def test_invalid_archive(self):
+        """Test a corrupt archive is reported as a per-file error"""
+        response = client.post("/parse", files=[
+            ("files", ("broken.zip", b"PK not really", "application/zip")),
+            ("files", ("b.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv")),
+        ])
+        
+        data = response.json()
+        assert data["errors"] == [{"filename": "broken.zip", "error": "Invalid ZIP archive"}]
+        assert len(data["results"]) == 1
+    
+    def test_member_size_limit_applies_to_decompressed_bytes(self, monkeypatch):
+        """Test a highly compressible member is cut off by its inflated size"""
+        monkeypatch.setattr("app.main.MAX_FILE_SIZE", 1024 * 1024)
+        archive = make_zip([("bomb.csv", b"0" * (4 * 1024 * 1024))])
+        assert len(archive) < 64 * 1024
+        
+        response = client.post("/parse", files=[("files", ("bomb.zip", archive, "application/zip"))])
+        
+        assert response.json()["errors"] == [
+            {"filename": "bomb.zip/bomb.csv", "error": "File too large. Maximum size is 1MB"}
+        ]
+    
+    def test_declared_size_rejected_before_inflating(self):
+        """Test members declaring more than the limit are never decompressed"""
+        upload = IngestedFile("a.zip")
+        upload.write(make_zip([("a.csv", b"x" * 5000), ("b.csv", b"y" * 500)]))
+        
+        members = ArchiveExpander(max_member_size=1000).expand([upload])
+        
+        assert [member.error for member in members] == ["File too large. Maximum size is 0MB", None]
+        assert members[0].size == 0
+        assert members[1].read_bytes() == b"y" * 500
+    
+    def test_total_decompressed_budget(self):
+        """Test the request-wide budget rejects members once it is spent"""
+        upload = IngestedFile("a.zip")
+        upload.write(make_zip([(f"{i}.csv", b"x" * 600) for i in range(3)]))
+        
+        members = ArchiveExpander(max_uncompressed=1500).expand([upload])
+        
+        assert [member.error for member in members] == [
+            None, None, "Archive exceeds the decompressed size limit"
+        ]
+    
+    def test_too_many_members(self, monkeypatch):
+        """Test archives over MAX_ARCHIVE_MEMBERS are rejected whole"""
+        monkeypatch.setattr("app.main.MAX_ARCHIVE_MEMBERS", 2)
+        archive = make_zip([(f"{i}.csv", MAILERLITE_CLASSIC_SAMPLE) for i in range(3)])
+        
+        response = client.post("/parse", files=[("files", ("many.zip", archive, "application/zip"))])
+        
+        assert response.json()["errors"] == [{
+            "filename": "many.zip",
+            "error": "Too many files in archive. Maximum 2 files allowed per archive."
+        }]
+
+
+class TestCompressedUploads:
+    """Test gzip request bodies and .csv.gz parts"""
+    
+    def test_csv_gz_part(self):
+        """Test a gzipped part parses like the CSV inside and is reported under its name"""
+        response = client.post("/parse", files=[
+            ("files", ("classic.csv.gz", gzip.compress(MAILERLITE_CLASSIC_SAMPLE.encode()), "application/gzip")),
+            ("files", ("broken.csv.gz", b"not gzip", "application/gzip")),
+        ])
+        
+        data = response.json()
+        assert data["errors"] == [{"filename": "broken.csv", "error": "Invalid gzip file"}]
+        assert len(data["results"]) == 1
+    
+    def test_csv_gz_digest_matches_plain_upload(self):
+        """Test gzipped and plain copies of a file share a cache entry"""
+        content = MAILERLITE_CLASSIC_SAMPLE.encode()
+        uploads = TestMultipartIngestor._run(
+            MultipartIngestor(compressed_extensions=(".csv.gz",)),
+            TestMultipartIngestor._body([("a.csv", content), ("b.csv.gz", gzip.compress(content))]),
+        )
+        
+        assert [upload.filename for upload in uploads] == ["a.csv", "b.csv"]
+        assert uploads[0].digest == uploads[1].digest
+        assert uploads[1].size == len(content)
+    
+    def test_csv_gz_truncated(self):
+        """Test a gzipped part cut short is rejected"""
+        uploads = TestMultipartIngestor._run(
+            MultipartIngestor(compressed_extensions=(".csv.gz",)),
+            TestMultipartIngestor._body([("a.csv.gz", gzip.compress(b"x" * 1000)[:-8])]),
+        )
+        
+        assert uploads[0].error == "Invalid gzip file"
+    
+    def test_csv_gz_limit_applies_to_decompressed_bytes(self, monkeypatch):
+        """Test a highly compressible part is cut off by its inflated size"""
+        monkeypatch.setattr("app.main.MAX_FILE_SIZE", 1024 * 1024)
+        bomb = gzip.compress(b"0" * (4 * 1024 * 1024))
+        assert len(bomb) < 64 * 1024
+        
+        response = client.post("/parse", files=[("files", ("bomb.csv.gz", bomb, "application/gzip"))])
+        
+        assert response.json()["errors"] == [
+            {"filename": "bomb.csv", "error": "File too large. Maximum size is 1MB"}
+        ]
+    
+    def test_gzip_request_body(self):
+        """Test a Content-Encoding: gzip multipart body is inflated before parsing"""
+        body = TestMultipartIngestor._body([("a.csv", MAILERLITE_CLASSIC_SAMPLE.encode())])
+        
+        response = client.post("/parse", content=gzip.compress(body), headers={
+            "Content-Type": "multipart/form-data; boundary=XBOUNDARY",
+            "Content-Encoding": "gzip",
+        })
+        
+        assert response.status_code == 200
+        assert len(response.json()["results"]) == 1
+    
+    def test_malformed_gzip_request_body(self):
+        """Test a body that does not inflate is rejected"""
+        response = client.post("/parse", content=b"not gzip", headers={
+            "Content-Type": "multipart/form-data; boundary=XBOUNDARY",
+            "Content-Encoding": "gzip",
+        })
+        
+        assert response.status_code == 400
+    
+    def test_unsupported_content_encoding(self):
+        """Test encodings other than gzip are refused"""
+        response = client.post("/parse", content=b"", headers={
+            "Content-Type": "multipart/form-data; boundary=XBOUNDARY",
+            "Content-Encoding": "zstd",
+        })
+        
+        assert response.status_code == 415
+    
+    def test_gzip_body_bomb_is_stopped_early(self, monkeypatch):
+        """Test the total limit applies to the inflated body"""
+        monkeypatch.setattr("app.main.MAX_FILE_SIZE", 1024 * 1024)
+        monkeypatch.setattr("app.main.MAX_FILES", 2)
+        body = TestMultipartIngestor._body([("a.csv", b"0" * (16 * 1024 * 1024))])
+        
+        response = client.post("/parse", content=gzip.compress(body), headers={
+            "Content-Type": "multipart/form-data; boundary=XBOUNDARY",
+            "Content-Encoding": "gzip",
+        })
+        
+        assert response.status_code == 413
+    
+    def test_gunzip_stream_bounds_each_chunk(self):
+        """Test inflated chunks never exceed the chunk size"""
+        compressed = gzip.compress(b"0" * 100000)
+        
+        async def collect():
+            async def stream():
+                yield compressed
+            return [chunk async for chunk in gunzip_stream(stream(), chunk_size=4096)]
+        
+        chunks = asyncio.run(collect())
+        assert max(map(len, chunks)) == 4096
+        assert b"".join(chunks) == b"0" * 100000
+
+
+
+class TestResponseCompression:
+    """Test gzip compression of API responses"""
+    
+    def test_parse_json_is_gzipped(self):
+        """Test large JSON responses are compressed for clients accepting gzip"""
+        response = client.post(
+            "/parse",
+            files=[("files", ("a.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv"))],
+            headers={"Accept-Encoding": "gzip"},
+        )
+        
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert len(response.json()["results"]) == 1
+    
+    def test_not_gzipped_without_accept_encoding(self):
+        """Test clients not accepting gzip get identity responses"""
+        response = client.post(
+            "/parse",
+            files=[("files", ("a.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv"))],
+            headers={"Accept-Encoding": "identity"},
+        )
+        
+        assert "content-encoding" not in response.headers
+    
+    def test_ndjson_stream_is_gzipped(self):
+        """Test streamed NDJSON responses are compressed too"""
+        response = client.post(
+            "/parse",
+            files=[
+                ("files", ("a.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv")),
+                ("files", ("b.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv")),
+            ],
+            headers={"Accept": "application/x-ndjson", "Accept-Encoding": "gzip"},
+        )
+        
+        assert response.headers["content-encoding"] == "gzip"
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert records[-1]["type"] == "summary"
+
+
+class TestLinkClicks:
+    """Test the opt-in most clicked URL ranking on /parse"""
+    
+    URLS = '"https://example.com/sale","40","25"\n"https://example.com/blog","5","4"\n'
+    
+    def _files(self):
+        return [
+            ("files", ("single.csv", (MAILCHIMP_SINGLE_SAMPLE + self.URLS).encode(), "text/csv")),
+            ("files", ("classic.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv")),
+            ("files", ("aggregated.csv", MAILCHIMP_AGGREGATED_SAMPLE.encode(), "text/csv")),
+        ]
+    
+    def test_links_off_by_default(self):
+        """Test the ranking is only computed when requested"""
+        response = client.post("/parse", files=self._files())
+        
+        assert "links" not in response.json()
+    
+    def test_links_ranked_across_reports(self):
+        """Test click tables of every report are ranked by total clicks"""
+        response = client.post("/parse?links=true", files=self._files())
+        
+        links = response.json()["links"]
+        assert [entry["url"] for entry in links["top"]] == [
+            "Unsubscribe link", "https://example.com/sale", "https://example.com/blog"
+        ]
+        assert links["top"][1] == {"url": "https://example.com/sale", "total_clicks": 40, "unique_clicks": 25, "error": 0}
+        assert links["reports"] == 2
+        assert links["total_clicks"] == 135
+    
+    def test_links_in_stream_summary(self):
+        """Test the streamed summary carries the same ranking"""
+        response = client.post(
+            "/parse?links=true", headers={"Accept": "application/x-ndjson"}, files=self._files()
+        )
+        
+        summary = [json.loads(line) for line in response.text.splitlines()][-1]
+        assert summary["links"] == client.post("/parse?links=true", files=self._files()).json()["links"]
+    
+    def test_links_cached_separately(self):
+        """Test a result cached without links is not served when links are requested"""
+        client.post("/parse", files=self._files())
+        
+        response = client.post("/parse?links=true", files=self._files())
+        
+        assert len(response.json()["links"]["top"]) == 3
+
+
+class TestMetricsEndpoint:
+    """Test /metrics exposes request, stage, parser and error metrics"""
+    
+    def test_metrics_after_parse(self):
+        """Test a parse is counted by route template, stage and parser in the Prometheus text format"""
+        requests = metrics.requests.value("/parse", "success")
+        parsed = metrics.parser_seconds.count("MailerLiteClassicParser")
+        client.post("/parse", files=[
+            ("files", ("report.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv")),
+        ])
+        
+        response = client.get("/metrics")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+        assert metrics.requests.value("/parse", "success") == requests + 1
+        assert metrics.parser_seconds.count("MailerLiteClassicParser") == parsed + 1
+        assert 'simpledash_stage_duration_seconds_count{stage="read"}' in response.text
+        assert 'simpledash_stage_duration_seconds_count{stage="serialize"}' in response.text
+        assert "# TYPE simpledash_upload_file_bytes histogram" in response.text
+    
+    def test_file_errors_counted_by_type(self):
+        """Test rejected and unparseable files are counted by the error behind them"""
+        rejected = metrics.errors.value("UploadRejectedError")
+        unsupported = metrics.errors.value("UnsupportedFormatError")
+        client.post("/parse", headers={"Accept": "application/x-ndjson"}, files=[
+            ("files", ("report.txt", b"hello", "text/plain")),
+            ("files", ("report.csv", b"not,a,report", "text/csv")),
+        ])
+        
+        assert metrics.errors.value("UploadRejectedError") == rejected + 1
+        assert metrics.errors.value("UnsupportedFormatError") == unsupported + 1
+    
+    def test_routes_labelled_by_template(self):
+        """Test path parameters do not become label values"""
+        before = metrics.requests.value("/workspaces/{token}", "client_error")
+        
+        client.delete("/workspaces/missing-token")
+        
+        assert metrics.requests.value("/workspaces/{token}", "client_error") == before + 1
+    
+    def test_metrics_can_be_disabled(self, monkeypatch):
+        """Test METRICS=false hides the endpoint"""
+        monkeypatch.setattr("app.main.METRICS", False)
+        
+        assert client.get("/metrics").status_code == 404
+
+
+class TestServerTiming:
+    """Test the Server-Timing header and debug breakdown of /parse"""
+    
+    def _files(self):
+        return [
+            ("files", ("classic.csv", MAILERLITE_CLASSIC_SAMPLE.encode(), "text/csv")),
+            ("files", ("notes.txt", b"hello", "text/plain")),
+        ]
+    
+    def test_stages_and_files_timed(self):
+        """Test every stage and every file is listed, files numbered in upload order"""
+        response = client.post("/parse", files=self._files())
+        
+        entries = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+        assert entries == ["read", "detect", "parse", "dedup", "serialize", "file-1", "file-2"]
+        assert 'file-1;dur=' in response.headers["server-timing"]
+        assert response.headers["server-timing"].endswith('file-2;desc="notes.txt"')
+        assert "debug" not in response.json()
+    
+    def test_debug_reports_each_file(self):
+        """Test debug=true adds bytes, lines, campaigns and parser per file"""
+        response = client.post("/parse?debug=true", files=self._files())
+        
+        classic, notes = response.json()["debug"]["files"]
+        assert classic["filename"] == "classic.csv"
+        assert classic["bytes"] == len(MAILERLITE_CLASSIC_SAMPLE.encode())
+        assert classic["lines"] == MAILERLITE_CLASSIC_SAMPLE.count("\n") + (not MAILERLITE_CLASSIC_SAMPLE.endswith("\n"))
+        assert classic["campaigns"] == 1
+        assert classic["parser"] == "MailerLiteClassicParser"
+        assert classic["parse_ms"] >= 0
+        assert notes["campaigns"] == 0 and notes["parser"] is None
+    
+    def test_stream_times_reading_and_reports_rest_in_summary(self):
+        """Test a streamed response times reading in its header and the other stages in its summary"""
+        response = client.post(
+            "/parse?debug=true", headers={"Accept": "application/x-ndjson"}, files=self._files()
+        )
+        
+        assert response.headers["server-timing"].startswith("read;dur=")
+        debug = [json.loads(line) for line in response.text.splitlines()][-1]["debug"]
+        assert {"read", "detect", "parse", "dedup"} <= set(debug["stages"])
+        assert sorted(entry["filename"] for entry in debug["files"]) == ["classic.csv", "notes.txt"]
+
@@ -1,6 +1,7 @@
 """Unit tests for ParserFactory and detector"""
 import pytest
-from app.utils.detector import ParserFactory, detect_and_parse
+from app.utils.detector import ParserFactory, detect_and_parse, detect_and_parse_stream
+from app.parsers.signatures import Signature, fingerprint
 from app.parsers.mailerlite_classic import MailerLiteClassicParser
 from app.parsers.mailchimp import MailChimpParser
 from app.parsers.mailchimp_ab import MailChimpABParser
@@ -81,6 +82,56 @@ class TestParserFactory:
         single_index = next(i for i, p in enumerate(factory.parsers) if isinstance(p, MailChimpParser))
         
         assert ab_index < single_index, "A/B parser should be checked before single campaign parser"
+    
+    def test_detect_reads_bounded_prefix(self):
+        """Test detection only consumes a bounded prefix of a large stream"""
+        consumed = []
+        
+        def stream():
+            for line in MAILCHIMP_AGGREGATED_SAMPLE.splitlines(keepends=True):
+                consumed.append(line)
+                yield line
+            for i in range(100000):
+                consumed.append(i)
+                yield f'"Campaign {i}","Subject","List","Jun 09, 2018 09:30 pm",Saturday,1,1\n'
+        
+        parser, prefix = ParserFactory().detect(stream())
+        
+        assert isinstance(parser, MailChimpAggregatedParser)
+        assert len(consumed) == len(prefix)
+        assert len(prefix) <= 5
+    
+    def test_detect_returns_prefix_for_replay(self):
+        """Test the consumed prefix is returned so parsing can replay it"""
+        lines = iter(MAILCHIMP_AB_SAMPLE.splitlines(keepends=True))
+        parser, prefix = ParserFactory().detect(lines)
+        
+        assert isinstance(parser, MailChimpABParser)
+        assert "".join(prefix) + "".join(lines) == MAILCHIMP_AB_SAMPLE
+
+
+class TestFingerprint:
+    """Test single-pass signature matching"""
+    
+    class Candidate:
+        def __init__(self, *signatures):
+            self.signatures = signatures
+    
+    def test_priority_order_wins(self):
+        """Test the first fully matched candidate in priority order wins"""
+        broad = self.Candidate(Signature(("Report",)))
+        narrow = self.Candidate(Signature(("Report",)), Signature(("Extra",), within=3))
+        
+        result = fingerprint([narrow, broad], ["Report\n", "a\n", "b\n", "c\n"])
+        
+        assert result.parser is broad
+    
+    def test_window_is_enforced(self):
+        """Test markers outside the signature window do not match"""
+        candidate = self.Candidate(Signature(("Header",), within=2))
+        
+        assert fingerprint([candidate], ["a\n", "\n", "b\n", "Header\n"]).parser is None
+        assert fingerprint([candidate], ["a\n", "\n", "Header\n"]).parser is candidate
 
 
 class TestDetectAndParse:
@@ -134,3 +185,10 @@ class TestDetectAndParse:
         campaigns = detect_and_parse(MAILCHIMP_AGGREGATED_SAMPLE)
         
         assert all(c.has_meaningful_data() for c in campaigns)
+    
+    def test_detect_and_parse_stream(self):
+        """Test parsing from a line stream matches parsing from text"""
+        lines = iter(MAILCHIMP_SINGLE_SAMPLE.splitlines(keepends=True))
+        campaigns = detect_and_parse_stream(lines)
+        
+        assert [c.to_dict() for c in campaigns] == [c.to_dict() for c in detect_and_parse(MAILCHIMP_SINGLE_SAMPLE)]
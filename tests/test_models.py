@@ -1,6 +1,7 @@
 """Unit tests for EmailCampaign model"""
+import pickle
 import pytest
-from app.models import EmailCampaign, ParseError, InvalidCampaignError, EmptyReportError
+from app.models import EmailCampaign, CampaignBatch, CAMPAIGN_FIELDS, ParseError, InvalidCampaignError, EmptyReportError
 
 
 class TestEmailCampaign:
@@ -130,6 +131,80 @@ class TestEmailCampaign:
         assert "EmailCampaign" in repr_str
         assert "mailchimp" in repr_str
 
+    
+    def test_campaign_has_no_instance_dict(self):
+        """Test campaigns are slotted"""
+        campaign = EmailCampaign(platform="mailchimp")
+        
+        assert not hasattr(campaign, "__dict__")
+        with pytest.raises(AttributeError):
+            campaign.unknown_field = 1
+    
+    def test_campaign_row_roundtrip(self):
+        """Test to_row/from_row preserve every field"""
+        campaign = EmailCampaign(platform="mailchimp", subject="Test", delivered=10, ctor=0.5)
+        
+        assert EmailCampaign.from_row(campaign.to_row()).to_dict() == campaign.to_dict()
+
+
+def make_campaign(**overrides):
+    values = dict(
+        platform="mailchimp",
+        subject="Subject",
+        email_title="Title",
+        unique_id="abc",
+        sent_at="2021-01-01 10:00",
+        delivered=100,
+        opens=30,
+        open_rate=0.3,
+        clicks=5,
+        click_rate=0.05,
+    )
+    values.update(overrides)
+    return EmailCampaign(**values)
+
+
+class TestCampaignBatch:
+    """Test column-oriented campaign batches"""
+    
+    def test_from_campaigns(self):
+        """Test a batch stores one column per field"""
+        batch = CampaignBatch.from_campaigns([make_campaign(), make_campaign(unique_id="def")])
+        
+        assert len(batch) == 2
+        assert list(batch.columns) == list(CAMPAIGN_FIELDS)
+        assert batch.columns["unique_id"] == ["abc", "def"]
+    
+    def test_row_dict_matches_to_dict(self):
+        """Test serializing from columns matches the campaign dictionary"""
+        campaign = make_campaign(hard_bounces=2)
+        batch = CampaignBatch.from_campaigns([campaign])
+        
+        assert batch.row_dict(0) == campaign.to_dict()
+        assert list(batch.row_dict(0)) == list(campaign.to_dict())
+        assert batch[0].to_dict() == campaign.to_dict()
+    
+    def test_missing_columns_are_none(self):
+        """Test columns not provided are filled with None"""
+        batch = CampaignBatch({"platform": ["a", "b"], "delivered": [1, 2]})
+        
+        assert len(batch) == 2
+        assert batch.columns["subject"] == [None, None]
+    
+    def test_meaningful_rows(self):
+        """Test meaningful rows apply the same rules as EmailCampaign"""
+        campaigns = [make_campaign(), make_campaign(delivered=0), make_campaign(subject="  ")]
+        batch = CampaignBatch.from_campaigns(campaigns)
+        
+        assert batch.meaningful_rows() == [i for i, c in enumerate(campaigns) if c.has_meaningful_data()]
+        assert batch.meaningful_rows() == [0]
+    
+    def test_batch_pickles(self):
+        """Test batches can be sent to worker processes"""
+        batch = CampaignBatch.from_campaigns([make_campaign()])
+        
+        assert pickle.loads(pickle.dumps(batch)).columns == batch.columns
+
 
 class TestParseErrors:
     """Test custom error classes"""
@@ -4,7 +4,10 @@ from app.parsers.mailerlite_classic import MailerLiteClassicParser
 from app.parsers.mailchimp import MailChimpParser
 from app.parsers.mailchimp_ab import MailChimpABParser
 from app.parsers.mailchimp_aggregated import MailChimpAggregatedParser
-from app.models import EmailCampaign, EmptyReportError
+from app.parsers.tokenizer import (
+    extract_number_and_percent, number_and_percent, parse_link_table, sanitize_title, split_kv, split_quoted_kv
+)
+from app.models import EmailCampaign, EmptyReportError, LinkClicks
 from tests.fixtures import (
     MAILERLITE_CLASSIC_SAMPLE,
     MAILCHIMP_SINGLE_SAMPLE,
@@ -16,6 +19,56 @@ from tests.fixtures import (
 )
 
 
+class TestTokenizer:
+    """Test the shared line tokenizer"""
+    
+    def test_split_quoted_kv(self):
+        """Test quoted pairs lose their quotes and trailing colon"""
+        assert split_quoted_kv('"Title:","Summer Sale, 2021"') == ("Title", "Summer Sale, 2021")
+        assert split_quoted_kv('"Overall Stats"') == (None, None)
+    
+    def test_split_kv_skips_blank_fields(self):
+        """Test blank leading fields are skipped and the key keeps its colon"""
+        assert split_kv('"Subject:","Hello"') == ("Subject:", "Hello")
+        assert split_kv(' ,"Sent","2021-08-07"') == ("Sent", "2021-08-07")
+        assert split_kv('"Links"') == (None, None)
+    
+    def test_extract_number_and_percent(self):
+        """Test counts with thousands separators and optional rates"""
+        assert extract_number_and_percent("1,234 (56.7%)") == (1234, pytest.approx(0.567))
+        assert extract_number_and_percent("12") == (12, None)
+        assert extract_number_and_percent("") == (None, None)
+    
+    def test_sanitize_title(self):
+        """Test special characters are removed and whitespace collapsed"""
+        assert sanitize_title("Get 20% Off   Today!") == "Get 20 Off Today!"
+        assert sanitize_title("%%%") == "Untitled"
+    
+    def test_number_and_percent_setter(self):
+        """Test a field table setter fills both the count and the rate"""
+        table = {"Opened": number_and_percent("opens", "open_rate")}
+        record = {}
+        table["Opened"](record, "10 (50%)")
+        
+        assert record == {"opens": 10, "open_rate": 0.5}
+    
+    def test_parse_link_table(self):
+        """Test click rows are read in the report's column order and other rows skipped"""
+        lines = [
+            '"URL","Total Clicks","Unique Clicks"\n',
+            '"https://example.com/?a=1,2","1,204","987"\n',
+            "\n",
+            '"Mobile:","34.92%"\n',
+            '"https://example.com/b","3","2"\n',
+        ]
+        
+        assert parse_link_table(lines, ("total", "unique")) == [
+            LinkClicks("https://example.com/?a=1,2", 987, 1204),
+            LinkClicks("https://example.com/b", 2, 3),
+        ]
+        assert parse_link_table(lines, ("unique", "total"))[1] == LinkClicks("https://example.com/b", 3, 2)
+
+
 class TestMailerLiteClassicParser:
     """Test MailerLite Classic parser"""
     
@@ -86,6 +139,44 @@ class TestMailerLiteClassicParser:
         
         with pytest.raises(EmptyReportError):
             parser.parse(MAILERLITE_INCOMPLETE)
+    
+    def test_parse_stops_once_field_sections_end(self):
+        """Test reading stops at the header after the last field section, leaving the links table unread"""
+        lines = iter(MAILERLITE_CLASSIC_SAMPLE.splitlines(keepends=True))
+        
+        campaigns = MailerLiteClassicParser().parse_lines(lines)
+        
+        assert campaigns[0].soft_bounces == 54
+        assert next(lines) == '"Mobile:","34.92%"\n'
+    
+    def test_parse_repeated_key_keeps_last_value(self):
+        """Test a key repeated within its section keeps its last value, as a full scan would"""
+        text = MAILERLITE_CLASSIC_SAMPLE.replace(
+            '"Soft bounce:","54 (1.38%)"\n', '"Soft bounce:","54 (1.38%)"\n"Soft bounce:","60 (1.54%)"\n'
+        )
+        
+        campaign = MailerLiteClassicParser().parse(text)[0]
+        
+        assert campaign.soft_bounces == 60
+        assert campaign.soft_bounce_rate == 0.0154
+    
+    def test_parse_stops_at_end_of_sections_with_missing_keys(self):
+        """Test a section missing a key ends at the next header rather than the end of the report"""
+        text = MAILERLITE_CLASSIC_SAMPLE.replace('"Soft bounce:","54 (1.38%)"\n', "")
+        lines = iter(text.splitlines(keepends=True))
+        
+        campaign = MailerLiteClassicParser().parse_lines(lines)[0]
+        
+        assert campaign.soft_bounces is None
+        assert campaign.hard_bounces == 21
+        assert next(lines) == '"Mobile:","34.92%"\n'
+    
+    def test_parse_matches_full_scan_with_long_links_table(self):
+        """Test early termination gives the same campaign however long the links table is"""
+        parser = MailerLiteClassicParser()
+        links = "".join(f'"https://example.com/{i}","1","1"\n' for i in range(5000))
+        
+        assert parser.parse(MAILERLITE_CLASSIC_SAMPLE + links)[0].to_dict() == parser.parse(MAILERLITE_CLASSIC_SAMPLE)[0].to_dict()
 
 
 class TestMailChimpParser:
@@ -202,6 +293,52 @@ class TestMailChimpABParser:
         
         with pytest.raises(EmptyReportError):
             parser.parse(invalid_ab)
+    
+    def test_iter_campaigns_yields_as_each_block_closes(self):
+        """Test a combination is yielded once the next block starts, before the rest is read"""
+        lines = iter(MAILCHIMP_AB_SAMPLE.splitlines(keepends=True))
+        campaigns = MailChimpABParser().iter_campaigns(lines)
+        
+        first = next(campaigns)
+        
+        assert first.subject == "Spring Sale - Up to 30% Off"
+        assert next(lines) == '"Subject Line:","Limited Time - Spring Savings Event"\n'
+    
+    def test_parse_stops_at_url_table(self):
+        """Test reading stops where the Clicks by URL table begins"""
+        text = MAILCHIMP_AB_SAMPLE + '\n"Clicks by URL"\n"URL","Total Clicks","Unique Clicks"\n"https://example.com","3","2"\n'
+        lines = iter(text.splitlines(keepends=True))
+        
+        campaigns = MailChimpABParser().parse_lines(lines)
+        
+        assert [c.delivered for c in campaigns] == [1742, 1742]
+        assert next(lines) == '"URL","Total Clicks","Unique Clicks"\n'
+    
+    def test_parse_many_combinations(self):
+        """Test every block of a report with dozens of combinations is parsed"""
+        header, block = MAILCHIMP_AB_SAMPLE.split('\n"Combination 1 Stats"\n')
+        block = block.split('\n"Combination 2 Stats"\n')[0]
+        text = header + "".join(f'\n"Combination {i} Stats"\n{block}' for i in range(1, 31))
+        
+        campaigns = MailChimpABParser().parse(text)
+        
+        assert len(campaigns) == 30
+        assert len({c.unique_id for c in campaigns}) == 30
+        assert campaigns[-1].email_title == "Spring Promo AB Test - Combo 30"
+    
+    def test_combination_line_without_stats_closes_block(self):
+        """Test any Combination line ends the block, so a later Subject Line is not read into it"""
+        header, block = MAILCHIMP_AB_SAMPLE.split('\n"Combination 1 Stats"\n')
+        block = block.split('\n"Combination 2 Stats"\n')[0]
+        text = (
+            header + '\n"Combination 1 Stats"\n' + block
+            + '\n"Combination Results"\n"Subject Line:","Winning Subject"\n'
+        )
+        
+        campaigns = MailChimpABParser().parse(text)
+        
+        assert len(campaigns) == 1
+        assert campaigns[0].subject == "Spring Sale - Up to 30% Off"
 
 
 class TestMailChimpAggregatedParser:
@@ -234,6 +371,27 @@ class TestMailChimpAggregatedParser:
         assert campaigns[1].subject == "Newsletter #1"
         assert campaigns[2].subject == "Product Launch"
     
+    def test_parse_extra_field_in_first_row(self):
+        """Test a first row with an extra trailing field keeps its columns rather than shifting them"""
+        lines = MAILCHIMP_AGGREGATED_SAMPLE.strip().split("\n")
+        lines[1] += ",extra"
+        
+        campaigns = MailChimpAggregatedParser().parse("\n".join(lines))
+        
+        assert [c.subject for c in campaigns] == ["Welcome Email", "Newsletter #1", "Product Launch"]
+        assert campaigns[0].delivered == MailChimpAggregatedParser().parse(MAILCHIMP_AGGREGATED_SAMPLE)[0].delivered
+    
+    def test_parse_extra_field_in_later_row(self):
+        """Test a later row with extra fields is parsed like the others instead of failing the file"""
+        lines = MAILCHIMP_AGGREGATED_SAMPLE.strip().split("\n")
+        lines[2] += ",extra,fields"
+        
+        campaigns = MailChimpAggregatedParser().parse("\n".join(lines))
+        
+        assert [c.to_dict() for c in campaigns] == [
+            c.to_dict() for c in MailChimpAggregatedParser().parse(MAILCHIMP_AGGREGATED_SAMPLE)
+        ]
+    
     def test_parse_converts_percentages(self):
         """Test parser converts percentage strings to floats"""
         parser = MailChimpAggregatedParser()
@@ -278,3 +436,32 @@ class TestMailChimpAggregatedParser:
         # Only first row is valid - others fail validation
         assert len(campaigns) == 1, f"Expected 1 campaign, got {len(campaigns)}: {[c.subject for c in campaigns]}"
         assert campaigns[0].subject == "Test Email"
+    
+    def test_parse_skips_malformed_numbers(self):
+        """Test rows with non-integer counts or non-numeric rates are skipped"""
+        parser = MailChimpAggregatedParser()
+        header = MAILCHIMP_AGGREGATED_SAMPLE.splitlines()[0]
+        csv_text = header + "\n" + \
+            '"Bad Count","Subject A","List","Jun 09, 2018 09:30 pm",Saturday,110,1.5,1,1,2,0,0,30,27.78%,57,7,6.48%,7,0,0,0,0,a,0,0,0\n' \
+            '"Bad Rate","Subject B","List","Jun 09, 2018 09:30 pm",Saturday,110,108,1,1,2,0,0,30,abc%,57,7,6.48%,7,0,0,0,0,b,0,0,0\n' \
+            '"No Opens","Subject C","List","Jun 09, 2018 09:30 pm",Saturday,110,100,1,4,2,0,0,0,,57,7,6.48%,7,5,0,0,0,c,0,0,0\n'
+        
+        campaigns = parser.parse(csv_text)
+        
+        assert [c.email_title for c in campaigns] == ["No Opens"]
+        assert campaigns[0].open_rate == 0
+        assert campaigns[0].ctor == 0
+        assert campaigns[0].hard_bounce_rate == pytest.approx(0.04)
+        assert campaigns[0].unsubscribe_rate == pytest.approx(0.05)
+        assert campaigns[0].sent_at == "2018-06-09 21:30"
+    
+    def test_parse_lines_streams_large_export(self):
+        """Test the columnar engine consumes a line stream"""
+        parser = MailChimpAggregatedParser()
+        header, row = MAILCHIMP_AGGREGATED_SAMPLE.splitlines()[:2]
+        lines = (header + "\n" if i == 0 else row.replace("Campaign A", f"Campaign {i}") + "\n" for i in range(2001))
+        
+        campaigns = parser.parse_lines(lines)
+        
+        assert len(campaigns) == 2000
+        assert len({c.unique_id for c in campaigns}) == 2000
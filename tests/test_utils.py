@@ -1,5 +1,869 @@
 """Unit tests for utility functions."""
 import pytest
-from app.utils.id_generator import generate_unique_id
-from app.utils.detector import detect_and_parse
+from app.utils import id_generator
+from app.utils.id_generator import DateNormalizer, generate_unique_id, generate_unique_ids, normalize_datetime
+from app.utils.detector import detect_and_parse, detect_and_parse_batch
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.ingest import IngestedFile
+from app.utils.workers import ParseExecutor
+from app.utils.cache import ParseCache, cache_key, estimate_batch_size
+from app.utils.dedup import Deduplicator
+from app.utils.workspace import Workspace, WorkspaceStore
+from app.utils.top_links import TopLinks
+from app.utils.metrics import SERVER_TIMING_FILES, Histogram, MetricsRegistry, ServiceMetrics, StageTimer
+from app.utils.analytics import (
+    SendTimeHeatmap,
+    campaign_analytics,
+    campaign_flags,
+    delivery_outliers,
+    low_volume,
+    outlier_mask,
+    send_time_cells,
+    trendlines,
+)
+from app.utils.compression import FlushingGZipResponder, accepts_encoding
+from app.utils.static import IMMUTABLE, PrecompressedStaticFiles
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+import gzip
+import zlib
+import io
+import random
+from app.utils.responses import encode_parse_response, encode_column
+import json
+import numpy as np
+from app.models import CampaignBatch, EmailCampaign, LinkClicks, UnsupportedFormatError
+from tests.fixtures import MAILERLITE_CLASSIC_SAMPLE, MAILCHIMP_AGGREGATED_SAMPLE, INVALID_FORMAT
+
+
+def make_upload(filename: str, text: str) -> IngestedFile:
+    upload = IngestedFile(filename)
+    upload.write(text.encode())
+    upload.size = len(text)
+    return upload
+
+
+class TestNormalizeDatetime:
+    """Test send date normalization"""
+    
+    @pytest.mark.parametrize("raw, expected", [
+        ("Mon, Apr 26, 2021 12:25", "2021-04-26 12:25"),
+        ("2021-04-26 12:25:00", "2021-04-26 12:25"),
+        ("6/9/2018 21:30", "2018-06-09 21:30"),
+        ("13/06/2018 21:30", "2018-06-13 21:30"),
+        ("6/9/18 21:30", "2018-06-09 21:30"),
+        ("Jun 09, 2018 09:30 pm", "2018-06-09 21:30"),
+        ("Jun 09, 2018 12:05 am", "2018-06-09 00:05"),
+        ("  not   a date ", "not a date"),
+        ("", ""),
+    ])
+    def test_known_formats(self, raw, expected):
+        """Test every supported shape normalizes to YYYY-MM-DD HH:MM"""
+        assert normalize_datetime(raw) == expected
+    
+    def test_learned_shape_does_not_change_priority(self):
+        """Test ambiguous dates stay month-first after a day-first date was seen"""
+        normalizer = DateNormalizer()
+        
+        assert normalizer("13/06/2018 21:30") == "2018-06-13 21:30"
+        assert normalizer("06/09/2018 21:30") == "2018-06-09 21:30"
+    
+    def test_cache_is_bounded(self):
+        """Test the memo cache never grows past its limit"""
+        normalizer = DateNormalizer(max_cache=10)
+        for minute in range(60):
+            normalizer(f"2021-04-26 12:{minute:02d}")
+        
+        assert len(normalizer._cache) == 10
+    
+    def test_default_normalizer_per_thread(self):
+        """Test threads normalizing concurrently each get their own default normalizer"""
+        dates = ["Mon, Apr 26, 2021 12:25", "2021-08-07 16:00:00", "06/09/2018 21:30"] * 2000
+        expected = [normalize_datetime(date) for date in dates[:3]] * 2000
+        
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: [normalize_datetime(date) for date in dates], range(8)))
+            normalizers = set(pool.map(lambda _: id(id_generator._default_normalizer()), range(8)))
+        
+        assert all(result == expected for result in results)
+        assert id(id_generator._default_normalizer()) not in normalizers
+
+
+class TestUniqueIds:
+    """Test single and batch unique ID generation"""
+    
+    TITLES = ["Summer Sale Campaign", "", "Weekly  News!"]
+    SUBJECTS = ["Get 20% Off Today Only!", "", "Issue #4"]
+    SENT_ATS = ["Mon, Apr 26, 2021 12:25", "", "6/9/2018 21:30"]
+    
+    def test_default_ids_are_stable(self):
+        """Test the default hash still produces the IDs of earlier releases"""
+        unique_id = generate_unique_id(self.TITLES[0], self.SUBJECTS[0], self.SENT_ATS[0], "mailchimp")
+        
+        assert unique_id == "dde8c3981629"
+    
+    def test_batch_matches_single(self):
+        """Test the column API returns the same IDs as row-by-row calls"""
+        expected = [
+            generate_unique_id(title, subject, sent_at, "mailchimp")
+            for title, subject, sent_at in zip(self.TITLES, self.SUBJECTS, self.SENT_ATS)
+        ]
+        
+        assert generate_unique_ids(self.TITLES, self.SUBJECTS, self.SENT_ATS, "mailchimp") == expected
+    
+    def test_batch_skips_normalization_when_asked(self):
+        """Test pre-normalized dates give the same IDs without normalizing again"""
+        normalized = [normalize_datetime(sent_at) for sent_at in self.SENT_ATS]
+        
+        assert generate_unique_ids(self.TITLES, self.SUBJECTS, normalized, "mailchimp", normalized=True) == \
+            generate_unique_ids(self.TITLES, self.SUBJECTS, self.SENT_ATS, "mailchimp")
+    
+    def test_blake2b_mode(self):
+        """Test the faster hash keeps the ID length but is a different ID space"""
+        sha_ids = generate_unique_ids(self.TITLES, self.SUBJECTS, self.SENT_ATS, "mailchimp")
+        blake_ids = generate_unique_ids(self.TITLES, self.SUBJECTS, self.SENT_ATS, "mailchimp", hash_mode="blake2b")
+        
+        assert all(len(unique_id) == 12 for unique_id in blake_ids)
+        assert blake_ids != sha_ids
+        assert blake_ids[0] == generate_unique_id(
+            self.TITLES[0], self.SUBJECTS[0], self.SENT_ATS[0], "mailchimp", hash_mode="blake2b"
+        )
+    
+    def test_unknown_hash_mode(self):
+        """Test an unknown hash mode is rejected"""
+        with pytest.raises(ValueError):
+            generate_unique_id("a", "b", "c", hash_mode="md5")
+
+
+class TestParseExecutor:
+    """Test parsing off the event loop"""
+    
+    @pytest.mark.parametrize("kind", ["thread", "process"])
+    def test_parse_all_fans_out(self, kind):
+        """Test every upload is parsed and results keep upload order"""
+        executor = ParseExecutor(kind=kind, max_workers=2, timeout=30)
+        uploads = [
+            make_upload("a.csv", MAILERLITE_CLASSIC_SAMPLE),
+            make_upload("b.csv", MAILCHIMP_AGGREGATED_SAMPLE),
+            make_upload("c.csv", INVALID_FORMAT),
+        ]
+        try:
+            outcomes = asyncio.run(executor.parse_all(uploads))
+        finally:
+            executor.shutdown()
+        
+        assert len(outcomes[0]) == 1
+        assert isinstance(outcomes[0][0], EmailCampaign)
+        assert len(outcomes[1]) == 3
+        assert isinstance(outcomes[2], UnsupportedFormatError)
+    
+    def test_parse_timeout(self, monkeypatch):
+        """Test slow parses surface as timeouts"""
+        monkeypatch.setattr("app.utils.workers.parse_upload_job", lambda upload, links=False: time.sleep(0.5))
+        executor = ParseExecutor(kind="thread", max_workers=1, timeout=0.05)
+        try:
+            outcomes = asyncio.run(executor.parse_all([make_upload("a.csv", MAILERLITE_CLASSIC_SAMPLE)]))
+        finally:
+            executor.shutdown()
+        
+        assert isinstance(outcomes[0], asyncio.TimeoutError)
+    
+    def test_timeout_excludes_queueing(self, monkeypatch):
+        """Test files queued behind others on a single worker get the whole timeout to parse"""
+        def slow_job(upload, links=False):
+            time.sleep(0.3)
+            return CampaignBatch(), {}
+        monkeypatch.setattr("app.utils.workers.parse_upload_job", slow_job)
+        executor = ParseExecutor(kind="thread", max_workers=1, timeout=0.5)
+        uploads = [make_upload(f"{name}.csv", MAILERLITE_CLASSIC_SAMPLE) for name in "abc"]
+        try:
+            outcomes = asyncio.run(executor.parse_all(uploads))
+        finally:
+            executor.shutdown()
+        
+        assert all(isinstance(outcome, CampaignBatch) for outcome in outcomes)
+    
+    def test_uploads_read_only_when_a_worker_is_free(self, monkeypatch):
+        """Test process mode copies one file per worker at a time rather than every file up front"""
+        in_flight = 0
+        peak = 0
+        lock = threading.Lock()
+        
+        def read_bytes(upload):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            return b""
+        
+        def parse_bytes(data, links=False):
+            nonlocal in_flight
+            time.sleep(0.05)
+            with lock:
+                in_flight -= 1
+            return CampaignBatch(), {}
+        
+        monkeypatch.setattr(IngestedFile, "read_bytes", read_bytes)
+        monkeypatch.setattr("app.utils.workers.parse_bytes_job", parse_bytes)
+        executor = ParseExecutor(kind="process", max_workers=2, timeout=5)
+        # Threads stand in for worker processes, which could not see the patched job
+        executor._pool = ThreadPoolExecutor(max_workers=2)
+        uploads = [make_upload(f"{i}.csv", MAILERLITE_CLASSIC_SAMPLE) for i in range(8)]
+        try:
+            outcomes = asyncio.run(executor.parse_all(uploads))
+        finally:
+            executor.shutdown()
+        
+        assert len(outcomes) == 8
+        assert peak <= 2
+    
+    def test_unknown_executor_kind(self):
+        """Test invalid executor configuration is rejected"""
+        with pytest.raises(ValueError):
+            ParseExecutor(kind="fiber")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestParseCache:
+    """Test the content-addressed parse result cache"""
+    
+    def make_batch(self, subject: str = "Hello") -> CampaignBatch:
+        return CampaignBatch({"platform": ["mailchimp"], "subject": [subject], "delivered": [100]})
+    
+    def test_hit_and_miss_counts(self):
+        """Test lookups are counted and return the stored batch"""
+        cache = ParseCache(max_bytes=1024 * 1024, ttl=60)
+        batch = self.make_batch()
+        
+        assert cache.get("a") is None
+        cache.put("a", batch)
+        assert cache.get("a") is batch
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    def test_entries_expire_after_ttl(self):
+        """Test entries are dropped once the TTL passes, even if recently read"""
+        clock = FakeClock()
+        cache = ParseCache(max_bytes=1024 * 1024, ttl=60, clock=clock)
+        cache.put("a", self.make_batch())
+        
+        clock.now = 59
+        assert cache.get("a") is not None
+        clock.now = 60
+        assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
+        assert cache.size == 0
+    
+    def test_byte_budget_evicts_least_recently_used(self):
+        """Test the oldest untouched entry is evicted when the budget is exceeded"""
+        size = estimate_batch_size(self.make_batch())
+        cache = ParseCache(max_bytes=size * 2, ttl=60)
+        cache.put("a", self.make_batch())
+        cache.put("b", self.make_batch())
+        cache.get("a")
+        cache.put("c", self.make_batch())
+        
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+        assert cache.stats()["evictions"] == 1
+        assert cache.size <= cache.max_bytes
+    
+    def test_zero_budget_disables_cache(self):
+        """Test a zero budget stores nothing and counts nothing"""
+        cache = ParseCache(max_bytes=0, ttl=60)
+        cache.put("a", self.make_batch())
+        
+        assert cache.get("a") is None
+        assert cache.stats()["misses"] == 0
+    
+    def test_key_depends_on_content_not_filename(self):
+        """Test uploads with the same bytes share a key, scoped to the parser version"""
+        first = make_upload("a.csv", MAILERLITE_CLASSIC_SAMPLE)
+        second = make_upload("b.csv", MAILERLITE_CLASSIC_SAMPLE)
+        other = make_upload("a.csv", MAILCHIMP_AGGREGATED_SAMPLE)
+        
+        assert cache_key(first.digest) == cache_key(second.digest)
+        assert cache_key(first.digest) != cache_key(other.digest)
+    
+    def test_executor_skips_parsing_on_hit(self, monkeypatch):
+        """Test a cached upload is returned without running the parser again"""
+        executor = ParseExecutor(kind="thread", max_workers=1, cache=ParseCache(max_bytes=1024 * 1024, ttl=60))
+        try:
+            first = asyncio.run(executor.parse(make_upload("a.csv", MAILERLITE_CLASSIC_SAMPLE)))
+            monkeypatch.setattr("app.utils.workers.parse_upload_job", lambda upload: 1 / 0)
+            second = asyncio.run(executor.parse(make_upload("b.csv", MAILERLITE_CLASSIC_SAMPLE)))
+        finally:
+            executor.shutdown()
+        
+        assert second is first
+
+
+def make_copies(*copies) -> CampaignBatch:
+    """Batch of campaigns given as (unique_id, delivered, opens) tuples"""
+    return CampaignBatch({
+        "unique_id": [unique_id for unique_id, _, _ in copies],
+        "delivered": [delivered for _, delivered, _ in copies],
+        "opens": [opens for _, _, opens in copies],
+    })
+
+
+class TestDeduplicator:
+    """Test cross-file deduplication policies"""
+    
+    def winners(self, deduplicator: Deduplicator) -> list:
+        return [
+            (batch.columns["unique_id"][row], batch.columns["delivered"][row], batch.columns["opens"][row])
+            for batch, row in deduplicator.entries()
+        ]
+    
+    def test_latest_upload_wins(self):
+        """Test later uploads replace earlier ones and the first copy wins within a file"""
+        deduplicator = Deduplicator("latest")
+        first = make_copies(("a", 100, 10), ("b", 200, 20))
+        second = make_copies(("a", 150, 15), ("a", 999, 99))
+        
+        assert deduplicator.add(first, range(2), source=0) == [0, 1]
+        assert deduplicator.add(second, range(2), source=1) == [0]
+        assert self.winners(deduplicator) == [("a", 150, 15), ("b", 200, 20)]
+        assert deduplicator.duplicates == 2
+    
+    def test_later_upload_finishing_first(self):
+        """Test the upload position decides, not the order batches arrive in"""
+        deduplicator = Deduplicator("latest")
+        deduplicator.add(make_copies(("a", 150, 15)), [0], source=1)
+        
+        assert deduplicator.add(make_copies(("a", 100, 10)), [0], source=0) == []
+        assert self.winners(deduplicator) == [("a", 150, 15)]
+    
+    def test_max_delivered(self):
+        """Test the copy with the most deliveries wins regardless of upload order"""
+        deduplicator = Deduplicator("max_delivered")
+        deduplicator.add(make_copies(("a", 300, 30)), [0], source=0)
+        deduplicator.add(make_copies(("a", 100, 10), ("b", None, 5)), [0, 1], source=1)
+        deduplicator.add(make_copies(("b", 50, 6)), [0], source=2)
+        
+        assert self.winners(deduplicator) == [("a", 300, 30), ("b", 50, 6)]
+    
+    def test_merge_fills_nulls_and_prefers_latest(self):
+        """Test merging takes non-null fields from the latest copy that has them"""
+        deduplicator = Deduplicator("merge")
+        first = make_copies(("a", 100, 10))
+        deduplicator.add(first, [0], source=0)
+        
+        assert deduplicator.add(make_copies(("a", None, 12)), [0], source=1) == [0]
+        assert self.winners(deduplicator) == [("a", 100, 12)]
+        assert first.columns["opens"] == [10]
+    
+    def test_rows_without_id_are_ignored(self):
+        """Test campaigns without a unique_id are left to the caller"""
+        deduplicator = Deduplicator()
+        
+        assert deduplicator.add(make_copies(("", 100, 10), (None, 5, 1)), range(2), source=0) == []
+        assert len(deduplicator) == 0
+    
+    def test_unknown_policy(self):
+        """Test an unknown policy is rejected"""
+        with pytest.raises(ValueError):
+            Deduplicator("oldest")
+
+
+class TestParseResponseEncoding:
+    """Test direct JSON encoding of campaign batches"""
+    
+    def test_matches_standard_json(self):
+        """Test encoded bytes match the generic JSON encoder"""
+        batch = CampaignBatch.from_campaigns(detect_and_parse(MAILCHIMP_AGGREGATED_SAMPLE))
+        batch.columns["subject"][0] = 'Caf\u00e9 "quoted" \\ line\nbreak'
+        results = [("deduplicated", batch, 2), ("a.csv", batch, 0)]
+        errors = [{"filename": "b.csv", "error": "Only CSV files supported"}]
+        
+        expected = {
+            "results": [
+                {"filename": name, "data": {"campaign": batch.row_dict(row)}}
+                for name, _, row in results
+            ],
+            "errors": errors,
+        }
+        encoded = encode_parse_response(results, errors)
+        
+        assert encoded == json.dumps(expected, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    
+    def test_mixed_and_non_finite_columns(self):
+        """Test mixed-type columns and non-finite floats encode safely"""
+        assert encode_column([1, None, 2.5, True]) == ["1", "null", "2.5", "true"]
+        assert encode_column([float("nan"), 1.0]) == ["null", "1.0"]
+
+
+class TestCampaignAnalytics:
+    """Test server-side dashboard analytics"""
+    
+    def _batch(self, **columns):
+        return CampaignBatch({field: list(values) for field, values in columns.items()})
+    
+    def test_trendline_least_squares(self):
+        """Test trendlines match an ordinary least-squares fit per metric"""
+        series = np.array([[1.0, 3.0, 2.0, 6.0], [5.0, 5.0, 5.0, 5.0]])
+        slope, intercept = np.polyfit(np.arange(4), series[0], 1)
+        
+        trend = trendlines(series)
+        
+        assert np.allclose(trend[0], slope * np.arange(4) + intercept)
+        assert np.allclose(trend[1], 5.0)
+        assert trendlines(np.array([[7.0]])).tolist() == [[7.0]]
+    
+    def test_outliers_and_low_volume(self):
+        """Test delivery outliers use 1.5 IQR and low volume is under half the median"""
+        delivered = np.array([100.0, 110.0, 105.0, 95.0, 1000.0, 40.0, 0.0])
+        
+        assert delivery_outliers(delivered) == [4]
+        assert low_volume(delivered) == [5]
+        assert delivery_outliers(delivered[:3]) == []
+    
+    def test_outlier_mask_per_metric(self):
+        """Test each metric row gets its own IQR bounds in a single call"""
+        metrics = np.array([
+            [100.0, 110.0, 105.0, 95.0, 1000.0, 40.0, 0.0],
+            [0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.9],
+        ])
+        
+        mask = outlier_mask(metrics)
+        
+        assert np.flatnonzero(mask[0]).tolist() == delivery_outliers(metrics[0]) == [4]
+        assert np.flatnonzero(mask[1]).tolist() == [6]
+    
+    def test_outlier_mask_zscore(self):
+        """Test z-score outliers ignore constant metrics"""
+        metrics = np.array([[10.0] * 20 + [100.0], [5.0] * 21])
+        
+        mask = outlier_mask(metrics, "zscore")
+        
+        assert np.flatnonzero(mask[0]).tolist() == [20]
+        assert not mask[1].any()
+        with pytest.raises(ValueError):
+            outlier_mask(metrics, "mad")
+    
+    def test_campaign_flags_across_batches(self):
+        """Test flags index entries drawn from several batches"""
+        first = self._batch(delivered=[100, 110, None], open_rate=[0.2, 0.2, 0.2])
+        second = self._batch(delivered=[105, 30], open_rate=[0.2, 0.95])
+        entries = [(first, 0), (second, 1), (first, 1), (second, 0), (first, 2)]
+        
+        flags = campaign_flags(entries)
+        
+        assert flags["low_volume"] == [1]
+        assert flags["outliers"]["open_rate"] == [1]
+        assert flags["outliers"]["delivered"] == []
+    
+    def test_missing_values_read_as_zero(self):
+        """Test None and non-numeric metrics count as zero in averages"""
+        batch = self._batch(delivered=[100, None, "50"], open_rate=[0.5, None, "n/a"])
+        
+        result = campaign_analytics(batch)
+        
+        assert result["averages"]["delivered"] == 50.0
+        assert result["averages"]["open_rate"] == pytest.approx(0.5 / 3)
+        assert result["trends"]["open_rate"]["values"] == [50.0, 0.0, 0.0]
+    
+    def test_selection_order(self):
+        """Test averages, labels and trends follow the selected rows in order"""
+        batch = self._batch(delivered=[10, 20, 30], email_title=["A", None, "C"], subject=[None, "B", None])
+        
+        result = campaign_analytics(batch, [2, 0, 9])
+        
+        assert result["total_campaigns"] == 2
+        assert result["labels"] == ["C", "A"]
+        assert result["trends"]["delivered"]["values"] == [30.0, 10.0]
+        assert result["averages"]["delivered"] == 20.0
+    
+    def test_heatmap_buckets(self):
+        """Test send times are bucketed by weekday (Sunday = 0) and hour"""
+        batch = self._batch(
+            sent_at=["Sat, Aug 07, 2021 16:00", "Aug 07, 2021 04:30 pm", "2021-04-26 09:15", "soon"],
+            open_rate=[0.2, 0.4, 0.1, 0.9],
+            delivered=[100, 300, 50, 10],
+            email_title=["A", "B", "C", "D"],
+        )
+        
+        cells = campaign_analytics(batch)["heatmap"]
+        
+        assert cells == [
+            {"day": 1, "hour": 9, "count": 1, "avg_open_rate": 10.0, "total_delivered": 50.0, "campaigns": ["C"]},
+            {"day": 6, "hour": 16, "count": 2, "avg_open_rate": pytest.approx(30.0),
+             "total_delivered": 400.0, "campaigns": ["A", "B"]},
+        ]
+    
+    def test_empty_batch(self):
+        """Test an empty batch yields empty analytics"""
+        result = campaign_analytics(CampaignBatch())
+        
+        assert result["total_campaigns"] == 0
+        assert result["heatmap"] == []
+        assert result["trends"]["delivered"] == {"values": [], "trend": []}
+
+
+class TestSendTimeHeatmap:
+    """Test send-time binning"""
+    
+    def test_send_time_cells(self):
+        """Test send times map to weekday * 24 + hour, and unreadable ones to -1"""
+        cells = send_time_cells([
+            "Mon, Apr 26, 2021 12:25",
+            "2021-08-07 16:00:00",
+            "2021-02-30 10:00",
+            None,
+            "Mon, Apr 26, 2021 12:25",
+            5,
+            ["2021-08-07 16:00:00"],
+        ])
+        
+        assert cells.tolist() == [1 * 24 + 12, 6 * 24 + 16, -1, -1, 1 * 24 + 12, -1, -1]
+    
+    def test_bins_means(self):
+        """Test campaigns are counted per cell, with open rates averaged and deliveries summed"""
+        batch = CampaignBatch({
+            "sent_at": ["2021-08-07 16:00", "2021-08-07 16:45", "unknown"],
+            "open_rate": [0.2, 0.4, 0.9],
+            "delivered": [100, 300, 50],
+        })
+        rows = [0, 1, 2]
+        
+        heatmap = SendTimeHeatmap().add(batch, rows, send_time_cells(batch.columns["sent_at"]))
+        
+        assert heatmap.counts[6][16] == 2
+        assert heatmap.counts.sum() == 2
+        assert heatmap.mean(heatmap.open_rate_totals)[6][16] == pytest.approx(0.3)
+        assert heatmap.delivered_totals[6][16] == 400.0
+        assert heatmap.mean(heatmap.open_rate_totals)[0][0] == 0.0
+
+
+class TestWorkspaceStore:
+    """Test in-memory workspaces"""
+    
+    def _batch(self, *unique_ids):
+        return CampaignBatch({"unique_id": list(unique_ids), "delivered": list(range(len(unique_ids)))})
+    
+    def test_tokens_are_opaque_and_distinct(self):
+        """Test each workspace gets its own unguessable token"""
+        store = WorkspaceStore(ttl=60, max_workspaces=10)
+        first, _ = store.create()
+        second, _ = store.create()
+        
+        assert first != second
+        assert len(first) >= 32
+        assert store.get("not-a-token") is None
+    
+    def test_expires_when_unused(self):
+        """Test a workspace lives ttl seconds past its last use"""
+        clock = FakeClock()
+        store = WorkspaceStore(ttl=60, max_workspaces=10, clock=clock)
+        token, workspace = store.create()
+        
+        clock.now = 50
+        assert store.get(token) is workspace
+        clock.now = 100
+        assert store.get(token) is workspace
+        clock.now = 161
+        assert store.get(token) is None
+        assert store.stats()["expirations"] == 1
+    
+    def test_evicts_least_recently_used(self):
+        """Test opening past max_workspaces evicts the one used longest ago"""
+        store = WorkspaceStore(ttl=60, max_workspaces=2)
+        first, _ = store.create()
+        second, _ = store.create()
+        store.get(first)
+        third, _ = store.create()
+        
+        assert store.get(second) is None
+        assert store.get(first) is not None and store.get(third) is not None
+        assert store.stats()["evictions"] == 1
+    
+    def test_discard(self):
+        """Test a discarded workspace is gone"""
+        store = WorkspaceStore(ttl=60, max_workspaces=2)
+        token, _ = store.create()
+        
+        assert store.discard(token)
+        assert not store.discard(token)
+        assert store.get(token) is None
+    
+    def test_entries_in_arrival_order(self):
+        """Test campaigns keep the position they first arrived at as later files replace them"""
+        workspace = Workspace("latest")
+        first, second = self._batch("a", "", "b"), self._batch("c", "b", "", "a")
+        
+        assert workspace.add(first, [0, 1, 2], workspace.reserve(1)) == ([1], [0, 1])
+        assert workspace.add(second, [0, 1, 2, 3], workspace.reserve(1)) == ([2], [2, 1, 0])
+        
+        assert workspace.entries() == [(first, 1), (second, 3), (second, 1), (second, 2), (second, 0)]
+        assert len(workspace) == 5
+
+
+class TestCompression:
+    """Test Accept-Encoding negotiation and streamed gzip"""
+    
+    def test_listed_and_wildcard(self):
+        """Test codings are accepted when listed or covered by *"""
+        assert accepts_encoding("gzip, deflate, br", "br")
+        assert accepts_encoding("*", "gzip")
+        assert not accepts_encoding("gzip", "br")
+        assert not accepts_encoding("", "gzip")
+    
+    def test_zero_quality_refuses(self):
+        """Test q=0 refuses a coding, even when * would allow it"""
+        assert not accepts_encoding("gzip;q=0", "gzip")
+        assert not accepts_encoding("*, br;q=0", "br")
+        assert accepts_encoding("br;q=0.5, gzip;q=0", "br")
+        assert not accepts_encoding("*;q=0", "gzip")
+    
+    def test_streamed_chunks_are_flushed(self):
+        """Test each streamed chunk decompresses completely on arrival"""
+        responder = FlushingGZipResponder(None, minimum_size=0)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        
+        for record in (b'{"type": "result"}\n', b'{"type": "summary"}\n'):
+            assert decompressor.decompress(responder.apply_compression(record, more_body=True)) == record
+        decompressor.decompress(responder.apply_compression(b"", more_body=False))
+        assert decompressor.eof
+
+
+class TestPrecompressedStaticFiles:
+    """Test precompressed variants, caching headers and 304s"""
+    
+    @pytest.fixture
+    def client(self, tmp_path):
+        script = b"console.log('hello');" * 100
+        (tmp_path / "app.js").write_bytes(script)
+        (tmp_path / "app.js.br").write_bytes(b"brotli bytes")
+        (tmp_path / "app.js.gz").write_bytes(gzip.compress(script))
+        (tmp_path / "plain.css").write_bytes(b"body {}")
+        
+        app = Starlette()
+        app.mount("/assets", PrecompressedStaticFiles(directory=tmp_path, cache_control=IMMUTABLE))
+        return TestClient(app)
+    
+    @staticmethod
+    def _raw(client, path, **headers):
+        with client.stream("GET", path, headers=headers) as response:
+            return response, b"".join(response.iter_raw())
+    
+    def test_prefers_brotli(self, client):
+        """Test the brotli variant is served to clients accepting it"""
+        response, body = self._raw(client, "/assets/app.js", **{"Accept-Encoding": "gzip, br"})
+        
+        assert response.headers["content-encoding"] == "br"
+        assert response.headers["content-type"].startswith("text/javascript")
+        assert response.headers["cache-control"] == IMMUTABLE
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert body == b"brotli bytes"
+    
+    def test_falls_back_to_gzip_then_identity(self, client):
+        """Test gzip is served without brotli support, and the file itself without either"""
+        response, body = self._raw(client, "/assets/app.js", **{"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(body) == b"console.log('hello');" * 100
+        
+        response, body = self._raw(client, "/assets/app.js", **{"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert body == b"console.log('hello');" * 100
+    
+    def test_missing_variant_serves_file(self, client):
+        """Test files without variants are served as they are"""
+        response, body = self._raw(client, "/assets/plain.css", **{"Accept-Encoding": "gzip, br"})
+        
+        assert "content-encoding" not in response.headers
+        assert body == b"body {}"
+    
+    def test_etag_per_variant_and_not_modified(self, client):
+        """Test each representation has its own ETag and revalidates with 304"""
+        brotli_etag = self._raw(client, "/assets/app.js", **{"Accept-Encoding": "br"})[0].headers["etag"]
+        identity_etag = self._raw(client, "/assets/app.js", **{"Accept-Encoding": "identity"})[0].headers["etag"]
+        assert brotli_etag != identity_etag
+        
+        response = client.get("/assets/app.js", headers={"Accept-Encoding": "br", "If-None-Match": brotli_etag})
+        assert response.status_code == 304
+        assert response.headers["cache-control"] == IMMUTABLE
+        
+        response = client.get("/assets/app.js", headers={"Accept-Encoding": "identity", "If-None-Match": brotli_etag})
+        assert response.status_code == 200
+    
+    def test_serve(self, tmp_path):
+        """Test files are served by relative path, and missing ones give None"""
+        (tmp_path / "index.html").write_bytes(b"<html></html>")
+        files = PrecompressedStaticFiles(directory=tmp_path, cache_control="no-cache")
+        scope = {"type": "http", "headers": []}
+        
+        response = files.serve("index.html", scope)
+        
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "no-cache"
+        assert files.serve("missing.html", scope) is None
+        assert files.serve("../index.html", scope) is None
+
+
+class TestTopLinks:
+    """Test the bounded-memory most clicked URL ranking"""
+    
+    def test_exact_under_capacity(self):
+        """Test counts are exact while every URL has a counter"""
+        top_links = TopLinks(capacity=10)
+        top_links.add("a", 5, 3)
+        top_links.add("b", 9, 4)
+        top_links.add("a", 6, 2)
+        
+        assert top_links.top(2) == [
+            {"url": "a", "total_clicks": 11, "unique_clicks": 5, "error": 0},
+            {"url": "b", "total_clicks": 9, "unique_clicks": 4, "error": 0},
+        ]
+    
+    def test_memory_stays_bounded(self):
+        """Test counters and heap stay within their bounds however many URLs arrive"""
+        top_links = TopLinks(capacity=50)
+        for i in range(20000):
+            top_links.add(f"https://example.com/{i}", 1 + i % 7)
+        
+        assert len(top_links) == 50
+        assert len(top_links._heap) <= 4 * 50
+    
+    def test_heavy_hitters_found_within_error(self):
+        """Test URLs above clicks / capacity are ranked, counts overestimated by at most their error"""
+        rng = random.Random(3)
+        truth = {}
+        top_links = TopLinks(capacity=40)
+        for _ in range(300):
+            for url in [f"hot/{i}" for i in range(5)] + [f"cold/{rng.randrange(5000)}" for _ in range(30)]:
+                clicks = 20 if url.startswith("hot") else rng.randrange(1, 4)
+                truth[url] = truth.get(url, 0) + clicks
+                top_links.add(url, clicks)
+        
+        ranked = top_links.top(5)
+        
+        assert sorted(entry["url"] for entry in ranked) == [f"hot/{i}" for i in range(5)]
+        for entry in ranked:
+            assert truth[entry["url"]] <= entry["total_clicks"] <= truth[entry["url"]] + entry["error"]
+    
+    def test_add_batches_counts_each_report_once(self):
+        """Test a report listed for several campaigns, or without a click table, is counted once or not at all"""
+        batch = CampaignBatch({"platform": ["mailchimp_ab", "mailchimp_ab"]})
+        batch.links = [LinkClicks("https://example.com", 2, 3)]
+        top_links = TopLinks()
+        
+        top_links.add_batches([batch, batch, CampaignBatch()])
+        
+        assert top_links.payload(5)["top"][0]["total_clicks"] == 3
+        assert top_links.reports == 1
+    
+    def test_detect_and_parse_batch_extracts_links_on_request(self):
+        """Test click tables are read only when asked for"""
+        plain = detect_and_parse_batch(io.StringIO(MAILERLITE_CLASSIC_SAMPLE, newline=None))
+        with_links = detect_and_parse_batch(io.StringIO(MAILERLITE_CLASSIC_SAMPLE, newline=None), links=True)
+        
+        assert plain.links is None
+        assert with_links.links == [LinkClicks("Unsubscribe link", 83, 90)]
+        assert cache_key("abc", links=True) != cache_key("abc")
+
+
+class TestMetrics:
+    """Test Prometheus metric recording and text rendering"""
+    
+    def test_histogram_buckets_are_cumulative_and_inclusive(self):
+        """Test a value equal to a bound is counted in that bucket and every bucket above it"""
+        histogram = Histogram("latency", "Latency", (0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        
+        lines = list(histogram.samples())
+        
+        assert lines == [
+            'latency_bucket{le="0.1"} 2',
+            'latency_bucket{le="1"} 3',
+            'latency_bucket{le="+Inf"} 4',
+            "latency_sum 2.65",
+            "latency_count 4",
+        ]
+    
+    def test_render_labels_and_escaping(self):
+        """Test label values are escaped and every metric gets HELP and TYPE lines"""
+        registry = MetricsRegistry()
+        counter = registry.counter("errors_total", "Errors", ("error",))
+        counter.inc('bad "quote"')
+        counter.inc('bad "quote"', amount=2)
+        registry.histogram("size", "Size", (10,), ("kind",)).observe(5, "csv")
+        
+        text = registry.render()
+        
+        assert text.startswith("# HELP errors_total Errors\n# TYPE errors_total counter\n")
+        assert 'errors_total{error="bad \\"quote\\""} 3\n' in text
+        assert 'size_bucket{kind="csv",le="10"} 1\n' in text
+        assert "# TYPE size histogram" in text
+        assert text.endswith("\n")
+    
+    def test_service_metrics_record_request(self):
+        """Test worker profiles feed the parser histogram and the request's detect and parse stages"""
+        metrics = ServiceMetrics()
+        timer = StageTimer()
+        profile = {"parser": "MailChimpParser", "detect": 0.002, "parse": 0.01}
+        
+        with timer.stage("read"):
+            pass
+        metrics.observe_file(2048, profile, timer)
+        metrics.observe_file(4096, profile, timer)
+        metrics.observe_file(100, None, timer)
+        metrics.observe_request(timer, 7)
+        
+        assert timer.stages["parse"] == pytest.approx(0.02)
+        assert metrics.parser_seconds.count("MailChimpParser") == 2
+        assert metrics.upload_bytes.count() == 3
+        assert metrics.stage_seconds.count("read") == 1
+        assert metrics.stage_seconds.count("detect") == 1
+        assert metrics.campaigns.count() == 1
+    
+    def test_detect_and_parse_batch_profile(self):
+        """Test the parser chosen and its timings are recorded when a profile is passed"""
+        profile = {}
+        
+        detect_and_parse_batch(io.StringIO(MAILERLITE_CLASSIC_SAMPLE, newline=None), profile=profile)
+        
+        assert profile["parser"] == "MailerLiteClassicParser"
+        assert profile["detect"] >= 0 and profile["parse"] >= 0
+    
+    def test_server_timing_header(self):
+        """Test stages and files are formatted in milliseconds, descriptions quoted and made header-safe"""
+        timer = StageTimer()
+        timer.add("read", 0.0012)
+        timer.add("parse", 0.5)
+        
+        header = timer.server_timing([
+            ('a "b".csv', {"parser": "MailChimpParser", "detect": 0.001, "parse": 0.002}),
+            ("r\u00e9sum\u00e9\r\n.csv", None),
+        ])
+        
+        assert header == (
+            'read;dur=1.200, parse;dur=500.000, file-1;dur=3.000;desc="a \\"b\\".csv", file-2;desc="r?sum???.csv"'
+        )
+    
+    def test_server_timing_caps_files(self):
+        """Test archives with many members do not inflate the header past the file cap"""
+        header = StageTimer().server_timing([(f"{i}.csv", None) for i in range(SERVER_TIMING_FILES + 10)])
+        
+        assert header.count("file-") == SERVER_TIMING_FILES
+    
+    def test_count_lines(self):
+        """Test lines are counted across chunks, with or without a trailing newline"""
+        for data, expected in ((b"", 0), (b"a\nb\n", 2), (b"a\nb", 2), (b"a\n" * 1000 + b"end", 1001)):
+            upload = IngestedFile("report.csv", chunk_size=64)
+            upload.write(data)
+            
+            assert upload.count_lines(chunk_size=7) == expected
 